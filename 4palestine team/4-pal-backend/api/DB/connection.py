@@ -1,10 +1,44 @@
 import os
-from supabase import create_client, Client
+import threading
+from typing import TYPE_CHECKING
+
 from dotenv import load_dotenv
 
+from api.utils.metrics import instrument_client
+
+if TYPE_CHECKING:
+    from supabase import Client
+
 # Load environment variables
 load_dotenv()
 
 url: str = os.environ.get("SUPABASE_URL")
 key: str = os.environ.get("SUPABASE_KEY")
-supabase: Client = create_client(url, key)
\ No newline at end of file
+
+
+class LazyClient:
+    """
+    Stand-in for the Supabase client that builds it on first use.
+
+    Importing ``supabase`` (httpx, gotrue, realtime, ...) is most of a cold
+    start, so it is deferred until a request actually queries the database.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._lock = threading.Lock()
+
+    def get(self) -> "Client":
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    from supabase import create_client
+                    # Wrapped so every query is timed and counted per request (see api/utils/metrics.py)
+                    self._client = instrument_client(create_client(url, key))
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+supabase: "Client" = LazyClient()
@@ -0,0 +1,21 @@
+-- Migration: Danger zone polygons (api/services/danger_zones.py)
+-- A danger_zone location marks a point; the zone itself is the area around it.
+-- geometry holds a GeoJSON Polygon or MultiPolygon in WGS84 ([lon, lat] positions).
+
+CREATE TABLE danger_zones (
+    id SERIAL PRIMARY KEY,
+    location_id INT REFERENCES locations(id) ON DELETE SET NULL,
+    name VARCHAR(255) NOT NULL,
+    description TEXT,
+    geometry JSONB NOT NULL,
+    active BOOLEAN NOT NULL DEFAULT TRUE,
+    created_by_admin INT REFERENCES admins(id) ON DELETE SET NULL,
+    created_at TIMESTAMP DEFAULT NOW(),
+    expires_at TIMESTAMP
+);
+
+CREATE INDEX idx_danger_zones_active ON danger_zones(id) WHERE active;
+
+CREATE TRIGGER danger_zones_change_log
+    AFTER INSERT OR UPDATE OR DELETE ON danger_zones
+    FOR EACH ROW EXECUTE FUNCTION record_change();
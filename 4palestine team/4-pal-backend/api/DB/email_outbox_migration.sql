@@ -0,0 +1,20 @@
+-- Migration: Create email outbox
+-- Outgoing emails are written here by the request that triggers them and
+-- delivered by background workers (see api/services/mail_services.py)
+
+CREATE TABLE email_outbox (
+    id SERIAL PRIMARY KEY,
+    recipient VARCHAR(255) NOT NULL,
+    subject VARCHAR(255) NOT NULL,
+    body TEXT NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'pending' CHECK (status IN ('pending','sending','sent','failed')),
+    attempts INT NOT NULL DEFAULT 0,
+    last_error TEXT,
+    -- When the row may next be picked up (retry backoff, or end of a worker's lease while 'sending')
+    next_attempt_at TIMESTAMP NOT NULL DEFAULT NOW(),
+    created_at TIMESTAMP DEFAULT NOW(),
+    sent_at TIMESTAMP
+);
+
+-- Workers poll for due rows
+CREATE INDEX idx_email_outbox_due ON email_outbox(status, next_attempt_at);
@@ -0,0 +1,175 @@
+-- Migration: Transactional write procedures called through supabase.rpc()
+-- Each function replaces a chain of dependent API calls with one round trip
+-- that either commits every row or none of them. Results are jsonb objects
+-- with a "status" field the routes map to HTTP responses.
+
+-- POST /api/locations/add: location + its unverified verification record
+CREATE OR REPLACE FUNCTION create_location_with_verification(p_location JSONB)
+RETURNS JSONB AS $$
+DECLARE
+    v_location locations;
+    v_verification location_verifications;
+BEGIN
+    INSERT INTO locations (created_by, latitude, longitude, address, category, title,
+                           description, organization, capacity, start_time, end_time)
+    SELECT created_by, latitude, longitude, address, category, title,
+           description, organization, capacity, start_time, end_time
+    FROM jsonb_populate_record(NULL::locations, p_location)
+    RETURNING * INTO v_location;
+
+    INSERT INTO location_verifications (location_id, status)
+    VALUES (v_location.id, 'unverified')
+    RETURNING * INTO v_verification;
+
+    RETURN jsonb_build_object(
+        'status', 'ok',
+        'location', to_jsonb(v_location),
+        'verification', to_jsonb(v_verification)
+    );
+END;
+$$ LANGUAGE plpgsql;
+
+-- POST /api/auth/register/contributor: user + contributor_data + first refresh token
+CREATE OR REPLACE FUNCTION register_contributor(
+    p_email VARCHAR,
+    p_password_hash VARCHAR,
+    p_contributor_type VARCHAR,
+    p_first_name VARCHAR,
+    p_last_name VARCHAR,
+    p_phone_number VARCHAR,
+    p_preferred_language VARCHAR,
+    p_motivation TEXT,
+    p_refresh_token_hash VARCHAR,
+    p_refresh_expires_at TIMESTAMP
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_user users;
+    v_contributor contributor_data;
+BEGIN
+    IF EXISTS (SELECT 1 FROM users WHERE email = p_email) THEN
+        RETURN jsonb_build_object('status', 'email_taken');
+    END IF;
+
+    INSERT INTO users (email, password_hash, user_type, first_name, last_name, phone_number, preferred_language)
+    VALUES (p_email, p_password_hash, 'contributor', p_first_name, p_last_name, p_phone_number,
+            COALESCE(p_preferred_language, 'en'))
+    RETURNING * INTO v_user;
+
+    INSERT INTO contributor_data (user_id, contributor_type, verification_status, verified, motivation, password_hash)
+    VALUES (v_user.id, p_contributor_type, 'pending', FALSE, p_motivation, p_password_hash)
+    RETURNING * INTO v_contributor;
+
+    INSERT INTO refresh_tokens (contributor_id, token_hash, expires_at, is_active)
+    VALUES (v_contributor.id, p_refresh_token_hash, p_refresh_expires_at, TRUE);
+
+    RETURN jsonb_build_object(
+        'status', 'ok',
+        'user', to_jsonb(v_user) - 'password_hash',
+        'contributor', to_jsonb(v_contributor) - 'password_hash'
+    );
+EXCEPTION
+    -- A concurrent registration with the same email won the race
+    WHEN unique_violation THEN
+        RETURN jsonb_build_object('status', 'email_taken');
+END;
+$$ LANGUAGE plpgsql;
+
+-- POST /api/users/verify_email: check the latest code and mark the user verified
+CREATE OR REPLACE FUNCTION verify_email(p_email VARCHAR, p_code BIGINT)
+RETURNS JSONB AS $$
+DECLARE
+    v_verification email_verifications;
+    v_user users;
+BEGIN
+    SELECT * INTO v_verification
+    FROM email_verifications
+    WHERE email = p_email
+    ORDER BY expires_at DESC
+    LIMIT 1
+    FOR UPDATE;
+
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'not_found');
+    END IF;
+    IF v_verification.code::BIGINT <> p_code THEN
+        RETURN jsonb_build_object('status', 'invalid_code');
+    END IF;
+    IF v_verification.expires_at < NOW() THEN
+        RETURN jsonb_build_object('status', 'expired');
+    END IF;
+
+    UPDATE email_verifications SET verified = TRUE WHERE id = v_verification.id;
+    UPDATE users SET is_email_verified = TRUE, user_type = 'registered'
+    WHERE email = p_email
+    RETURNING * INTO v_user;
+
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('status', 'user_not_found');
+    END IF;
+
+    RETURN jsonb_build_object('status', 'ok', 'user', to_jsonb(v_user) - 'password_hash');
+END;
+$$ LANGUAGE plpgsql;
+
+-- POST /api/auth/change-password: store the new hash and revoke every refresh token
+-- Pass exactly one of p_user_id / p_contributor_id.
+CREATE OR REPLACE FUNCTION change_password_and_revoke(
+    p_user_id INT,
+    p_contributor_id INT,
+    p_password_hash VARCHAR
+)
+RETURNS JSONB AS $$
+DECLARE
+    v_revoked INT;
+BEGIN
+    IF p_contributor_id IS NOT NULL THEN
+        UPDATE contributor_data SET password_hash = p_password_hash WHERE id = p_contributor_id;
+        IF NOT FOUND THEN
+            RETURN jsonb_build_object('status', 'not_found');
+        END IF;
+        UPDATE refresh_tokens SET is_active = FALSE
+        WHERE contributor_id = p_contributor_id AND is_active;
+    ELSE
+        UPDATE users SET password_hash = p_password_hash WHERE id = p_user_id;
+        IF NOT FOUND THEN
+            RETURN jsonb_build_object('status', 'not_found');
+        END IF;
+        UPDATE refresh_tokens SET is_active = FALSE
+        WHERE user_id = p_user_id AND is_active;
+    END IF;
+    GET DIAGNOSTICS v_revoked = ROW_COUNT;
+
+    RETURN jsonb_build_object('status', 'ok', 'revoked_tokens', v_revoked);
+END;
+$$ LANGUAGE plpgsql;
+
+-- POST /api/locations/bulk and /api/ingest/batch: a chunk of locations + their
+-- unverified verification records, returned in input order
+CREATE OR REPLACE FUNCTION create_locations_with_verification(p_locations JSONB)
+RETURNS JSONB AS $$
+DECLARE
+    v_item JSONB;
+    v_location locations;
+    v_locations JSONB := '[]'::JSONB;
+BEGIN
+    FOR v_item IN
+        SELECT value FROM jsonb_array_elements(p_locations) WITH ORDINALITY AS t(value, position)
+        ORDER BY position
+    LOOP
+        INSERT INTO locations (created_by, latitude, longitude, address, category, title,
+                               description, organization, capacity, start_time, end_time)
+        SELECT created_by, latitude, longitude, address, category, title,
+               description, organization, capacity, start_time, end_time
+        FROM jsonb_populate_record(NULL::locations, v_item)
+        RETURNING * INTO v_location;
+
+        INSERT INTO location_verifications (location_id, status)
+        VALUES (v_location.id, 'unverified');
+
+        v_locations := v_locations || jsonb_build_array(to_jsonb(v_location));
+    END LOOP;
+
+    RETURN jsonb_build_object('status', 'ok', 'locations', v_locations);
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,36 @@
+-- Migration: Commit-ordered cursor for delta sync (GET /api/sync)
+-- Apply after sync_migration.sql.
+--
+-- change_log.version is drawn when a row is written, not when its transaction
+-- commits. A slow transaction can therefore make a lower version visible after
+-- clients have already synced past it, and they never see that change.
+-- change_id is assigned at commit time instead: a deferred trigger numbers the
+-- transaction's entries while holding a transaction-scoped advisory lock, so
+-- ids are handed out in commit order and a visible id is never followed by a
+-- smaller one. /api/sync uses change_id as its cursor.
+
+ALTER TABLE change_log ADD COLUMN change_id BIGINT;
+CREATE SEQUENCE change_log_change_id_seq;
+
+-- Existing entries keep their version as change_id, so stored client cursors stay valid
+LOCK TABLE change_log IN EXCLUSIVE MODE;
+UPDATE change_log SET change_id = version;
+SELECT setval('change_log_change_id_seq', COALESCE((SELECT MAX(version) FROM change_log), 0) + 1, false);
+
+CREATE UNIQUE INDEX idx_change_log_change_id ON change_log(change_id);
+
+CREATE OR REPLACE FUNCTION assign_change_id() RETURNS trigger AS $$
+BEGIN
+    -- Held until the transaction ends: the next writer numbers its entries only
+    -- once this one has committed (or rolled back)
+    PERFORM pg_advisory_xact_lock(hashtext('change_log_commit_order'));
+    UPDATE change_log SET change_id = nextval('change_log_change_id_seq') WHERE version = NEW.version;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Deferred: runs at COMMIT, after every other statement of the transaction
+CREATE CONSTRAINT TRIGGER change_log_commit_order
+    AFTER INSERT ON change_log
+    DEFERRABLE INITIALLY DEFERRED
+    FOR EACH ROW EXECUTE FUNCTION assign_change_id();
@@ -0,0 +1,47 @@
+-- Migration: Change log for delta sync (GET /api/sync)
+-- Every insert, update and delete on the synced tables appends a row here,
+-- so clients can ask for "everything that changed after version N".
+
+CREATE TABLE change_log (
+    version BIGSERIAL PRIMARY KEY,
+    table_name VARCHAR(50) NOT NULL,
+    row_id INT NOT NULL,
+    operation VARCHAR(10) NOT NULL CHECK (operation IN ('upsert','delete')),
+    changed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX idx_change_log_changed_at ON change_log(changed_at);
+
+CREATE OR REPLACE FUNCTION record_change() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO change_log (table_name, row_id, operation) VALUES (TG_TABLE_NAME, OLD.id, 'delete');
+        RETURN OLD;
+    END IF;
+    INSERT INTO change_log (table_name, row_id, operation) VALUES (TG_TABLE_NAME, NEW.id, 'upsert');
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER locations_change_log
+    AFTER INSERT OR UPDATE OR DELETE ON locations
+    FOR EACH ROW EXECUTE FUNCTION record_change();
+
+CREATE TRIGGER location_verifications_change_log
+    AFTER INSERT OR UPDATE OR DELETE ON location_verifications
+    FOR EACH ROW EXECUTE FUNCTION record_change();
+
+CREATE TRIGGER emergencies_change_log
+    AFTER INSERT OR UPDATE OR DELETE ON emergencies
+    FOR EACH ROW EXECUTE FUNCTION record_change();
+
+-- Seed the log with the rows that already exist so a client syncing from 0 gets the full dataset
+INSERT INTO change_log (table_name, row_id, operation)
+    SELECT 'locations', id, 'upsert' FROM locations ORDER BY id;
+INSERT INTO change_log (table_name, row_id, operation)
+    SELECT 'location_verifications', id, 'upsert' FROM location_verifications ORDER BY id;
+INSERT INTO change_log (table_name, row_id, operation)
+    SELECT 'emergencies', id, 'upsert' FROM emergencies ORDER BY id;
+
+-- Old entries may be pruned (e.g. DELETE FROM change_log WHERE changed_at < NOW() - INTERVAL '90 days');
+-- clients whose version predates the oldest remaining entry are told to resync from 0.
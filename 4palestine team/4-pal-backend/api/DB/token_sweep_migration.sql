@@ -0,0 +1,9 @@
+-- Migration: Indexes for the refresh token sweeper (api/services/token_sweeper.py)
+-- The sweeper repeatedly selects expired or revoked rows in id order; without
+-- these it scans the whole table on every batch.
+
+CREATE INDEX idx_refresh_tokens_expires ON refresh_tokens(expires_at);
+CREATE INDEX idx_refresh_tokens_revoked ON refresh_tokens(id) WHERE NOT is_active;
+
+CREATE INDEX idx_admin_refresh_tokens_expires ON admin_refresh_tokens(expires_at);
+CREATE INDEX idx_admin_refresh_tokens_revoked ON admin_refresh_tokens(id) WHERE NOT is_active;
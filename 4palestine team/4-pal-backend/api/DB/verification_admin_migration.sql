@@ -0,0 +1,7 @@
+-- Migration: Record the admin behind a bulk verification (POST /locations/verify/bulk)
+-- location_verifications.verified_by references users(id), but the bulk route
+-- authenticates with an admin token and admins have no users row. The admin is
+-- stamped here instead and verified_by is left NULL for those updates.
+
+ALTER TABLE location_verifications
+    ADD COLUMN verified_by_admin INT REFERENCES admins(id) ON DELETE SET NULL;
@@ -1,4 +1,32 @@
 # api/extensions.py
-from flask_mail import Mail
+import threading
 
-mail = Mail()  # create global instance (not bound yet)
+
+class LazyMail:
+    """
+    flask_mail.Mail that is imported and bound to the app on first use, so a
+    cold start that never sends an email does not pay for it
+    """
+
+    def __init__(self):
+        self._app = None
+        self._mail = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        # Only remember the app; its MAIL_* config is read when mail is first used
+        self._app = app
+
+    def get(self):
+        if self._mail is None:
+            with self._lock:
+                if self._mail is None:
+                    from flask_mail import Mail
+                    self._mail = Mail(self._app)
+        return self._mail
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+mail = LazyMail()  # create global instance (not bound yet)
@@ -1,40 +1,95 @@
+import os
+
 from flask import Flask
 from flask_cors import CORS
 
-from api.routes.users import users_bp
-from api.routes.contributors import contributors_bp
-from api.routes.locations import locations_bp
-from api.routes.emergencies import emergencies_bp
-from api.routes.auth import auth_bp
-from api.routes.admin_auth import admin_auth_bp
-
-from flask_mail import Mail
 from api.extensions import mail
+from api.routes import error_response
+from api.utils.http_cache import init_http_cache
+from api.utils.metrics import init_metrics
+from api.utils.passwords import PasswordHashingBusy
+
+
+def register_blueprints(app):
+    # Route modules load when an app is built, not when this module is parsed.
+    # This does not make importing api.index cheap: the module-level ``app``
+    # below calls create_app() at import time.
+    from api.routes.users import users_bp
+    from api.routes.contributors import contributors_bp
+    from api.routes.locations import locations_bp
+    from api.routes.emergencies import emergencies_bp
+    from api.routes.auth import auth_bp
+    from api.routes.admin_auth import admin_auth_bp
+    from api.routes.sync import sync_bp
+    from api.routes.export import export_bp
+    from api.routes.ingest import ingest_bp
+    from api.routes.zones import zones_bp
+    from api.routes.heatmap import heatmap_bp
+
+    # Register blueprints with clean route prefixes
+    app.register_blueprint(auth_bp, url_prefix="/api/auth")
+    app.register_blueprint(admin_auth_bp, url_prefix="/api/admin/auth")
+    app.register_blueprint(users_bp, url_prefix="/api/users")
+    app.register_blueprint(contributors_bp, url_prefix="/api/contributors")
+    app.register_blueprint(locations_bp, url_prefix="/api/locations")
+    app.register_blueprint(emergencies_bp, url_prefix="/api/emergencies")
+    app.register_blueprint(sync_bp, url_prefix="/api/sync")
+    app.register_blueprint(export_bp, url_prefix="/api/export")
+    app.register_blueprint(ingest_bp, url_prefix="/api/ingest")
+    app.register_blueprint(zones_bp, url_prefix="/api/zones")
+    app.register_blueprint(heatmap_bp, url_prefix="/api/heatmap")
+
+
+def create_app(start_workers=True):
+    """
+    Build the Flask app
+
+    The Supabase client (api/DB/connection.py) and flask_mail (api/extensions.py)
+    are constructed lazily on first use, so this does no network or SMTP work.
+
+    Args:
+        start_workers (bool): Start the email outbox and token sweeper threads
+    """
+    app = Flask(__name__)
+    CORS(app)
+    # Registered first so its after_request hook runs last and times the whole response
+    init_metrics(app)
+    init_http_cache(app)
+
+    # Mail configuration
+    app.config['MAIL_SERVER'] = 'smtp.gmail.com'
+    app.config['MAIL_PORT'] = 587
+    app.config['MAIL_USE_TLS'] = True
+    app.config['MAIL_USERNAME'] = 'students4pal@gmail.com'
+    app.config['MAIL_PASSWORD'] = 'sjhpshhrjwzkcacs'  
+    app.config['MAIL_DEFAULT_SENDER'] = 'students4pal@gmail.com'
+
+    mail.init_app(app)
 
-app = Flask(__name__)
-CORS(app)
+    # Request bodies are capped (413) so uploads cannot grow without bound
+    app.config['MAX_CONTENT_LENGTH'] = int(os.getenv('MAX_UPLOAD_BYTES', str(16 * 1024 * 1024)))
 
-# Mail configuration
-app.config['MAIL_SERVER'] = 'smtp.gmail.com'
-app.config['MAIL_PORT'] = 587
-app.config['MAIL_USE_TLS'] = True
-app.config['MAIL_USERNAME'] = 'students4pal@gmail.com'
-app.config['MAIL_PASSWORD'] = 'sjhpshhrjwzkcacs'  
-app.config['MAIL_DEFAULT_SENDER'] = 'students4pal@gmail.com'
+    register_blueprints(app)
 
-mail.init_app(app)
+    @app.errorhandler(PasswordHashingBusy)
+    def password_hashing_busy(e):
+        # Routes re-raise this past their catch-all handlers so every one answers the same way
+        return error_response("Server is busy, please retry shortly", 503, headers={"Retry-After": "1"})
 
+    @app.route("/")
+    def root():
+        return {"message": "API is running"}
 
-# Register blueprints with clean route prefixes
-app.register_blueprint(auth_bp, url_prefix="/api/auth")
-app.register_blueprint(admin_auth_bp, url_prefix="/api/admin/auth")
-app.register_blueprint(users_bp, url_prefix="/api/users")
-app.register_blueprint(contributors_bp, url_prefix="/api/contributors")
-app.register_blueprint(locations_bp, url_prefix="/api/locations")
-app.register_blueprint(emergencies_bp, url_prefix="/api/emergencies")
+    if start_workers:
+        from api.services.mail_services import start_outbox_workers
+        from api.services.token_sweeper import start_token_sweeper
+        from api.services.recent_emergencies import start_recent_emergency_warmup
+        start_outbox_workers(app)
+        start_token_sweeper()
+        start_recent_emergency_warmup()
 
+    return app
 
-@app.route("/")
-def root():
-    return {"message": "API is running"}
 
+# Vercel and app.py serve this module-level instance
+app = create_app()
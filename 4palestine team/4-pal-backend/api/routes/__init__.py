@@ -1,13 +1,34 @@
-def success_response(data=None, message=None, status=200):
-    return {
+def success_response(data=None, message=None, status=200, meta=None):
+    body = {
         "success": True,
         "message": message,
         "data": data
-    }, status
+    }
+    if meta is not None:
+        body["meta"] = meta
+    return body, status
 
-def error_response(message="An error occurred", status=400, details=None):
-    return {
+def error_response(message="An error occurred", status=400, details=None, headers=None):
+    body = {
         "success": False,
         "message": str(message),  # ensures exceptions become strings
         "details": str(details) if details else None
-    }, status
+    }
+    if headers:
+        return body, status, headers
+    return body, status
+
+def cache_control(max_age=0, public=False, stale_while_revalidate=None):
+    """
+    Declare the Cache-Control policy of a GET route (applied by api/utils/http_cache.py).
+    Put it directly under the route decorator.
+    """
+    directives = ["public" if public else "private", f"max-age={max_age}"]
+    if stale_while_revalidate:
+        directives.append(f"stale-while-revalidate={stale_while_revalidate}")
+    policy = ", ".join(directives)
+
+    def decorator(view):
+        view.cache_policy = policy
+        return view
+    return decorator
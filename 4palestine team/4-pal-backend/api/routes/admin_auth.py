@@ -2,24 +2,33 @@
 Admin authentication routes for admin login/logout/token refresh
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request
 from api.DB.connection import supabase
 from api.routes import success_response, error_response
+from api.utils.passwords import PasswordHashingBusy, hash_password, verify_password
 from api.utils.auth import (
-    hash_password,
-    verify_password, 
     generate_admin_access_token,
     store_admin_refresh_token,
     verify_admin_refresh_token,
     invalidate_admin_refresh_token,
-    require_admin_auth
+    invalidate_admin_cache,
+    admin_cache,
+    refresh_token_cache,
+    upgrade_password_hash,
+    require_admin_auth,
+    require_admin_or_cron_auth
 )
+from api.utils.rate_limit import rate_limit
+from api.utils.idempotency import idempotency_cache
+from api.services.mail_services import drain_outbox
+from api.services.token_sweeper import sweep_refresh_tokens
 from datetime import datetime, timezone
 
 admin_auth_bp = Blueprint("admin_auth", __name__)
 
 
 @admin_auth_bp.route("/login", methods=["POST"])
+@rate_limit("admin_login", ip="10/minute", email="5/minute")
 def admin_login():
     """Admin login with email and password"""
     try:
@@ -48,6 +57,7 @@ def admin_login():
         # Verify password
         if not verify_password(password, admin['password_hash']):
             return error_response("Invalid credentials", 401)
+        upgrade_password_hash("admins", admin['id'], password, admin['password_hash'])
         
         # Update last login
         supabase.table("admins")\
@@ -69,6 +79,8 @@ def admin_login():
             }
         })
         
+    except PasswordHashingBusy:
+        raise
     except Exception as e:
         return error_response(f"Login failed: {str(e)}", 500)
 
@@ -134,6 +146,7 @@ def admin_logout():
         
         # Invalidate the refresh token
         success = invalidate_admin_refresh_token(refresh_token)
+        invalidate_admin_cache(request.current_admin['id'])
         
         if success:
             return success_response({"message": "Logged out successfully"})
@@ -166,6 +179,7 @@ def admin_profile():
 
 @admin_auth_bp.route("/change-password", methods=["POST"])
 @require_admin_auth
+@rate_limit("change_password", ip="20/minute", account="5/15minutes")
 def admin_change_password():
     """Change admin password"""
     try:
@@ -206,8 +220,46 @@ def admin_change_password():
             .update({"password_hash": new_password_hash})\
             .eq("id", admin_id)\
             .execute()
+        invalidate_admin_cache(admin_id)
         
         return success_response({"message": "Password changed successfully"})
         
+    except PasswordHashingBusy:
+        raise
     except Exception as e:
-        return error_response(f"Password change failed: {str(e)}", 500)
\ No newline at end of file
+        return error_response(f"Password change failed: {str(e)}", 500)
+
+
+@admin_auth_bp.route("/cache/stats", methods=["GET"])
+@require_admin_auth
+def admin_cache_stats():
+    """Hit/miss counters of the admin identity, refresh token and idempotency caches"""
+    return success_response({
+        "admin_cache": admin_cache.stats(),
+        "refresh_token_cache": refresh_token_cache.stats(),
+        "idempotency_cache": idempotency_cache.stats()
+    })
+
+
+@admin_auth_bp.route("/tokens/sweep", methods=["POST"])
+@require_admin_auth
+def admin_sweep_tokens():
+    """Delete expired and revoked refresh tokens now and report the rows reclaimed"""
+    try:
+        return success_response(sweep_refresh_tokens())
+    except Exception as e:
+        return error_response(f"Token sweep failed: {str(e)}", 500)
+
+
+@admin_auth_bp.route("/outbox/drain", methods=["GET", "POST"])
+@require_admin_or_cron_auth
+def admin_drain_outbox():
+    """
+    Deliver due outbox emails on this request. Serverless deployments freeze the
+    background outbox workers between invocations, so vercel.json schedules this
+    route (GET, as Vercel Cron Jobs call it).
+    """
+    try:
+        return success_response({"processed": drain_outbox(current_app._get_current_object())})
+    except Exception as e:
+        return error_response(f"Outbox drain failed: {str(e)}", 500)
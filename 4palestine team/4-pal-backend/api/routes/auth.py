@@ -2,18 +2,21 @@
 Authentication routes for user and contributor login/logout/token refresh
 """
 
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request
 from api.DB.connection import supabase
 from api.routes import success_response, error_response
+from api.utils.passwords import PasswordHashingBusy, hash_password, verify_password
 from api.utils.auth import (
-    hash_password,
-    verify_password, 
     generate_access_token,
     store_refresh_token,
+    new_refresh_token,
     verify_refresh_token,
     invalidate_refresh_token,
+    invalidate_refresh_token_cache,
+    upgrade_password_hash,
     require_any_auth
 )
+from api.utils.rate_limit import rate_limit
 
 
 auth_bp = Blueprint("auth", __name__)
@@ -77,6 +80,8 @@ def register_user():
             status=201
         )
         
+    except PasswordHashingBusy:
+        raise
     except Exception as e:
         return error_response(str(e), 500)
 
@@ -103,55 +108,31 @@ def register_contributor():
         if contributor_type not in ['individual', 'organization']:
             return error_response("Invalid contributor type", 400)
         
-        # Check if user already exists
-        existing_user = supabase.table("users").select("id").eq("email", email).execute()
-        if existing_user.data:
-            return error_response("User with this email already exists", 409)
-        
-        # Hash password and prepare user data
+        # Users, contributor_data and the first refresh token are written in one
+        # transaction (api/DB/rpc_functions.sql); the email check happens there too
         password_hash = hash_password(password)
-        user_data = {
-            'email': email,
-            'password_hash': password_hash,
-            'user_type': 'contributor',
-            'first_name': data.get('first_name'),
-            'last_name': data.get('last_name'),
-            'phone_number': data.get('phone_number'),
-            'preferred_language': data.get('preferred_language', 'en')
-        }
-        
-        # Insert user first
-        user_response = supabase.table("users").insert(user_data).execute()
-        if not user_response.data:
-            return error_response("User registration failed", 500)
-            
-        user = user_response.data[0]
-        
-        # Prepare contributor data
-        contributor_password_hash = hash_password(password)  # Separate password for contributor
-        contributor_data = {
-            'user_id': user['id'],
-            'contributor_type': contributor_type,
-            'verification_status': 'pending',
-            'verified': False,
-            'motivation': data.get('motivation'),
-            'password_hash': contributor_password_hash
-        }
-        
-        # Insert contributor data
-        contributor_response = supabase.table("contributor_data").insert(contributor_data).execute()
-        if not contributor_response.data:
+        refresh_token, refresh_token_hash, refresh_expires_at = new_refresh_token()
+        result = supabase.rpc("register_contributor", {
+            'p_email': email,
+            'p_password_hash': password_hash,
+            'p_contributor_type': contributor_type,
+            'p_first_name': data.get('first_name'),
+            'p_last_name': data.get('last_name'),
+            'p_phone_number': data.get('phone_number'),
+            'p_preferred_language': data.get('preferred_language', 'en'),
+            'p_motivation': data.get('motivation'),
+            'p_refresh_token_hash': refresh_token_hash,
+            'p_refresh_expires_at': refresh_expires_at.replace(tzinfo=None).isoformat()
+        }).execute().data or {}
+        
+        if result.get('status') == 'email_taken':
+            return error_response("User with this email already exists", 409)
+        if result.get('status') != 'ok':
             return error_response("Contributor registration failed", 500)
             
-        contributor = contributor_response.data[0]
-        
-        # Generate tokens
+        user = result['user']
+        contributor = result['contributor']
         access_token = generate_access_token(user['id'], 'contributor', contributor['id'])
-        refresh_token = store_refresh_token(contributor_id=contributor['id'])
-        
-        # Remove password_hash from responses
-        user.pop('password_hash', None)
-        contributor.pop('password_hash', None)
         
         return success_response(
             data={
@@ -164,11 +145,14 @@ def register_contributor():
             status=201
         )
         
+    except PasswordHashingBusy:
+        raise
     except Exception as e:
         return error_response(str(e), 500)
 
 
 @auth_bp.route("/login/user", methods=["POST"])
+@rate_limit("login", ip="20/minute", email="5/minute")
 def login_user():
     """Login user with email and password"""
     try:
@@ -196,6 +180,7 @@ def login_user():
         # Verify password
         if not user.get('password_hash') or not verify_password(password, user['password_hash']):
             return error_response("Invalid email or password", 401)
+        upgrade_password_hash("users", user['id'], password, user['password_hash'])
         
         # Generate tokens
         access_token = generate_access_token(user['id'], 'user')
@@ -211,11 +196,14 @@ def login_user():
             'token_type': 'Bearer'
         })
         
+    except PasswordHashingBusy:
+        raise
     except Exception as e:
         return error_response(str(e), 500)
 
 
 @auth_bp.route("/login/contributor", methods=["POST"])
+@rate_limit("login", ip="20/minute", email="5/minute")
 def login_contributor():
     """Login contributor with email and password"""
     try:
@@ -248,8 +236,12 @@ def login_contributor():
         password_valid = False
         if contributor_data.get('password_hash'):
             password_valid = verify_password(password, contributor_data['password_hash'])
+            if password_valid:
+                upgrade_password_hash("contributor_data", contributor_data['id'], password, contributor_data['password_hash'])
         elif user.get('password_hash'):
             password_valid = verify_password(password, user['password_hash'])
+            if password_valid:
+                upgrade_password_hash("users", user['id'], password, user['password_hash'])
         
         if not password_valid:
             return error_response("Invalid email or password", 401)
@@ -275,6 +267,8 @@ def login_contributor():
             'token_type': 'Bearer'
         })
         
+    except PasswordHashingBusy:
+        raise
     except Exception as e:
         return error_response(str(e), 500)
 
@@ -412,6 +406,7 @@ def get_current_user():
 
 @auth_bp.route("/change-password", methods=["POST"])
 @require_any_auth
+@rate_limit("change_password", ip="20/minute", account="5/15minutes")
 def change_password():
     """Change password for authenticated user or contributor"""
     try:
@@ -445,13 +440,7 @@ def change_password():
             # Verify current password
             if not verify_password(current_password, user_response.data['password_hash']):
                 return error_response("Current password is incorrect", 401)
-            
-            # Update with new password
-            new_password_hash = hash_password(new_password)
-            supabase.table("users")\
-                .update({'password_hash': new_password_hash})\
-                .eq("id", user_id)\
-                .execute()
+            contributor_id = None
                 
         elif user_type == 'contributor':
             # Update contributor password
@@ -482,27 +471,28 @@ def change_password():
             # Verify current password
             if not verify_password(current_password, current_hash):
                 return error_response("Current password is incorrect", 401)
-            
-            # Update with new password
-            new_password_hash = hash_password(new_password)
-            supabase.table("contributor_data")\
-                .update({'password_hash': new_password_hash})\
-                .eq("id", contributor_id)\
-                .execute()
-        
-        # Invalidate all existing refresh tokens for security
-        if user_type == 'user':
-            supabase.table('refresh_tokens')\
-                .update({'is_active': False})\
-                .eq('user_id', user_id)\
-                .execute()
         else:
-            supabase.table('refresh_tokens')\
-                .update({'is_active': False})\
-                .eq('contributor_id', current_user['contributor_id'])\
-                .execute()
+            return error_response("Invalid account type", 400)
+        
+        # Store the new hash and invalidate all existing refresh tokens in one transaction
+        new_password_hash = hash_password(new_password)
+        result = supabase.rpc("change_password_and_revoke", {
+            'p_user_id': user_id,
+            'p_contributor_id': contributor_id,
+            'p_password_hash': new_password_hash
+        }).execute().data or {}
+        if result.get('status') == 'not_found':
+            return error_response("Contributor not found" if contributor_id else "User not found", 404)
+        if result.get('status') != 'ok':
+            return error_response("Password change failed", 500)
+        if contributor_id:
+            invalidate_refresh_token_cache(contributor_id=contributor_id)
+        else:
+            invalidate_refresh_token_cache(user_id=user_id)
         
         return success_response({"message": "Password changed successfully"})
         
+    except PasswordHashingBusy:
+        raise
     except Exception as e:
         return error_response(str(e), 500)
\ No newline at end of file
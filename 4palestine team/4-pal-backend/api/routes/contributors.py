@@ -2,19 +2,27 @@ from flask import Blueprint, request
 from api.DB.connection import supabase
 from api.routes import success_response, error_response
 from api.utils.auth import require_any_auth, require_contributor_auth, is_admin_authenticated
+from api.utils.idempotency import idempotent
+from api.utils.query import ListSpec, QueryError, run_list_query
 
 contributors_bp = Blueprint("contributors", __name__)
 
+# password_hash is deliberately not listed so it is never selected
+CONTRIBUTOR_LIST_SPEC = ListSpec(
+    table="contributor_data",
+    columns=("id", "user_id", "contributor_type", "verification_status", "verified", "motivation", "created_at"),
+    filters=("user_id", "contributor_type", "verification_status", "verified"),
+    sortable=("id", "created_at"),
+)
+
 @contributors_bp.route("", methods=["GET"])
 @require_any_auth
 def list_contributors():
     try:
-        response = supabase.table("contributor_data").select("*").execute()
-        # Remove password hashes from response
-        if response.data:
-            for contributor in response.data:
-                contributor.pop('password_hash', None)
-        return success_response(response.data)
+        rows, meta = run_list_query(CONTRIBUTOR_LIST_SPEC, request.args)
+        return success_response(rows, meta=meta)
+    except QueryError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         return error_response(str(e), 500)
 
@@ -33,11 +41,12 @@ def get_contributor(contributor_id):
         return error_response(str(e), 500)
 
 @contributors_bp.route("", methods=["POST"])
+@idempotent
 def create_contributor():
     try:
         data = request.json
         response = supabase.table("contributor_data").insert(data).execute()
-        return success_response(response.data, 201)
+        return success_response(response.data, status=201)
     except Exception as e:
         return error_response(str(e), 500)
 
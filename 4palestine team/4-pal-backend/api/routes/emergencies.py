@@ -1,18 +1,157 @@
-from flask import Blueprint, request
+import json
+from flask import Blueprint, request, Response, stream_with_context
 from api.DB.connection import supabase
-from api.routes import success_response, error_response
+from api.routes import success_response, error_response, cache_control
+from api.services.emergency_updates import (
+    EMERGENCY_TYPES, emergencies_created, emergencies_updated, emergency_deleted,
+)
+from api.services.event_broker import emergency_broker, CLOSED
+from api.services.incident_clusters import incident_clusterer
+from api.services.recent_emergencies import recent_emergencies
+from api.utils.idempotency import idempotent
+from api.utils.geo import in_bbox, parse_bbox, to_float, validate_coordinates
+from api.utils.query import ListSpec, QueryError, run_list_query
 
 emergencies_bp = Blueprint("emergencies", __name__)
 
+STREAM_KEEPALIVE_SECONDS = 15
+STREAM_RETRY_MS = 3000
+NEARBY_MAX_RADIUS_M = 50000
+NEARBY_DEFAULT_WINDOW_MIN = 60
+
+# emergencies has no created_at column; activated_at plays that role
+EMERGENCY_LIST_SPEC = ListSpec(
+    table="emergencies",
+    columns=(
+        "id", "activated_by", "latitude", "longitude", "accuracy", "address",
+        "activated_at", "emergency_type", "description", "estimated_victims", "medical_info",
+    ),
+    filters=("activated_by", "emergency_type"),
+    sortable=("id", "activated_at"),
+)
+
 @emergencies_bp.route("", methods=["GET"])
+@cache_control(max_age=5, public=True)
 def list_emergencies():
     try:
-        response = supabase.table("emergencies").select("*").execute()
-        return success_response(response.data)
+        rows, meta = run_list_query(EMERGENCY_LIST_SPEC, request.args)
+        return success_response(rows, meta=meta)
+    except QueryError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+
+def _parse_types(args):
+    if not args.get("emergency_type"):
+        return None
+    types = {t.strip() for t in args["emergency_type"].split(",") if t.strip()}
+    unknown = types - set(EMERGENCY_TYPES)
+    if unknown:
+        raise ValueError(f"Unknown emergency_type: {', '.join(sorted(unknown))}")
+    return types
+
+
+def _stream_filter(args):
+    """
+    Build the event predicate for GET /emergencies/stream
+
+    Raises:
+        ValueError: If emergency_type or bbox is invalid
+    """
+    types = _parse_types(args)
+    bbox = parse_bbox(args["bbox"]) if args.get("bbox") else None
+    if types is None and bbox is None:
+        return None
+
+    def predicate(event):
+        data = event["data"]
+        if types is not None and data.get("emergency_type") not in types:
+            return False
+        if bbox is not None:
+            lat, lon = to_float(data.get("latitude")), to_float(data.get("longitude"))
+            if lat is None or lon is None or not in_bbox(lat, lon, bbox):
+                return False
+        return True
+
+    return predicate
+
+
+def _format_event(event):
+    payload = json.dumps(event["data"], default=str)
+    return f"id: {event['id']}\nevent: {event['event']}\ndata: {payload}\n\n"
+
+
+@emergencies_bp.route("/stream", methods=["GET"])
+def stream_emergencies():
+    try:
+        predicate = _stream_filter(request.args)
+    except ValueError as e:
+        return error_response(str(e), 400)
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    subscription = emergency_broker.subscribe(predicate, last_event_id)
+
+    def generate():
+        try:
+            yield f"retry: {STREAM_RETRY_MS}\n\n"
+            while True:
+                event = subscription.get(timeout=STREAM_KEEPALIVE_SECONDS)
+                if event is CLOSED:
+                    break
+                if event is None:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _format_event(event)
+        finally:
+            subscription.close()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@emergencies_bp.route("/incidents", methods=["GET"])
+@cache_control(max_age=5, public=True)
+def list_incidents():
+    try:
+        try:
+            types = _parse_types(request.args)
+            bbox = parse_bbox(request.args["bbox"]) if request.args.get("bbox") else None
+            min_count = int(request.args.get("min_count", 1))
+        except ValueError as e:
+            return error_response(str(e), 400)
+
+        return success_response(incident_clusterer.incidents(types, bbox, min_count))
+    except Exception as e:
+        return error_response(str(e), 500)
+
+@emergencies_bp.route("/nearby", methods=["GET"])
+@cache_control(max_age=5, public=True)
+def nearby_emergencies():
+    try:
+        try:
+            args = request.args
+            if not all(k in args for k in ("lat", "lon", "radius_m")):
+                raise ValueError("lat, lon and radius_m are required")
+            lat, lon, radius_m = float(args["lat"]), float(args["lon"]), float(args["radius_m"])
+            validate_coordinates(lat, lon)
+            if not 0 < radius_m <= NEARBY_MAX_RADIUS_M:
+                raise ValueError(f"radius_m must be between 0 and {NEARBY_MAX_RADIUS_M}")
+            window_min = int(args.get("window_min", min(NEARBY_DEFAULT_WINDOW_MIN, recent_emergencies.window)))
+            if not 1 <= window_min <= recent_emergencies.window:
+                raise ValueError(f"window_min must be between 1 and {recent_emergencies.window}")
+            types = _parse_types(args)
+        except ValueError as e:
+            return error_response(str(e), 400)
+
+        return success_response(recent_emergencies.nearby(lat, lon, radius_m, window_min, types))
     except Exception as e:
         return error_response(str(e), 500)
 
 @emergencies_bp.route("/<int:emergency_id>", methods=["GET"])
+@cache_control(max_age=5, public=True)
 def get_emergency(emergency_id):
     try:
         response = supabase.table("emergencies").select("*").eq("id", emergency_id).single().execute()
@@ -23,11 +162,13 @@ def get_emergency(emergency_id):
         return error_response(str(e), 500)
 
 @emergencies_bp.route("", methods=["POST"])
+@idempotent
 def create_emergency():
     try:
         data = request.json
         response = supabase.table("emergencies").insert(data).execute()
-        return success_response(response.data, 201)
+        emergencies_created(response.data)
+        return success_response(response.data, status=201)
     except Exception as e:
         return error_response(str(e), 500)
 
@@ -38,6 +179,7 @@ def update_emergency(emergency_id):
         response = supabase.table("emergencies").update(data).eq("id", emergency_id).execute()
         if not response.data:
             return error_response("Emergency not found", 404)
+        emergencies_updated(response.data)
         return success_response(response.data)
     except Exception as e:
         return error_response(str(e), 500)
@@ -48,6 +190,7 @@ def delete_emergency(emergency_id):
         response = supabase.table("emergencies").delete().eq("id", emergency_id).execute()
         if not response.data:
             return error_response("Emergency not found", 404)
+        emergency_deleted(emergency_id, response.data)
         return success_response({"message": "Emergency deleted"})
     except Exception as e:
         return error_response(str(e), 500)
@@ -0,0 +1,147 @@
+"""
+Streaming NDJSON / CSV exports of emergencies and locations.
+
+Rows are read in id order one keyset page at a time and written to the
+response as each page arrives, so memory stays flat however large the table
+is and the client starts receiving data after the first page.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import datetime, timezone
+
+from flask import Blueprint, Response, request, stream_with_context
+from api.routes import error_response
+from api.routes.emergencies import EMERGENCY_LIST_SPEC
+from api.routes.locations import LOCATION_LIST_SPEC
+from api.utils.auth import require_any_auth
+from api.utils.geo import parse_bbox
+from api.utils.query import QueryError, apply_keyset, build_select, parse_list_args
+
+export_bp = Blueprint("export", __name__)
+
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+
+# dataset -> (list spec, timestamp column used by ?from= / ?to=)
+EXPORTS = {
+    "emergencies": (EMERGENCY_LIST_SPEC, "activated_at"),
+    "locations": (LOCATION_LIST_SPEC, "created_at"),
+}
+MIMETYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _parse_time(value, name):
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).isoformat()
+    except ValueError:
+        raise QueryError(f"{name} must be an ISO 8601 date or datetime")
+
+
+def _parse_export_args(spec, time_column, args):
+    """
+    Validate export query parameters
+
+    Returns:
+        tuple: (fields, query builder factory)
+
+    Raises:
+        QueryError: If a parameter is invalid
+    """
+    params = parse_list_args(spec, {k: v for k, v in args.items() if k not in ("sort", "limit", "cursor")})
+    fields = params["fields"]
+    select_fields = fields if "id" in fields else fields + ["id"]
+
+    start = _parse_time(args["from"], "from") if args.get("from") else None
+    end = _parse_time(args["to"], "to") if args.get("to") else None
+    bbox = None
+    if args.get("bbox"):
+        try:
+            bbox = parse_bbox(args["bbox"])
+        except ValueError as e:
+            raise QueryError(str(e))
+
+    def base_query():
+        query = build_select(spec, select_fields, params["filters"])
+        if start:
+            query = query.gte(time_column, start)
+        if end:
+            query = query.lt(time_column, end)
+        if bbox:
+            min_lat, min_lon, max_lat, max_lon = bbox
+            query = query.gte("latitude", min_lat).lte("latitude", max_lat)\
+                .gte("longitude", min_lon).lte("longitude", max_lon)
+        return query
+
+    return fields, base_query
+
+
+def _pages(base_query):
+    """Yield pages of rows in id order until the table is exhausted"""
+    after = None
+    while True:
+        rows = apply_keyset(base_query(), "id", False, after, EXPORT_PAGE_SIZE).execute().data or []
+        if rows:
+            yield rows
+        if len(rows) < EXPORT_PAGE_SIZE:
+            return
+        after = (rows[-1]["id"], rows[-1]["id"])
+
+
+def _ndjson(fields, pages):
+    try:
+        for rows in pages:
+            yield "".join(json.dumps({f: row.get(f) for f in fields}, default=str) + "\n" for row in rows)
+    except Exception as e:
+        # Headers are already sent: re-raise so the server aborts the chunked
+        # response, as for CSV, and the client sees a failed download
+        print("export error:", e)
+        raise
+
+
+def _csv(fields, pages):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def flush():
+        data = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return data
+
+    # The header goes out before the first query so the download starts at once
+    writer.writerow(fields)
+    yield flush()
+    try:
+        for rows in pages:
+            for row in rows:
+                writer.writerow(["" if row.get(f) is None else row.get(f) for f in fields])
+            yield flush()
+    except Exception as e:
+        # No in-band way to flag a truncated CSV: the response is aborted as for NDJSON
+        print("export error:", e)
+        raise
+
+
+@export_bp.route("/<any(emergencies, locations):dataset>.<any(ndjson, csv):fmt>", methods=["GET"])
+@require_any_auth
+def export(dataset, fmt):
+    """Stream every matching row of a dataset (see api/docs/export.md for parameters)"""
+    spec, time_column = EXPORTS[dataset]
+    try:
+        fields, base_query = _parse_export_args(spec, time_column, request.args)
+    except QueryError as e:
+        return error_response(str(e), 400)
+
+    body = _ndjson(fields, _pages(base_query)) if fmt == "ndjson" else _csv(fields, _pages(base_query))
+    filename = f"{dataset}-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.{fmt}"
+    return Response(
+        stream_with_context(body),
+        mimetype=MIMETYPES[fmt],
+        headers={
+            "Content-Disposition": f'attachment; filename="{filename}"',
+            "Cache-Control": "no-store",
+            "X-Accel-Buffering": "no",
+        },
+    )
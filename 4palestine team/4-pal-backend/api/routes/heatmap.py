@@ -0,0 +1,38 @@
+"""
+Density tiles of emergencies and location reports for the admin dashboard,
+served from the in-memory tile pyramid (api/services/heatmap.py).
+"""
+
+from flask import Blueprint, request
+from api.routes import success_response, error_response, cache_control
+from api.services.heatmap import LAYERS, TILE_BINS, heatmap_index
+from api.utils.auth import require_admin_auth
+
+heatmap_bp = Blueprint("heatmap", __name__)
+
+
+def _parse_layers(value):
+    layers = [layer.strip() for layer in value.split(",") if layer.strip()] if value else list(LAYERS)
+    unknown = set(layers) - set(LAYERS)
+    if unknown or not layers:
+        raise ValueError(f"layer must be one or more of {', '.join(LAYERS)}")
+    return [layer for layer in LAYERS if layer in layers]
+
+
+@heatmap_bp.route("/<int:z>/<int:x>/<int:y>", methods=["GET"])
+@cache_control(max_age=60)
+@require_admin_auth
+def heatmap_tile(z, x, y):
+    try:
+        try:
+            layers = _parse_layers(request.args.get("layer"))
+        except ValueError as e:
+            return error_response(str(e), 400)
+        if z > heatmap_index.max_zoom:
+            return error_response(f"z must be between 0 and {heatmap_index.max_zoom}", 400)
+        if x >= 1 << z or y >= 1 << z:
+            return error_response("Tile out of range", 404)
+        layers = heatmap_index.tile(z, x, y, layers)
+        return success_response({"z": z, "x": x, "y": y, "bins": TILE_BINS, "layers": layers})
+    except Exception as e:
+        return error_response(str(e), 500)
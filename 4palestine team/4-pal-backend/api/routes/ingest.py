@@ -0,0 +1,231 @@
+"""
+Batched ingestion of events a device queued while it was offline.
+
+A reconnecting app posts its whole backlog of SOS events, location marks and
+location reports in one request. Every event is validated first, then each
+table gets a single multi-row insert, and the response lists the outcome and
+new id of every event in submission order.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+
+from flask import Blueprint, request
+from api.DB.connection import supabase
+from api.routes import success_response, error_response
+from api.services.emergency_updates import EMERGENCY_TYPES, emergencies_created
+from api.services.heatmap import heatmap_index
+from api.services.location_import import insert_locations, validate_location
+from api.utils.auth import require_any_auth
+from api.utils.idempotency import idempotent
+
+ingest_bp = Blueprint("ingest", __name__)
+
+INGEST_MAX_EVENTS = int(os.getenv("INGEST_MAX_EVENTS", "500"))
+# Client timestamps further ahead of the server clock than this are replaced by the receive time
+INGEST_MAX_CLOCK_SKEW_SECONDS = int(os.getenv("INGEST_MAX_CLOCK_SKEW_SECONDS", "300"))
+
+EVENT_TYPES = ("sos", "location", "report")
+# event type -> (table, owner column, timestamp column)
+EVENT_TABLES = {
+    "sos": ("emergencies", "activated_by", "activated_at"),
+    "location": ("locations", "created_by", "created_at"),
+    "report": ("location_reports", "reported_by", "reported_at"),
+}
+SOS_TEXT_COLUMNS = ("address", "description", "medical_info")
+SOS_INT_COLUMNS = ("accuracy", "estimated_victims")
+
+
+def _parse_client_time(value, received_at):
+    """
+    Normalise a client timestamp to a naive UTC ISO string (the columns are
+    ``timestamp`` without time zone); naive input is taken as UTC
+
+    Raises:
+        ValueError: If the value is not an ISO 8601 datetime
+    """
+    if not isinstance(value, str):
+        raise ValueError("client_ts must be an ISO 8601 datetime")
+    parsed = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    # A device with a wrong clock must not lose its SOS, only its timestamp
+    if parsed > received_at + timedelta(seconds=INGEST_MAX_CLOCK_SKEW_SECONDS):
+        parsed = received_at
+    return parsed.isoformat()
+
+
+def _validate_sos(event):
+    errors = []
+    row = {}
+    for column, low, high in (("latitude", -90, 90), ("longitude", -180, 180)):
+        try:
+            row[column] = float(event.get(column))
+            if not low <= row[column] <= high:
+                errors.append(f"{column} must be between {low} and {high}")
+        except (TypeError, ValueError):
+            errors.append(f"{column} is required and must be a number")
+
+    if event.get("emergency_type") is not None:
+        if event["emergency_type"] not in EMERGENCY_TYPES:
+            errors.append(f"emergency_type must be one of: {', '.join(EMERGENCY_TYPES)}")
+        row["emergency_type"] = event["emergency_type"]
+
+    for column in SOS_INT_COLUMNS:
+        if event.get(column) is not None:
+            try:
+                row[column] = int(event[column])
+                if row[column] < 0:
+                    errors.append(f"{column} must not be negative")
+            except (TypeError, ValueError):
+                errors.append(f"{column} must be an integer")
+
+    for column in SOS_TEXT_COLUMNS:
+        if event.get(column) is not None:
+            row[column] = str(event[column])
+    return row, errors
+
+
+def _validate_report(event, location_refs):
+    errors = []
+    row = {}
+    if event.get("location_client_id") is not None:
+        # Report on a location created earlier in the same batch
+        ref = event["location_client_id"]
+        if not isinstance(ref, (str, int)) or ref not in location_refs:
+            errors.append("location_client_id does not match a location event in this batch")
+    else:
+        try:
+            row["location_id"] = int(event.get("location_id"))
+        except (TypeError, ValueError):
+            errors.append("location_id or location_client_id is required")
+    if event.get("description") is not None:
+        row["description"] = str(event["description"])
+    return row, errors
+
+
+def _validate(event, owner, received_at, location_refs):
+    """
+    Validate one event
+
+    Returns:
+        tuple: (clean row dict, list of error messages)
+    """
+    if not isinstance(event, dict):
+        return None, ["event must be an object"]
+    event_type = event.get("type")
+    if event_type not in EVENT_TYPES:
+        return None, [f"type must be one of: {', '.join(EVENT_TYPES)}"]
+    _, owner_column, time_column = EVENT_TABLES[event_type]
+
+    if event_type == "sos":
+        row, errors = _validate_sos(event)
+    elif event_type == "location":
+        raw = dict(event)
+        # Devices submit on behalf of their own account; only admins (no user id) may name the owner
+        if owner is not None:
+            raw["created_by"] = owner
+        row, errors = validate_location(raw)
+    else:
+        row, errors = _validate_report(event, location_refs)
+
+    if owner is not None:
+        row[owner_column] = owner
+    elif event_type != "location" and event.get(owner_column) is not None:
+        try:
+            row[owner_column] = int(event[owner_column])
+        except (TypeError, ValueError):
+            errors.append(f"{owner_column} must be a user id")
+
+    if event.get("client_ts") is not None:
+        try:
+            row[time_column] = _parse_client_time(event["client_ts"], received_at)
+        except ValueError:
+            errors.append("client_ts must be an ISO 8601 datetime")
+    return row, errors
+
+
+def _insert(table, pending, results):
+    """Multi-row insert of [(index, row)], recording each event's id or the failure"""
+    if not pending:
+        return []
+    rows = [row for _, row in pending]
+    try:
+        if table == "locations":
+            inserted = insert_locations(rows)
+        else:
+            inserted = supabase.table(table).insert(rows).execute().data or []
+            if len(inserted) != len(rows):
+                raise Exception(f"{table} insert returned an unexpected number of rows")
+    except Exception as e:
+        for index, _ in pending:
+            results[index].update(status="failed", errors=[str(e)])
+        return []
+    for (index, _), created in zip(pending, inserted):
+        results[index].update(status="created", id=created["id"])
+    return inserted
+
+
+@ingest_bp.route("/batch", methods=["POST"])
+@require_any_auth
+@idempotent
+def ingest_batch():
+    """Validate and store a mixed batch of queued events (see api/docs/ingest.md)"""
+    try:
+        data = request.get_json(silent=True)
+        events = data.get("events") if isinstance(data, dict) else data
+        if not isinstance(events, list) or not events:
+            return error_response("Body must be a non-empty array of events or {\"events\": [...]}", 400)
+        if len(events) > INGEST_MAX_EVENTS:
+            return error_response(f"A batch is limited to {INGEST_MAX_EVENTS} events", 413)
+
+        owner = request.current_user.get("user_id")
+        received_at = datetime.now(timezone.utc).replace(tzinfo=None)
+        location_refs = {
+            event["client_id"]: index for index, event in enumerate(events)
+            if isinstance(event, dict) and event.get("type") == "location" and isinstance(event.get("client_id"), (str, int))
+        }
+
+        results = []
+        pending = {event_type: [] for event_type in EVENT_TYPES}
+        for index, event in enumerate(events):
+            result = {"index": index, "client_id": event.get("client_id") if isinstance(event, dict) else None}
+            results.append(result)
+            row, errors = _validate(event, owner, received_at, location_refs)
+            if errors:
+                result.update(type=event.get("type") if isinstance(event, dict) else None,
+                              status="invalid", errors=errors)
+                continue
+            result["type"] = event["type"]
+            pending[event["type"]].append((index, row))
+
+        emergencies = _insert("emergencies", pending["sos"], results)
+        emergencies_created(emergencies)
+
+        locations = _insert("locations", pending["location"], results)
+
+        # Reports on batch locations can only be written once those have ids
+        reports = []
+        for index, row in pending["report"]:
+            client_id = events[index].get("location_client_id")
+            if client_id is not None:
+                location = results[location_refs[client_id]]
+                if location.get("status") != "created":
+                    results[index].update(status="failed", errors=["Referenced location was not created"])
+                    continue
+                row["location_id"] = location["id"]
+            reports.append((index, row))
+        created_reports = _insert("location_reports", reports, results)
+        try:
+            heatmap_index.add_reports(created_reports, {location["id"]: location for location in locations})
+        except Exception as e:
+            # The reports are stored; the heatmap catches up on its next reload
+            print("heatmap report update error:", e)
+
+        summary = {"total": len(results)}
+        for status in ("created", "invalid", "failed"):
+            summary[status] = sum(1 for r in results if r["status"] == status)
+        return success_response({"summary": summary, "results": results})
+
+    except Exception as e:
+        return error_response(str(e), 500)
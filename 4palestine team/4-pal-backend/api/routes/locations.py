@@ -1,18 +1,163 @@
+from datetime import datetime, timezone
+
 from flask import Blueprint, request
+from werkzeug.exceptions import RequestEntityTooLarge
 from api.DB.connection import supabase
-from api.routes import success_response, error_response
+from api.routes import success_response, error_response, cache_control
+from api.services.danger_zones import danger_zone_index
+from api.services.location_index import (
+    location_index, local_time_of_day, parse_time_of_day, LOCATION_CATEGORIES, WEEKDAYS,
+)
+from api.services.location_import import import_locations, iter_csv_rows, iter_geojson_rows
+from api.utils.auth import require_admin_auth, require_any_auth
+from api.utils.geo import parse_bbox, validate_coordinates
+from api.utils.idempotency import idempotent
+from api.utils.query import ListSpec, QueryError, run_list_query
 
 locations_bp = Blueprint("locations", __name__)
 
+MAX_RADIUS_M = 100000
+NEAREST_DEFAULT_K = 5
+NEAREST_MAX_K = 50
+
+# Bulk moderation: ids per request, and ids per in_() filter (it travels in the URL)
+BULK_MAX_IDS = 5000
+BULK_CHUNK_SIZE = 200
+VERIFICATION_STATUSES = ("verified", "unverified")
+
+LOCATION_LIST_SPEC = ListSpec(
+    table="locations",
+    columns=(
+        "id", "created_by", "latitude", "longitude", "address", "category", "created_at",
+        "title", "description", "organization", "capacity", "start_time", "end_time",
+    ),
+    filters=("category", "created_by", "organization"),
+    sortable=("id", "created_at"),
+)
+
+
+def _parse_geo_query(args):
+    """
+    Read the optional geo filters of GET /locations
+
+    Returns:
+        dict: Keyword arguments for location_index.query, or None when the
+        request has no lat/lon/radius_m, bbox, open_now or open_at parameters
+
+    Raises:
+        ValueError: If a parameter is missing or malformed
+    """
+    has_point = any(k in args for k in ("lat", "lon", "radius_m"))
+    open_at = _parse_open_at(args)
+    if not has_point and "bbox" not in args and open_at is None:
+        return None
+
+    query = {"open_at": open_at}
+    if has_point:
+        if not all(k in args for k in ("lat", "lon", "radius_m")):
+            raise ValueError("lat, lon and radius_m must be provided together")
+        lat, lon, radius_m = float(args["lat"]), float(args["lon"]), float(args["radius_m"])
+        validate_coordinates(lat, lon)
+        if not 0 < radius_m <= MAX_RADIUS_M:
+            raise ValueError(f"radius_m must be between 0 and {MAX_RADIUS_M}")
+        query.update(lat=lat, lon=lon, radius_m=radius_m)
+    if "bbox" in args:
+        query["bbox"] = parse_bbox(args["bbox"])
+
+    if args.get("category"):
+        query["categories"] = _parse_categories(args["category"])
+    query["verified_only"] = args.get("verified", "").lower() in ("1", "true", "yes")
+    return query
+
+
+def _parse_open_at(args):
+    """
+    Read ``open_now=true`` or ``open_at=HH:MM`` (with an optional ``day``)
+
+    Returns:
+        tuple: (weekday name, minutes after midnight) in the locations' time
+        zone, or None when neither filter is set
+    """
+    if args.get("open_at"):
+        minute = parse_time_of_day(args["open_at"])
+        day = args.get("day", "").strip().lower() or local_time_of_day()[0]
+        if day not in WEEKDAYS:
+            raise ValueError(f"day must be one of {', '.join(WEEKDAYS)}")
+        return day, minute
+    if args.get("open_now", "").lower() in ("1", "true", "yes"):
+        return local_time_of_day()
+    return None
+
+
+def _parse_categories(value):
+    categories = {c.strip() for c in value.split(",") if c.strip()}
+    unknown = categories - set(LOCATION_CATEGORIES)
+    if unknown:
+        raise ValueError(f"Unknown category: {', '.join(sorted(unknown))}")
+    return categories
+
+
+def _parse_nearest_query(args):
+    """
+    Read the parameters of GET /locations/nearest
+
+    Returns:
+        dict: Keyword arguments for location_index.nearest
+
+    Raises:
+        ValueError: If a parameter is missing or malformed
+    """
+    if "lat" not in args or "lon" not in args:
+        raise ValueError("lat and lon are required")
+    lat, lon = float(args["lat"]), float(args["lon"])
+    validate_coordinates(lat, lon)
+    k = int(args.get("k", NEAREST_DEFAULT_K))
+    if not 1 <= k <= NEAREST_MAX_K:
+        raise ValueError(f"k must be between 1 and {NEAREST_MAX_K}")
+    query = {"lat": lat, "lon": lon, "k": k}
+    if args.get("category"):
+        query["categories"] = _parse_categories(args["category"])
+    if "max_distance_m" in args:
+        max_distance_m = float(args["max_distance_m"])
+        if max_distance_m <= 0:
+            raise ValueError("max_distance_m must be positive")
+        query["max_distance_m"] = max_distance_m
+    return query
+
+
 @locations_bp.route("", methods=["GET"])
+@cache_control(max_age=30, public=True, stale_while_revalidate=60)
 def list_locations():
     try:
-        response = supabase.table("locations").select("*").execute()
-        return success_response(response.data)
+        try:
+            geo_query = _parse_geo_query(request.args)
+        except ValueError as e:
+            return error_response(str(e), 400)
+
+        if geo_query is not None:
+            return success_response(location_index.query(**geo_query))
+
+        rows, meta = run_list_query(LOCATION_LIST_SPEC, request.args)
+        return success_response(rows, meta=meta)
+    except QueryError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+@locations_bp.route("/nearest", methods=["GET"])
+@cache_control(max_age=30, public=True, stale_while_revalidate=60)
+def nearest_locations():
+    try:
+        try:
+            query = _parse_nearest_query(request.args)
+        except ValueError as e:
+            return error_response(str(e), 400)
+        return success_response(location_index.nearest(**query))
     except Exception as e:
         return error_response(str(e), 500)
 
 @locations_bp.route("/<int:location_id>", methods=["GET"])
+@cache_control(max_age=60, public=True)
 def get_location(location_id):
     try:
         response = supabase.table("locations").select("*").eq("id", location_id).single().execute()
@@ -24,41 +169,129 @@ def get_location(location_id):
     
 
 @locations_bp.route("/add", methods=["POST"])
+@idempotent
 def create_location():
     try:
         data = request.json
         if not data:
             return error_response("Request body is required", 400)
 
-        # Insert into locations
+        # Location and its verification record are inserted in one transaction
+        # (api/DB/rpc_functions.sql), so a failure leaves neither behind
         try:
-            location_response = supabase.table("locations").insert(data).execute()
+            result = supabase.rpc("create_location_with_verification", {"p_location": data}).execute().data or {}
         except Exception as e:
             return error_response(f"Failed to insert location: {str(e)}", 500)
 
-        if not location_response.data or "id" not in location_response.data[0]:
+        if result.get("status") != "ok":
             return error_response("Location insert did not return an ID", 500)
 
-        location_id = location_response.data[0]["id"]
+        location_index.upsert(result["location"], "unverified")
+        return success_response([result["verification"]], status=201,
+                                meta={"danger_zones": _danger_zones_at(result["location"])})
 
-        # Insert into location_verifications
-        try:
-            body = {
-                "location_id": location_id,
-                "status": "unverified"
-            }
-            verification_response = supabase.table("location_verifications").insert(body).execute()
-        except Exception as e:
-            return error_response(f"Failed to create location verification: {str(e)}", 500)
+    except Exception as e:
+        return error_response(f"Unexpected error: {str(e)}", 500)
 
-        if not verification_response.data:
-            return error_response("Location verification insert failed", 500)
+@locations_bp.route("/bulk", methods=["POST"])
+@require_any_auth
+def bulk_import_locations():
+    try:
+        content_type = (request.mimetype or "").lower()
+        if content_type in ("text/csv", "application/csv"):
+            rows = iter_csv_rows(request.stream, request.mimetype_params.get("charset", "utf-8"))
+        elif content_type in ("application/geo+json", "application/json"):
+            try:
+                rows = iter_geojson_rows(request.stream)
+            except ValueError as e:
+                return error_response(f"Invalid GeoJSON: {str(e)}", 400)
+        else:
+            return error_response("Content-Type must be text/csv or application/geo+json", 415)
 
-        return success_response(verification_response.data, 201)
+        # Users import on behalf of their own account; only admins (no user id) may name the owner
+        report = import_locations(rows, created_by=request.current_user.get("user_id"))
+        return success_response(report)
 
+    except RequestEntityTooLarge:
+        return error_response("Upload is too large", 413)
     except Exception as e:
         return error_response(f"Unexpected error: {str(e)}", 500)
 
+def _danger_zones_at(row):
+    """Active danger zones containing a new location; a failed check is reported as None"""
+    try:
+        return danger_zone_index.containing(float(row["latitude"]), float(row["longitude"]))
+    except Exception as e:
+        print("danger zone check error:", e)
+        return None
+
+
+def _is_admin(admin_id) -> bool:
+    is_admin = supabase.table("admins").select("id").eq("user_id", admin_id).limit(1).execute()
+    return bool(is_admin and is_admin.data)
+
+
+def _verification_stamp(status: str, verified_by=None, verified_by_admin=None) -> dict:
+    # verified_by references users(id); admins authenticated by an admin token
+    # are recorded in verified_by_admin (api/DB/verification_admin_migration.sql)
+    return {
+        "status": status,
+        "verified_by": verified_by,
+        "verified_by_admin": verified_by_admin,
+        "verified_at": datetime.now(timezone.utc).replace(tzinfo=None).isoformat(),
+    }
+
+
+def _parse_location_ids(data):
+    """
+    Read ``location_ids`` from a bulk request body
+
+    Returns:
+        list: Distinct ids in request order
+
+    Raises:
+        ValueError: If the ids are missing, not integers or too many
+    """
+    ids = data.get("location_ids") if isinstance(data, dict) else None
+    if not isinstance(ids, list) or not ids:
+        raise ValueError("location_ids must be a non-empty list")
+    if len(ids) > BULK_MAX_IDS:
+        raise ValueError(f"At most {BULK_MAX_IDS} location_ids per request")
+    try:
+        ids = [int(i) for i in ids]
+    except (TypeError, ValueError):
+        raise ValueError("location_ids must be integers")
+    return list(dict.fromkeys(ids))
+
+
+def _apply_in_chunks(ids, operation):
+    """
+    Run ``operation(chunk)`` over ``ids`` in BULK_CHUNK_SIZE slices
+
+    Args:
+        ids (list): Location ids
+        operation: Callable returning (outcome name, set of ids the chunk affected)
+
+    Returns:
+        dict: {"summary": counts, "results": [{"id", "status"[, "error"]}]} where
+            status is the outcome name, "not_found" or "failed"
+    """
+    results = []
+    for start in range(0, len(ids), BULK_CHUNK_SIZE):
+        chunk = ids[start:start + BULK_CHUNK_SIZE]
+        try:
+            done_status, affected = operation(chunk)
+        except Exception as e:
+            results.extend({"id": i, "status": "failed", "error": str(e)} for i in chunk)
+            continue
+        results.extend({"id": i, "status": done_status if i in affected else "not_found"} for i in chunk)
+
+    summary = {"total": len(results)}
+    for result in results:
+        summary[result["status"]] = summary.get(result["status"], 0) + 1
+    return {"summary": summary, "results": results}
+
+
 @locations_bp.route("/verify", methods=["POST"])
 def verify_location():
     try:
@@ -70,18 +303,17 @@ def verify_location():
         admin_id = data["admin_id"]
         status = data["status"].lower()
 
-        is_admin = supabase.table("admins").select("*").eq("user_id", admin_id).execute()
-        if not is_admin or not hasattr(is_admin, 'data') or len(is_admin.data) ==0:
+        if not _is_admin(admin_id):
             return error_response("Denied, you do not have the necessary permission")
         
-        if status not in ["verified", "unverified"]:
+        if status not in VERIFICATION_STATUSES:
             return error_response("Status must be either 'verified' or 'unverified'", 400)
 
         # Update location_verifications
         try:
             update_response = (
                 supabase.table("location_verifications")
-                .update({"status": status, "verified_by": admin_id})
+                .update(_verification_stamp(status, admin_id))
                 .eq("location_id", location_id)
                 .execute()
             )
@@ -91,6 +323,7 @@ def verify_location():
         if not update_response.data:
             return error_response("Location verification record not found", 404)
 
+        location_index.set_status(int(location_id), status)
         return success_response(update_response.data, 200)
 
     except Exception as e:
@@ -104,6 +337,8 @@ def update_location(location_id):
         response = supabase.table("locations").update(data).eq("id", location_id).execute()
         if not response.data:
             return error_response("Location not found", 404)
+        for row in response.data:
+            location_index.upsert(row)
         return success_response(response.data)
     except Exception as e:
         return error_response(str(e), 500)
@@ -114,6 +349,65 @@ def delete_location(location_id):
         response = supabase.table("locations").delete().eq("id", location_id).execute()
         if not response.data:
             return error_response("Location not found", 404)
+        location_index.remove(location_id)
         return success_response({"message": "Location deleted"})
     except Exception as e:
         return error_response(str(e), 500)
+
+
+@locations_bp.route("/verify/bulk", methods=["POST"])
+@require_admin_auth
+def bulk_verify_locations():
+    """Set the verification status of many locations with one update per chunk"""
+    try:
+        data = request.get_json(silent=True)
+        if not data or "status" not in data:
+            return error_response("Verification status and location_ids are required", 400)
+        try:
+            ids = _parse_location_ids(data)
+        except ValueError as e:
+            return error_response(str(e), 400)
+
+        status = str(data["status"]).lower()
+        if status not in VERIFICATION_STATUSES:
+            return error_response("Status must be either 'verified' or 'unverified'", 400)
+
+        stamp = _verification_stamp(status, verified_by_admin=request.current_admin["id"])
+
+        def verify(chunk):
+            response = supabase.table("location_verifications")\
+                .update(stamp)\
+                .in_("location_id", chunk)\
+                .execute()
+            updated = {row["location_id"] for row in response.data or []}
+            for location_id in updated:
+                location_index.set_status(location_id, status)
+            return "updated", updated
+
+        return success_response(_apply_in_chunks(ids, verify))
+
+    except Exception as e:
+        return error_response(f"Unexpected error: {str(e)}", 500)
+
+
+@locations_bp.route("/bulk", methods=["DELETE"])
+@require_admin_auth
+def bulk_delete_locations():
+    """Delete many locations with one delete per chunk (verifications cascade)"""
+    try:
+        try:
+            ids = _parse_location_ids(request.get_json(silent=True))
+        except ValueError as e:
+            return error_response(str(e), 400)
+
+        def delete(chunk):
+            response = supabase.table("locations").delete().in_("id", chunk).execute()
+            deleted = {row["id"] for row in response.data or []}
+            for location_id in deleted:
+                location_index.remove(location_id)
+            return "deleted", deleted
+
+        return success_response(_apply_in_chunks(ids, delete))
+
+    except Exception as e:
+        return error_response(f"Unexpected error: {str(e)}", 500)
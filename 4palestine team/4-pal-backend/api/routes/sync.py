@@ -0,0 +1,88 @@
+"""
+Delta sync of locations, location verifications and emergencies keyed by
+the commit-ordered change_log.change_id (see api/DB/sync_migration.sql and
+api/DB/sync_commit_order_migration.sql)
+"""
+
+from flask import Blueprint, request
+from api.DB.connection import supabase
+from api.routes import success_response, error_response
+from api.routes.locations import LOCATION_LIST_SPEC
+from api.routes.emergencies import EMERGENCY_LIST_SPEC
+from api.services.danger_zones import ZONE_COLUMNS
+
+sync_bp = Blueprint("sync", __name__)
+
+SYNCED_COLUMNS = {
+    "locations": LOCATION_LIST_SPEC.columns,
+    "location_verifications": ("id", "location_id", "status", "verified_by", "verified_by_admin", "verified_at"),
+    "emergencies": EMERGENCY_LIST_SPEC.columns,
+    "danger_zones": ZONE_COLUMNS,
+}
+DEFAULT_LIMIT = 1000
+MAX_LIMIT = 5000
+IN_CHUNK_SIZE = 200
+
+
+def _fetch_rows(table, ids):
+    rows = []
+    ids = list(ids)
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        response = supabase.table(table)\
+            .select(",".join(SYNCED_COLUMNS[table]))\
+            .in_("id", ids[start:start + IN_CHUNK_SIZE])\
+            .execute()
+        rows.extend(response.data or [])
+    return rows
+
+
+@sync_bp.route("", methods=["GET"])
+def sync():
+    try:
+        try:
+            since = int(request.args.get("since", 0))
+            limit = int(request.args.get("limit", DEFAULT_LIMIT))
+        except ValueError:
+            return error_response("since and limit must be integers", 400)
+        if since < 0 or not 1 <= limit <= MAX_LIMIT:
+            return error_response(f"since must be >= 0 and limit between 1 and {MAX_LIMIT}", 400)
+
+        # A client older than the pruned part of the log has to start over
+        if since > 0:
+            oldest = supabase.table("change_log").select("change_id").order("change_id").limit(1).execute()
+            if oldest.data and oldest.data[0]["change_id"] > since + 1:
+                return success_response({"version": 0, "reset": True, "has_more": True, "changes": {}})
+
+        # change_id is assigned at commit, in commit order, so no later commit
+        # can add an entry at or below the cursor handed out here
+        log = supabase.table("change_log")\
+            .select("change_id, table_name, row_id, operation")\
+            .gt("change_id", since)\
+            .order("change_id")\
+            .limit(limit + 1)\
+            .execute()
+        entries = log.data or []
+        has_more = len(entries) > limit
+        entries = entries[:limit]
+
+        # Only the latest operation per row matters
+        latest = {}
+        for entry in entries:
+            if entry["table_name"] in SYNCED_COLUMNS:
+                latest[(entry["table_name"], entry["row_id"])] = entry["operation"]
+
+        changes = {}
+        for table in SYNCED_COLUMNS:
+            upsert_ids = {row_id for (t, row_id), op in latest.items() if t == table and op == "upsert"}
+            deleted = {row_id for (t, row_id), op in latest.items() if t == table and op == "delete"}
+            upserted = _fetch_rows(table, upsert_ids) if upsert_ids else []
+            # Rows deleted after the last entry of this page are tombstoned now
+            deleted |= upsert_ids - {row["id"] for row in upserted}
+            if upserted or deleted:
+                changes[table] = {"upserted": upserted, "deleted": sorted(deleted)}
+
+        version = entries[-1]["change_id"] if entries else since
+        return success_response({"version": version, "reset": False, "has_more": has_more, "changes": changes})
+
+    except Exception as e:
+        return error_response(str(e), 500)
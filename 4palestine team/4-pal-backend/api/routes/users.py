@@ -3,21 +3,33 @@ from api.DB.connection import supabase
 from api.routes import success_response, error_response
 from api.services.mail_services import send_confirmation_email, generate_code
 from api.utils.auth import require_any_auth, require_user_auth, is_admin_authenticated
+from api.utils.query import ListSpec, QueryError, run_list_query
+from api.utils.rate_limit import rate_limit
 from datetime import datetime, timedelta, timezone
 
 
 users_bp = Blueprint("users", __name__)
 
+# password_hash is deliberately not listed so it is never selected
+USER_LIST_SPEC = ListSpec(
+    table="users",
+    columns=(
+        "id", "user_type", "email", "first_name", "last_name", "phone_number",
+        "is_email_verified", "is_phone_verified", "preferred_language",
+        "registration_date", "created_at",
+    ),
+    filters=("user_type", "is_email_verified", "is_phone_verified", "preferred_language"),
+    sortable=("id", "created_at", "registration_date"),
+)
+
 @users_bp.route("", methods=["GET"])
 @require_any_auth
 def list_users():
     try:
-        response = supabase.table("users").select("*").execute()
-        # Remove password hashes from response
-        if response.data:
-            for user in response.data:
-                user.pop('password_hash', None)
-        return success_response(response.data)
+        rows, meta = run_list_query(USER_LIST_SPEC, request.args)
+        return success_response(rows, meta=meta)
+    except QueryError as e:
+        return error_response(str(e), 400)
     except Exception as e:
         return error_response(str(e), 500)
 
@@ -36,6 +48,7 @@ def get_user(user_id):
         return error_response(str(e), 500)
 
 @users_bp.route("/add", methods=["POST"])
+@rate_limit("signup", ip="20/hour")
 def create_user():
     try:
         # user_types = ('anonymous','registered','contributor','organization','admin')
@@ -54,13 +67,8 @@ def create_user():
         user_email = user["email"]
         user_id = user["id"]
 
-        # 2. Generate code + send mail
+        # 2. Generate code + store verification record
         code = generate_code()
-        sent = send_confirmation_email(user_email, code)
-        if not sent:
-            return {"error": "User created but failed to send confirmation email"}, 500
-
-        # 3. Store verification record
         expires_at = datetime.now(timezone.utc) + timedelta(minutes=10)
         insert_data = {
             "email": user_email,
@@ -73,6 +81,11 @@ def create_user():
         if not verif_response.data:
             return {"error": "User created but failed to store verification record"}, 500
 
+        # 3. Queue the confirmation mail (delivered by the outbox workers)
+        sent = send_confirmation_email(user_email, code)
+        if not sent:
+            return {"error": "User created but failed to send confirmation email"}, 500
+
         return {"message": "User created, confirmation code sent", "user": user}, 201
 
     except Exception as e:
@@ -88,38 +101,26 @@ def verify_user():
             return {"error": "Email and code are required"}, 400
 
         email = data["email"]
-        code = data["code"]
-
-        # 1. Fetch latest verification record for this email
-        verif_response = (
-            supabase.table("email_verifications")
-            .select("*")
-            .eq("email", email)
-            .order("expires_at", desc=True)  # get latest
-            .limit(1)
-            .execute()
-        )
-
-        if not verif_response.data:
-            return error_response("No verification request found for this email", 404)
+        try:
+            code = int(data["code"])
+        except (TypeError, ValueError):
+            return error_response("Invalid confirmation code", 400)
 
-        verif_record = verif_response.data[0]
+        # Code check, expiry check and both updates run in one transaction (api/DB/rpc_functions.sql)
+        result = supabase.rpc("verify_email", {"p_email": email, "p_code": code}).execute().data or {}
+        status = result.get("status")
 
-        # 2. Check if code matches
-        if int(verif_record["code"]) != int(code):
-            print(verif_record["code"], code)
+        if status == "not_found":
+            return error_response("No verification request found for this email", 404)
+        if status == "invalid_code":
             return error_response("Invalid confirmation code", 400)
-        
-
-        # 3. Check expiry
-        expires_at = datetime.fromisoformat(verif_record["expires_at"])
-        if datetime.now(timezone.utc) > expires_at:
+        if status == "expired":
             return error_response("Confirmation code has expired", 400)
-
-        # 4. Mark verification as complete
-        supabase.table("email_verifications").update({"verified": True}).eq("id", verif_record["id"]).execute()
-        user_response = supabase.table("users").update({"is_email_verified": True, "user_type": "registered"}).eq("email", email).execute()
-        user_data = user_response.data[0]
+        if status == "user_not_found":
+            return error_response("User not found", 404)
+        if status != "ok":
+            return error_response("Email verification failed", 500)
+        user_data = result["user"]
 
         return success_response(message="User email verified successfully", data= user_data, status=200)
 
@@ -128,6 +129,7 @@ def verify_user():
     return error_response("Internal server error", 500, details=e)
 
 @users_bp.route("/resend_code", methods=["POST"])
+@rate_limit("resend_code", ip="10/hour", email="3/15minutes")
 def resend_confirmation():
     try:
         data = request.json
@@ -147,12 +149,7 @@ def resend_confirmation():
         # 2. Generate new code
         code = generate_code()
 
-        # 3. Send confirmation email
-        sent = send_confirmation_email(email, code)
-        if not sent:
-            return error_response("Failed to send confirmation email", 500)
-
-        # 4. Store new verification record
+        # 3. Store new verification record
         expires_at = datetime.now(timezone.utc) + timedelta(minutes=10)
         insert_data = {
             "email": email,
@@ -165,6 +162,11 @@ def resend_confirmation():
         if not verif_response.data:
             return error_response("Failed to store new verification record", 500)
 
+        # 4. Queue confirmation email
+        sent = send_confirmation_email(email, code)
+        if not sent:
+            return error_response("Failed to send confirmation email", 500)
+
         return success_response(
             message="New confirmation code sent",
             data={"user_id": user_id, "email": email},
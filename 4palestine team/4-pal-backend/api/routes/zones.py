@@ -0,0 +1,168 @@
+"""
+Danger zone polygons and server-side geofence checks, so clients can test a
+position or a planned route without downloading every zone polygon.
+"""
+
+from flask import Blueprint, request
+from api.DB.connection import supabase
+from api.routes import success_response, error_response, cache_control
+from api.services.danger_zones import ZONE_COLUMNS, danger_zone_index, parse_timestamp
+from api.utils.auth import require_admin_auth
+from api.utils.geo import validate_coordinates
+from api.utils.polygon import parse_polygon_geometry
+from api.utils.query import ListSpec, QueryError, run_list_query
+
+zones_bp = Blueprint("zones", __name__)
+
+MAX_ROUTE_POINTS = 5000
+ZONE_FIELDS = ("name", "description", "geometry", "location_id", "active", "expires_at")
+
+ZONE_LIST_SPEC = ListSpec(
+    table="danger_zones",
+    columns=ZONE_COLUMNS,
+    filters=("active", "location_id"),
+    sortable=("id", "created_at"),
+)
+
+
+def _validate_zone(data, partial=False):
+    """
+    Clean a zone create/update body
+
+    Returns:
+        dict: Columns to write
+
+    Raises:
+        ValueError: If a field is invalid
+    """
+    row = {k: data[k] for k in ZONE_FIELDS if k in data}
+    if not partial:
+        for required in ("name", "geometry"):
+            if row.get(required) in (None, ""):
+                raise ValueError(f"{required} is required")
+    if "name" in row and (not isinstance(row["name"], str) or not row["name"].strip() or len(row["name"]) > 255):
+        raise ValueError("name must be a non-empty string of at most 255 characters")
+    if "geometry" in row:
+        parse_polygon_geometry(row["geometry"])
+    if "active" in row and not isinstance(row["active"], bool):
+        raise ValueError("active must be a boolean")
+    if row.get("location_id") is not None:
+        row["location_id"] = int(row["location_id"])
+    if "expires_at" in row:
+        expires_at = parse_timestamp(row["expires_at"])
+        row["expires_at"] = expires_at.isoformat() if expires_at else None
+    return row
+
+
+def _parse_point(args):
+    if "lat" not in args or "lon" not in args:
+        raise ValueError("lat and lon are required")
+    lat, lon = float(args["lat"]), float(args["lon"])
+    validate_coordinates(lat, lon)
+    return lat, lon
+
+
+def _parse_route(data):
+    """
+    Read a route as a GeoJSON LineString, ``{"coordinates": [[lon, lat], ...]}``
+
+    Returns:
+        list: (lat, lon) tuples
+    """
+    coordinates = data.get("coordinates") if isinstance(data, dict) else None
+    if not isinstance(coordinates, list) or not coordinates:
+        raise ValueError("coordinates must be a non-empty array of [lon, lat] positions")
+    if len(coordinates) > MAX_ROUTE_POINTS:
+        raise ValueError(f"A route is limited to {MAX_ROUTE_POINTS} positions")
+    points = []
+    for position in coordinates:
+        if not isinstance(position, (list, tuple)) or len(position) < 2:
+            raise ValueError("positions must be [lon, lat]")
+        lon, lat = float(position[0]), float(position[1])
+        validate_coordinates(lat, lon)
+        points.append((lat, lon))
+    return points
+
+
+@zones_bp.route("", methods=["GET"])
+@cache_control(max_age=60, public=True)
+def list_zones():
+    try:
+        rows, meta = run_list_query(ZONE_LIST_SPEC, request.args)
+        return success_response(rows, meta=meta)
+    except QueryError as e:
+        return error_response(str(e), 400)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+@zones_bp.route("/contains", methods=["GET"])
+@cache_control(max_age=30, public=True)
+def zones_containing():
+    try:
+        try:
+            lat, lon = _parse_point(request.args)
+        except ValueError as e:
+            return error_response(str(e), 400)
+        zones = danger_zone_index.containing(lat, lon)
+        return success_response({"inside": bool(zones), "zones": zones})
+    except Exception as e:
+        return error_response(str(e), 500)
+
+@zones_bp.route("/route", methods=["POST"])
+def zones_on_route():
+    try:
+        try:
+            points = _parse_route(request.get_json(silent=True))
+        except ValueError as e:
+            return error_response(str(e), 400)
+        zones = danger_zone_index.crossing_path(points)
+        return success_response({"intersects": bool(zones), "zones": zones})
+    except Exception as e:
+        return error_response(str(e), 500)
+
+@zones_bp.route("", methods=["POST"])
+@require_admin_auth
+def create_zone():
+    try:
+        try:
+            row = _validate_zone(request.get_json(silent=True) or {})
+        except (TypeError, ValueError) as e:
+            return error_response(str(e), 400)
+        row["created_by_admin"] = request.current_admin["id"]
+        response = supabase.table("danger_zones").insert(row).execute()
+        for zone in response.data or []:
+            danger_zone_index.upsert(zone)
+        return success_response(response.data, status=201)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+@zones_bp.route("/<int:zone_id>", methods=["PUT"])
+@require_admin_auth
+def update_zone(zone_id):
+    try:
+        try:
+            row = _validate_zone(request.get_json(silent=True) or {}, partial=True)
+        except (TypeError, ValueError) as e:
+            return error_response(str(e), 400)
+        if not row:
+            return error_response("No zone fields to update", 400)
+        response = supabase.table("danger_zones").update(row).eq("id", zone_id).execute()
+        if not response.data:
+            return error_response("Zone not found", 404)
+        for zone in response.data:
+            danger_zone_index.upsert(zone)
+        return success_response(response.data)
+    except Exception as e:
+        return error_response(str(e), 500)
+
+@zones_bp.route("/<int:zone_id>", methods=["DELETE"])
+@require_admin_auth
+def delete_zone(zone_id):
+    try:
+        response = supabase.table("danger_zones").delete().eq("id", zone_id).execute()
+        if not response.data:
+            return error_response("Zone not found", 404)
+        danger_zone_index.remove(zone_id)
+        return success_response({"message": "Zone deleted"})
+    except Exception as e:
+        return error_response(str(e), 500)
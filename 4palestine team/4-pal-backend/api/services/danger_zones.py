@@ -0,0 +1,185 @@
+"""
+In-process geofence index over the ``danger_zones`` table.
+
+Each active zone's polygon is prepared once (api/utils/polygon.py) and its
+bounding box is packed into an STR R-tree (api/utils/rtree.py). A point or
+route check then only runs exact tests against the few zones whose box
+overlaps the query. Like the location index, it is loaded lazily, kept current
+by the zone routes and reloaded after a refresh interval so changes made by
+other workers are eventually picked up.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+from api.DB.connection import supabase
+from api.utils.polygon import PreparedPolygon, parse_polygon_geometry
+from api.utils.rtree import STRTree
+
+ZONE_COLUMNS = ("id", "location_id", "name", "description", "geometry", "active", "created_at", "expires_at")
+# Fields returned by containment checks (everything but the polygon)
+SUMMARY_FIELDS = ("id", "location_id", "name", "description", "expires_at")
+LOAD_PAGE_SIZE = 500
+
+
+def parse_timestamp(value):
+    """Parse an ISO 8601 timestamp to naive UTC (the columns have no time zone); None stays None"""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class DangerZoneIndex:
+    """Prepared polygons of the active danger zones behind an R-tree"""
+
+    def __init__(self, refresh_seconds: int = None):
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else int(
+            os.getenv('DANGER_ZONE_REFRESH_SECONDS', '300')
+        )
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+        self._zones = {}
+        self._tree = None
+        self._loaded_at = None
+
+    # Loading
+
+    def ensure_loaded(self) -> None:
+        """Load the index on first use and reload it once it is older than the refresh interval"""
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            with self._reload_lock:
+                if self._loaded_at is None:
+                    self._reload()
+        elif time.monotonic() - loaded_at > self.refresh_seconds:
+            # A stale index is still usable: one caller refreshes it, the others do not wait
+            if self._reload_lock.acquire(blocking=False):
+                try:
+                    self._reload()
+                except Exception as e:
+                    print("danger zone refresh error:", e)
+                finally:
+                    self._reload_lock.release()
+
+    def reload(self) -> None:
+        """Rebuild the index from the active rows of ``danger_zones``"""
+        with self._reload_lock:
+            self._reload()
+
+    def _reload(self) -> None:
+        rows = []
+        last_id = 0
+        while True:
+            response = supabase.table("danger_zones")\
+                .select(",".join(ZONE_COLUMNS))\
+                .eq("active", True)\
+                .gt("id", last_id)\
+                .order("id")\
+                .limit(LOAD_PAGE_SIZE)\
+                .execute()
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < LOAD_PAGE_SIZE:
+                break
+            last_id = page[-1]["id"]
+        self.load(rows)
+
+    def load(self, rows: list) -> None:
+        """Replace the index contents with ``rows``"""
+        with self._lock:
+            self._zones.clear()
+            for row in rows:
+                self._put(row)
+            self._tree = None
+            self._loaded_at = time.monotonic()
+
+    # Incremental maintenance
+
+    def _put(self, row: dict) -> None:
+        self._zones.pop(row['id'], None)
+        if not row.get('active', True):
+            return
+        try:
+            prepared = PreparedPolygon(parse_polygon_geometry(row.get('geometry')))
+            expires_at = parse_timestamp(row.get('expires_at'))
+        except (TypeError, ValueError) as e:
+            # Rows are validated on write; one bad row must not take the whole index down
+            print(f"danger zone {row['id']} skipped: {e}")
+            return
+        summary = {field: row.get(field) for field in SUMMARY_FIELDS}
+        self._zones[row['id']] = (prepared, expires_at, summary)
+
+    def upsert(self, row: dict) -> None:
+        """Insert, replace or (when inactive) drop a zone after a write; ignored until loaded"""
+        with self._lock:
+            if self._loaded_at is None or 'id' not in row:
+                return
+            self._put(row)
+            self._tree = None
+
+    def remove(self, zone_id: int) -> None:
+        """Drop a deleted zone"""
+        with self._lock:
+            if self._zones.pop(zone_id, None) is not None:
+                self._tree = None
+
+    # Queries
+
+    def _candidates(self, bbox: tuple) -> list:
+        if self._tree is None:
+            self._tree = STRTree((zone[0].bbox, zone_id) for zone_id, zone in self._zones.items())
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        candidates = []
+        for zone_id in self._tree.query(bbox):
+            zone = self._zones[zone_id]
+            if zone[1] is None or zone[1] > now:
+                candidates.append((zone_id, zone))
+        return candidates
+
+    def containing(self, lat: float, lon: float) -> list:
+        """
+        Active zones containing a point
+
+        Returns:
+            list: Zone summaries (no geometry), by id
+        """
+        self.ensure_loaded()
+        with self._lock:
+            hits = [
+                summary for zone_id, (prepared, _, summary) in self._candidates((lon, lat, lon, lat))
+                if prepared.contains(lon, lat)
+            ]
+        return sorted((dict(summary) for summary in hits), key=lambda zone: zone['id'])
+
+    def crossing_path(self, points: list) -> list:
+        """
+        Active zones a route passes through
+
+        Args:
+            points (list): Route as (lat, lon) tuples; a single point is a containment check
+
+        Returns:
+            list: Zone summaries with ``segments``, the indexes of the route
+            segments (points i to i + 1) that touch the zone, by id
+        """
+        self.ensure_loaded()
+        segments = list(zip(points, points[1:])) or [(points[0], points[0])]
+        crossed = {}
+        with self._lock:
+            for index, ((lat1, lon1), (lat2, lon2)) in enumerate(segments):
+                bbox = (min(lon1, lon2), min(lat1, lat2), max(lon1, lon2), max(lat1, lat2))
+                for zone_id, (prepared, _, summary) in self._candidates(bbox):
+                    if prepared.intersects_segment(lon1, lat1, lon2, lat2):
+                        crossed.setdefault(zone_id, (summary, []))[1].append(index)
+        return [
+            {**summary, 'segments': segment_indexes}
+            for _, (summary, segment_indexes) in sorted(crossed.items())
+        ]
+
+
+danger_zone_index = DangerZoneIndex()
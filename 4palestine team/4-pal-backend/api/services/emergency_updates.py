@@ -0,0 +1,86 @@
+"""
+In-process bookkeeping once emergencies are written.
+
+The emergency routes and the batched ingest route call these after the rows
+are committed: incident clustering, danger zone tagging, the recent-emergency
+and heatmap indexes, and live event publishing. Each step is guarded on its
+own. The emergency is already stored, so a failing step is logged and never
+turns the write into a 5xx, which a client would retry as a duplicate SOS.
+"""
+
+from api.services.danger_zones import danger_zone_index
+from api.services.event_broker import emergency_broker
+from api.services.heatmap import heatmap_index
+from api.services.incident_clusters import incident_clusterer
+from api.services.recent_emergencies import recent_emergencies
+from api.utils.geo import to_float
+
+EMERGENCY_TYPES = ('medical', 'trapped', 'fire', 'violence', 'other')
+
+
+def _cluster(rows):
+    """Assign emergencies to incidents, tagging each row with its incident_id"""
+    try:
+        for row in rows or []:
+            row["incident_id"] = incident_clusterer.add(row)
+    except Exception as e:
+        print("incident clustering error:", e)
+
+
+def _tag_danger_zones(rows):
+    """Tag emergencies with the ids of the active danger zones they fall in"""
+    try:
+        for row in rows or []:
+            lat, lon = to_float(row.get("latitude")), to_float(row.get("longitude"))
+            if lat is not None and lon is not None:
+                row["danger_zone_ids"] = [zone["id"] for zone in danger_zone_index.containing(lat, lon)]
+    except Exception as e:
+        print("danger zone check error:", e)
+
+
+def _index(rows):
+    try:
+        recent_emergencies.add(rows)
+    except Exception as e:
+        print("recent emergency index error:", e)
+    try:
+        heatmap_index.add_emergencies(rows)
+    except Exception as e:
+        print("heatmap update error:", e)
+
+
+def _publish(event_type, rows):
+    try:
+        for row in rows or []:
+            emergency_broker.publish(event_type, row)
+    except Exception as e:
+        print("emergency publish error:", e)
+
+
+def emergencies_created(rows):
+    """Cluster, tag, index and publish newly stored emergencies (rows are tagged in place)"""
+    _cluster(rows)
+    _tag_danger_zones(rows)
+    _index(rows)
+    _publish("emergency.created", rows)
+
+
+def emergencies_updated(rows):
+    """Re-cluster, re-index and publish updated emergencies"""
+    _cluster(rows)
+    _index(rows)
+    _publish("emergency.updated", rows)
+
+
+def emergency_deleted(emergency_id, rows):
+    """Drop a deleted emergency from the in-process indexes and publish it"""
+    for name, remove in (
+        ("incident clustering", incident_clusterer.remove),
+        ("recent emergency index", recent_emergencies.remove),
+        ("heatmap update", heatmap_index.remove_emergency),
+    ):
+        try:
+            remove(emergency_id)
+        except Exception as e:
+            print(f"{name} error:", e)
+    _publish("emergency.deleted", rows)
@@ -0,0 +1,139 @@
+"""
+In-process publish/subscribe broker used to fan emergency changes out to
+Server-Sent Events subscribers.
+
+Every published event gets an id of the form ``<epoch>-<sequence>`` and is
+kept in a bounded replay buffer, so a client reconnecting with
+``Last-Event-ID`` receives whatever it missed while it was away. Ids from a
+previous process (different epoch) cannot be replayed; those clients simply
+resume with new events.
+"""
+
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+
+CLOSED = object()
+
+
+class Subscription:
+    """A subscriber's bounded event queue and optional event filter"""
+
+    def __init__(self, broker, predicate=None, maxsize: int = 256):
+        self._broker = broker
+        self.predicate = predicate
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.closed = False
+
+    def matches(self, event: dict) -> bool:
+        return self.predicate is None or self.predicate(event)
+
+    def offer(self, event) -> bool:
+        """Queue an event without blocking; returns False when the subscriber has fallen behind"""
+        try:
+            self.queue.put_nowait(event)
+            return True
+        except queue.Full:
+            return False
+
+    def get(self, timeout: float = None):
+        """
+        Wait for the next event
+
+        Returns:
+            dict: The event, None on timeout, or ``CLOSED`` once the
+            subscription has been dropped
+        """
+        if self.closed and self.queue.empty():
+            return CLOSED
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self._broker.unsubscribe(self)
+
+
+class EventBroker:
+    """Fans published events out to every matching subscriber"""
+
+    def __init__(self, replay_size: int = 1000, queue_size: int = 256):
+        self.epoch = format(int(time.time()), 'x')
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._sequence = itertools.count(1)
+        self._replay = deque(maxlen=replay_size)
+        self._subscribers = set()
+
+    def publish(self, event_type: str, data: dict) -> dict:
+        """
+        Publish an event to all current subscribers
+
+        Args:
+            event_type (str): SSE event name, e.g. ``emergency.created``
+            data (dict): JSON-serializable payload
+
+        Returns:
+            dict: The published event (``id``, ``seq``, ``event``, ``data``)
+        """
+        with self._lock:
+            seq = next(self._sequence)
+            event = {'id': f"{self.epoch}-{seq}", 'seq': seq, 'event': event_type, 'data': data}
+            self._replay.append(event)
+            subscribers = list(self._subscribers)
+
+        for subscription in subscribers:
+            if subscription.matches(event) and not subscription.offer(event):
+                # A subscriber that cannot keep up is dropped; it reconnects
+                # with Last-Event-ID and catches up from the replay buffer
+                self._drop(subscription)
+        return event
+
+    def subscribe(self, predicate=None, last_event_id: str = None) -> Subscription:
+        """
+        Register a subscriber
+
+        Args:
+            predicate (callable, optional): Receives an event, returns True to deliver it
+            last_event_id (str, optional): Id of the last event the client saw;
+                newer buffered events are queued immediately
+
+        Returns:
+            Subscription: The new subscription
+        """
+        subscription = Subscription(self, predicate, self.queue_size)
+        with self._lock:
+            for event in self._missed_since(last_event_id):
+                if subscription.matches(event):
+                    subscription.offer(event)
+            self._subscribers.add(subscription)
+        return subscription
+
+    def _missed_since(self, last_event_id: str) -> list:
+        if not last_event_id:
+            return []
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self.epoch or not seq.isdigit():
+            return []
+        seq = int(seq)
+        return [event for event in self._replay if event['seq'] > seq]
+
+    def _drop(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+        subscription.closed = True
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            self._subscribers.discard(subscription)
+        subscription.closed = True
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+
+emergency_broker = EventBroker()
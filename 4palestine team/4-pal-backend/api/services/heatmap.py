@@ -0,0 +1,248 @@
+"""
+Multi-resolution density counts of emergencies and location reports.
+
+Points are binned into Web Mercator ("slippy map") tiles at every zoom level
+from 0 to ``HEATMAP_MAX_ZOOM``, each tile split into ``TILE_BINS`` x
+``TILE_BINS`` cells. Every insert, move or delete updates one cell per level,
+so a tile request only copies the non-empty cells of one tile, whatever the
+number of rows behind it. Reports have no coordinates of their own and are
+counted at their location. Like the other in-process indexes, the pyramid is
+loaded lazily, fed by the write routes and reloaded after a refresh interval
+so writes made by other workers (and report rows removed with their
+location) are eventually picked up.
+"""
+
+import math
+import os
+import threading
+import time
+
+from api.DB.connection import supabase
+from api.utils.geo import to_float
+
+LAYERS = ("emergencies", "reports")
+HEATMAP_MAX_ZOOM = int(os.getenv('HEATMAP_MAX_ZOOM', '14'))
+# Cells per tile side; a power of two so parent cells are found by shifting
+TILE_BINS = 32
+TILE_SHIFT = TILE_BINS.bit_length() - 1
+# Web Mercator is undefined at the poles
+MAX_LATITUDE = 85.05112878
+LOAD_PAGE_SIZE = 1000
+
+
+def mercator_cell(lat: float, lon: float, zoom: int = HEATMAP_MAX_ZOOM) -> tuple:
+    """Global (x, y) cell of a point at ``zoom``, ``TILE_BINS`` cells per tile side"""
+    size = 1 << (zoom + TILE_SHIFT)
+    lat = max(-MAX_LATITUDE, min(MAX_LATITUDE, lat))
+    x = (lon + 180.0) / 360.0
+    y = (1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0
+    return min(size - 1, max(0, int(x * size))), min(size - 1, max(0, int(y * size)))
+
+
+class _Pyramid:
+    """Per-zoom tile counts of one layer, with each item's finest cell to undo it"""
+
+    def __init__(self, max_zoom: int):
+        self.max_zoom = max_zoom
+        # zoom -> {(tile_x, tile_y): {cell index within the tile: count}}
+        self.levels = [{} for _ in range(max_zoom + 1)]
+        self.cells = {}
+
+    def _count(self, cell: tuple, delta: int) -> None:
+        cell_x, cell_y = cell
+        for zoom in range(self.max_zoom, -1, -1):
+            tile = (cell_x >> TILE_SHIFT, cell_y >> TILE_SHIFT)
+            index = (cell_y & (TILE_BINS - 1)) * TILE_BINS + (cell_x & (TILE_BINS - 1))
+            tiles = self.levels[zoom]
+            counts = tiles.setdefault(tile, {})
+            count = counts.get(index, 0) + delta
+            if count > 0:
+                counts[index] = count
+            else:
+                counts.pop(index, None)
+                if not counts:
+                    del tiles[tile]
+            cell_x >>= 1
+            cell_y >>= 1
+
+    def put(self, item_id: int, cell: tuple) -> None:
+        self.drop(item_id)
+        if cell is None:
+            return
+        self.cells[item_id] = cell
+        self._count(cell, 1)
+
+    def drop(self, item_id: int) -> None:
+        cell = self.cells.pop(item_id, None)
+        if cell is not None:
+            self._count(cell, -1)
+
+
+class HeatmapIndex:
+    """Tile pyramids of the ``emergencies`` and ``location_reports`` tables"""
+
+    def __init__(self, max_zoom: int = HEATMAP_MAX_ZOOM, refresh_seconds: int = None):
+        self.max_zoom = max_zoom
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else int(
+            os.getenv('HEATMAP_REFRESH_SECONDS', '600')
+        )
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+        self._pyramids = {layer: _Pyramid(max_zoom) for layer in LAYERS}
+        self._journal = None
+        self._loaded_at = None
+
+    def _cell(self, lat, lon):
+        lat, lon = to_float(lat), to_float(lon)
+        if lat is None or lon is None:
+            return None
+        return mercator_cell(lat, lon, self.max_zoom)
+
+    # Loading
+
+    def ensure_loaded(self) -> None:
+        """Load the pyramids on first use and reload them once older than the refresh interval"""
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            with self._reload_lock:
+                if self._loaded_at is None:
+                    self._load()
+        elif time.monotonic() - loaded_at > self.refresh_seconds:
+            # Stale counts are still usable: one caller refreshes them, the others do not wait
+            if self._reload_lock.acquire(blocking=False):
+                try:
+                    self._load()
+                except Exception as e:
+                    print("heatmap refresh error:", e)
+                finally:
+                    self._reload_lock.release()
+
+    def reload(self) -> None:
+        """Rebuild the pyramids from the database"""
+        with self._reload_lock:
+            self._load()
+
+    @staticmethod
+    def _read_all(table: str, columns: str) -> list:
+        rows = []
+        last_id = 0
+        while True:
+            response = supabase.table(table)\
+                .select(columns)\
+                .gt("id", last_id)\
+                .order("id")\
+                .limit(LOAD_PAGE_SIZE)\
+                .execute()
+            page = response.data or []
+            rows.extend(page)
+            if len(page) < LOAD_PAGE_SIZE:
+                break
+            last_id = page[-1]["id"]
+        return rows
+
+    def _load(self) -> None:
+        with self._lock:
+            # Writes made while the rows are being read are replayed on top of them
+            self._journal = []
+        try:
+            emergencies = self._read_all("emergencies", "id, latitude, longitude")
+            reports = self._read_all("location_reports", "id, locations(latitude, longitude)")
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+        pyramids = {layer: _Pyramid(self.max_zoom) for layer in LAYERS}
+        for row in emergencies:
+            pyramids["emergencies"].put(row["id"], self._cell(row.get("latitude"), row.get("longitude")))
+        for row in reports:
+            location = row.get("locations") or {}
+            pyramids["reports"].put(row["id"], self._cell(location.get("latitude"), location.get("longitude")))
+        with self._lock:
+            journal, self._journal = self._journal, None
+            for layer, item_id, cell in journal:
+                if cell is None:
+                    pyramids[layer].drop(item_id)
+                else:
+                    pyramids[layer].put(item_id, cell)
+            self._pyramids = pyramids
+            self._loaded_at = time.monotonic()
+
+    # Maintenance
+
+    def _apply(self, layer: str, item_id: int, cell) -> None:
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append((layer, item_id, cell))
+            if self._loaded_at is not None:
+                if cell is None:
+                    self._pyramids[layer].drop(item_id)
+                else:
+                    self._pyramids[layer].put(item_id, cell)
+
+    def add_emergencies(self, rows: list) -> None:
+        """Count created or moved emergencies; ignored until the pyramids are loaded"""
+        for row in rows or []:
+            if 'id' in row:
+                cell = self._cell(row.get('latitude'), row.get('longitude'))
+                if cell is not None:
+                    self._apply("emergencies", row['id'], cell)
+
+    def remove_emergency(self, emergency_id: int) -> None:
+        """Uncount a deleted emergency"""
+        self._apply("emergencies", emergency_id, None)
+
+    def add_reports(self, rows: list, locations: dict = None) -> None:
+        """
+        Count created location reports at their location
+
+        Args:
+            rows (list): Inserted ``location_reports`` rows
+            locations (dict, optional): Location rows already at hand, by id;
+                the others are read in one query
+        """
+        if self._loaded_at is None and self._journal is None:
+            return
+        rows = [row for row in rows or [] if 'id' in row and row.get('location_id') is not None]
+        locations = dict(locations or {})
+        missing = list({row['location_id'] for row in rows} - set(locations))
+        if missing:
+            response = supabase.table("locations")\
+                .select("id, latitude, longitude")\
+                .in_("id", missing)\
+                .execute()
+            locations.update((location['id'], location) for location in response.data or [])
+        for row in rows:
+            location = locations.get(row['location_id'])
+            if location is not None:
+                cell = self._cell(location.get('latitude'), location.get('longitude'))
+                if cell is not None:
+                    self._apply("reports", row['id'], cell)
+
+    # Queries
+
+    def tile(self, zoom: int, x: int, y: int, layers=LAYERS) -> dict:
+        """
+        Non-empty cells of one tile
+
+        Args:
+            zoom (int): Zoom level, 0 to ``max_zoom``
+            x (int): Tile column, 0 to 2**zoom - 1
+            y (int): Tile row (0 at the north), 0 to 2**zoom - 1
+            layers (iterable): Layers to include
+
+        Returns:
+            dict: Per layer, ``total`` and the parallel arrays ``cells`` (row-major
+            index ``row * bins + column``, ascending) and ``counts``
+        """
+        self.ensure_loaded()
+        result = {}
+        with self._lock:
+            for layer in layers:
+                counts = self._pyramids[layer].levels[zoom].get((x, y), {})
+                cells = sorted(counts)
+                values = [counts[index] for index in cells]
+                result[layer] = {"total": sum(values), "cells": cells, "counts": values}
+        return result
+
+
+heatmap_index = HeatmapIndex()
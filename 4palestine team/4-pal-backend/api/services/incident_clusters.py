@@ -0,0 +1,344 @@
+"""
+Incremental spatio-temporal clustering of SOS emergencies into incidents.
+
+Each new emergency joins the live incident of the same ``emergency_type``
+whose centroid is within ``radius_m`` and whose activity is within
+``window`` of the emergency's ``activated_at``; otherwise it starts a new
+incident. When an emergency links several incidents they are merged, as in
+DBSCAN, keeping the oldest incident id. An incident's id is the id of the
+emergency that opened it, so ids stay stable across reloads and workers.
+Incidents are bucketed on a grid of ``radius_m`` sized cells so an
+assignment only inspects the few neighbouring cells, and incidents with no
+activity for ``retention`` are expired.
+"""
+
+import heapq
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from api.DB.connection import supabase
+from api.utils.geo import (
+    METERS_PER_DEGREE_LAT,
+    cell_key,
+    cells_in_bbox,
+    haversine_m,
+    in_bbox,
+    radius_to_bbox,
+    to_float,
+)
+
+LOAD_PAGE_SIZE = 1000
+
+
+def parse_timestamp(value) -> datetime:
+    """
+    Parse a Supabase timestamp into a naive UTC datetime (the schema uses
+    ``timestamp`` columns filled with ``now()``); missing values mean now.
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    elif value:
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    else:
+        return datetime.now(timezone.utc).replace(tzinfo=None)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+class Incident:
+    """A live cluster of emergencies believed to describe the same event"""
+
+    __slots__ = ('id', 'emergency_type', 'lat_sum', 'lon_sum', 'victims',
+                 'first_at', 'last_at', 'members', 'cell')
+
+    def __init__(self, incident_id: int, emergency_type: str):
+        self.id = incident_id
+        self.emergency_type = emergency_type
+        self.lat_sum = 0.0
+        self.lon_sum = 0.0
+        self.victims = 0
+        self.first_at = None
+        self.last_at = None
+        self.members = {}
+        self.cell = None
+
+    @property
+    def latitude(self) -> float:
+        return self.lat_sum / len(self.members)
+
+    @property
+    def longitude(self) -> float:
+        return self.lon_sum / len(self.members)
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.id,
+            'emergency_type': self.emergency_type,
+            'latitude': round(self.latitude, 6),
+            'longitude': round(self.longitude, 6),
+            'count': len(self.members),
+            'estimated_victims': self.victims,
+            'first_activated_at': self.first_at.isoformat(),
+            'last_activated_at': self.last_at.isoformat(),
+            'emergency_ids': sorted(self.members),
+        }
+
+
+class IncidentClusterer:
+    """Grid-bucketed incremental clustering of emergencies"""
+
+    def __init__(self, radius_m: float = None, window_minutes: int = None,
+                 retention_minutes: int = None, refresh_seconds: int = None):
+        self.radius_m = radius_m or float(os.getenv('INCIDENT_RADIUS_M', '300'))
+        self.window = timedelta(minutes=window_minutes or int(os.getenv('INCIDENT_WINDOW_MINUTES', '30')))
+        self.retention = timedelta(minutes=retention_minutes or int(os.getenv('INCIDENT_RETENTION_MINUTES', '360')))
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else int(
+            os.getenv('INCIDENT_REFRESH_SECONDS', '120')
+        )
+        self.cell_deg = self.radius_m / METERS_PER_DEGREE_LAT
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+        self._incidents = {}
+        self._cells = defaultdict(set)
+        self._member_of = {}
+        self._expiry = []
+        self._journal = None
+        self._loaded_at = None
+
+    # Loading
+
+    def ensure_loaded(self) -> None:
+        """Replay recent emergencies from the database on first use and after the refresh interval"""
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            with self._reload_lock:
+                if self._loaded_at is None:
+                    self._load()
+        elif time.monotonic() - loaded_at > self.refresh_seconds:
+            # Stale incidents are still usable: one caller refreshes them, the others do not wait
+            if self._reload_lock.acquire(blocking=False):
+                try:
+                    self._load()
+                except Exception as e:
+                    print("incident refresh error:", e)
+                finally:
+                    self._reload_lock.release()
+
+    def reload(self) -> None:
+        """Rebuild the incidents from the emergencies activated within the retention"""
+        with self._reload_lock:
+            self._load()
+
+    def _load(self) -> None:
+        with self._lock:
+            # Writes made while the rows are being read are replayed on top of them
+            self._journal = []
+        since = (datetime.now(timezone.utc) - self.retention).replace(tzinfo=None).isoformat()
+        rows = []
+        last_id = 0
+        try:
+            while True:
+                response = supabase.table("emergencies")\
+                    .select("id, latitude, longitude, activated_at, emergency_type, estimated_victims")\
+                    .gte("activated_at", since)\
+                    .gt("id", last_id)\
+                    .order("id")\
+                    .limit(LOAD_PAGE_SIZE)\
+                    .execute()
+                page = response.data or []
+                rows.extend(page)
+                if len(page) < LOAD_PAGE_SIZE:
+                    break
+                last_id = page[-1]["id"]
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+
+        rows.sort(key=lambda r: (parse_timestamp(r.get('activated_at')), r['id']))
+        with self._lock:
+            journal, self._journal = self._journal, None
+            self._incidents.clear()
+            self._cells.clear()
+            self._member_of.clear()
+            self._expiry.clear()
+            for row in rows:
+                self._assign(row)
+            for operation, value in journal:
+                if operation == 'assign':
+                    self._assign(value)
+                else:
+                    self._remove(value)
+            self._loaded_at = time.monotonic()
+
+    # Maintenance
+
+    def _bucket(self, incident: Incident) -> None:
+        key = (incident.emergency_type,) + cell_key(incident.latitude, incident.longitude, self.cell_deg)
+        if key != incident.cell:
+            if incident.cell is not None:
+                self._unbucket(incident)
+            self._cells[key].add(incident.id)
+            incident.cell = key
+
+    def _unbucket(self, incident: Incident) -> None:
+        bucket = self._cells.get(incident.cell)
+        if bucket is not None:
+            bucket.discard(incident.id)
+            if not bucket:
+                del self._cells[incident.cell]
+        incident.cell = None
+
+    def _drop_incident(self, incident: Incident) -> None:
+        self._unbucket(incident)
+        self._incidents.pop(incident.id, None)
+        for member_id in incident.members:
+            if self._member_of.get(member_id) == incident.id:
+                del self._member_of[member_id]
+
+    def _expire(self) -> None:
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - self.retention
+        while self._expiry and self._expiry[0][0] < cutoff:
+            last_at, incident_id = heapq.heappop(self._expiry)
+            incident = self._incidents.get(incident_id)
+            # Entries are pushed on every update; only the latest one counts
+            if incident is not None and incident.last_at == last_at:
+                self._drop_incident(incident)
+
+    def _nearby(self, emergency_type: str, lat: float, lon: float, activated_at: datetime) -> list:
+        matches = []
+        for row, col in cells_in_bbox(radius_to_bbox(lat, lon, self.radius_m), self.cell_deg):
+            for incident_id in self._cells.get((emergency_type, row, col), ()):
+                incident = self._incidents[incident_id]
+                if activated_at < incident.first_at - self.window or activated_at > incident.last_at + self.window:
+                    continue
+                if haversine_m(lat, lon, incident.latitude, incident.longitude) <= self.radius_m:
+                    matches.append(incident)
+        return matches
+
+    def _merge(self, target: Incident, other: Incident) -> None:
+        self._unbucket(other)
+        del self._incidents[other.id]
+        target.lat_sum += other.lat_sum
+        target.lon_sum += other.lon_sum
+        target.victims += other.victims
+        target.first_at = min(target.first_at, other.first_at)
+        target.last_at = max(target.last_at, other.last_at)
+        for member_id, member in other.members.items():
+            target.members[member_id] = member
+            self._member_of[member_id] = target.id
+
+    def _assign(self, row: dict):
+        lat, lon = to_float(row.get('latitude')), to_float(row.get('longitude'))
+        emergency_type = row.get('emergency_type') or 'other'
+        if lat is None or lon is None or 'id' not in row:
+            return None
+        if row['id'] in self._member_of:
+            self._remove(row['id'])
+
+        activated_at = parse_timestamp(row.get('activated_at'))
+        victims = row.get('estimated_victims') or 0
+
+        candidates = self._nearby(emergency_type, lat, lon, activated_at)
+        if candidates:
+            incident = min(candidates, key=lambda i: i.id)
+            for other in candidates:
+                if other is not incident:
+                    self._merge(incident, other)
+        else:
+            incident = Incident(row['id'], emergency_type)
+            incident.first_at = incident.last_at = activated_at
+            self._incidents[incident.id] = incident
+
+        incident.members[row['id']] = (lat, lon, victims, activated_at)
+        incident.lat_sum += lat
+        incident.lon_sum += lon
+        incident.victims += victims
+        incident.first_at = min(incident.first_at, activated_at)
+        incident.last_at = max(incident.last_at, activated_at)
+        self._member_of[row['id']] = incident.id
+        self._bucket(incident)
+        heapq.heappush(self._expiry, (incident.last_at, incident.id))
+        return incident
+
+    def _remove(self, emergency_id: int) -> None:
+        incident = self._incidents.get(self._member_of.pop(emergency_id, None))
+        if incident is None:
+            return
+        lat, lon, victims, _ = incident.members.pop(emergency_id)
+        if not incident.members:
+            self._drop_incident(incident)
+            return
+        incident.lat_sum -= lat
+        incident.lon_sum -= lon
+        incident.victims -= victims
+        incident.first_at = min(member[3] for member in incident.members.values())
+        last_at = max(member[3] for member in incident.members.values())
+        if last_at != incident.last_at:
+            incident.last_at = last_at
+            heapq.heappush(self._expiry, (last_at, incident.id))
+        self._bucket(incident)
+
+    # Public API
+
+    def add(self, row: dict):
+        """
+        Assign a newly created or updated emergency to an incident
+
+        Never loads or refreshes the incidents: that is a table scan, and this
+        runs inside the SOS write. Loading is left to the readers; until then
+        the emergency is picked up by the first load.
+
+        Args:
+            row (dict): Emergency row as returned by Supabase
+
+        Returns:
+            int: Incident id, or None if the row has no coordinates or the
+            incidents are not loaded yet
+        """
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(('assign', row))
+            if self._loaded_at is None:
+                return None
+            self._expire()
+            incident = self._assign(row)
+            return incident.id if incident else None
+
+    def remove(self, emergency_id: int) -> None:
+        """Forget a deleted emergency"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(('remove', emergency_id))
+            self._remove(emergency_id)
+
+    def incidents(self, emergency_types: set = None, bbox: tuple = None, min_count: int = 1) -> list:
+        """
+        Live incidents, most recently active first
+
+        Args:
+            emergency_types (set, optional): Only these emergency types
+            bbox (tuple, optional): (min_lat, min_lon, max_lat, max_lon) the centroid must fall in
+            min_count (int): Minimum number of emergencies in the incident
+
+        Returns:
+            list: Incident dicts with centroid, counts and victim totals
+        """
+        self.ensure_loaded()
+        with self._lock:
+            self._expire()
+            selected = [
+                incident for incident in self._incidents.values()
+                if len(incident.members) >= min_count
+                and (not emergency_types or incident.emergency_type in emergency_types)
+                and (bbox is None or in_bbox(incident.latitude, incident.longitude, bbox))
+            ]
+            selected.sort(key=lambda i: (i.last_at, i.id), reverse=True)
+            return [incident.to_dict() for incident in selected]
+
+
+incident_clusterer = IncidentClusterer()
@@ -0,0 +1,304 @@
+"""
+Validation and batched insertion of location rows for bulk imports.
+
+Rows are read incrementally from a CSV or GeoJSON upload, validated against
+the ``locations`` schema and inserted in chunks. Each chunk is one call to the
+``create_locations_with_verification`` procedure (api/DB/rpc_functions.sql),
+which writes the locations and their verification records in one transaction.
+"""
+
+import codecs
+import csv
+import json
+import re
+
+from api.DB.connection import supabase
+from api.services.location_index import location_index, LOCATION_CATEGORIES
+
+LOCATION_COLUMNS = (
+    'created_by', 'latitude', 'longitude', 'address', 'category', 'title',
+    'description', 'organization', 'capacity', 'start_time', 'end_time',
+)
+MAX_LENGTHS = {'title': 255, 'organization': 255, 'capacity': 100}
+TIME_PATTERN = re.compile(r'^([01]\d|2[0-3]):[0-5]\d(:[0-5]\d)?$')
+
+CHUNK_SIZE = 500
+MAX_ROWS = 10000
+GEOJSON_READ_BYTES = 64 * 1024
+# A single feature larger than this is rejected rather than buffered
+MAX_FEATURE_BYTES = 1024 * 1024
+
+
+def iter_csv_rows(stream, encoding: str = 'utf-8'):
+    """
+    Yield dict rows from a CSV upload without reading it all into memory
+
+    Args:
+        stream: Binary file-like request stream
+        encoding (str): Text encoding of the upload
+    """
+    reader = csv.DictReader(codecs.iterdecode(stream, encoding))
+    for row in reader:
+        yield {(k or '').strip(): v for k, v in row.items()}
+
+
+class _JSONReader:
+    """Pull JSON values one at a time from a UTF-8 byte stream"""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self._text = codecs.getincrementaldecoder('utf-8')()
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._stream.read(GEOJSON_READ_BYTES)
+        self._eof = not chunk
+        self._buffer = self._buffer[self._pos:] + self._text.decode(chunk, final=self._eof)
+        self._pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Next non-whitespace character, or '' at the end of the stream"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(self._buffer) or not self._fill():
+                return self._buffer[self._pos:self._pos + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"expected '{char}'")
+        self._pos += 1
+
+    def value(self):
+        """Decode the next complete JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # A number at the end of the buffer may continue in the next chunk
+                if end < len(self._buffer) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError as e:
+                if self._eof:
+                    raise ValueError(f"malformed JSON: {e.msg}") from None
+            if len(self._buffer) - self._pos > MAX_FEATURE_BYTES:
+                raise ValueError(f"a single value is limited to {MAX_FEATURE_BYTES} bytes")
+            self._fill()
+
+
+def _check_type(value) -> None:
+    if value != 'FeatureCollection':
+        raise ValueError("GeoJSON body must be a FeatureCollection")
+
+
+def iter_geojson_rows(stream):
+    """
+    Stream a GeoJSON FeatureCollection of Point features as an iterator of
+    dict rows, one feature in memory at a time. Coordinates are taken from
+    the geometry, everything else from the properties.
+
+    Raises:
+        ValueError: If the body is not a JSON FeatureCollection; once rows are
+            being read, if the rest of the body is malformed
+    """
+    reader = _JSONReader(stream)
+    reader.expect('{')
+    seen_type = False
+    while reader.peek() != '}':
+        key = reader.value()
+        reader.expect(':')
+        if key == 'features':
+            if reader.peek() != '[':
+                raise ValueError("features must be an array")
+            reader.expect('[')
+            return _feature_rows(reader, seen_type)
+        value = reader.value()
+        if key == 'type':
+            _check_type(value)
+            seen_type = True
+        if reader.peek() == ',':
+            reader.expect(',')
+    if not seen_type:
+        _check_type(None)
+    return iter(())
+
+
+def _feature_rows(reader: _JSONReader, seen_type: bool):
+    if reader.peek() != ']':
+        while True:
+            yield _feature_row(reader.value())
+            if reader.peek() != ',':
+                break
+            reader.expect(',')
+    reader.expect(']')
+    # Members after the features, where a "type" written last is checked
+    while reader.peek() == ',':
+        reader.expect(',')
+        key = reader.value()
+        reader.expect(':')
+        value = reader.value()
+        if key == 'type':
+            _check_type(value)
+            seen_type = True
+    reader.expect('}')
+    if not seen_type:
+        _check_type(None)
+
+
+def _feature_row(feature) -> dict:
+    if not isinstance(feature, dict):
+        return {'_feature_error': "Feature must be a GeoJSON object"}
+    properties = feature.get('properties')
+    properties = dict(properties) if isinstance(properties, dict) else {}
+    geometry = feature.get('geometry')
+    if not isinstance(geometry, dict):
+        geometry = {}
+    coordinates = geometry.get('coordinates')
+    if geometry.get('type') == 'Point' and isinstance(coordinates, list) and len(coordinates) >= 2:
+        properties['longitude'], properties['latitude'] = coordinates[:2]
+    else:
+        properties.setdefault('_feature_error', "Feature geometry must be a Point")
+    return properties
+
+
+def validate_location(raw: dict) -> tuple:
+    """
+    Clean and validate one location row
+
+    Args:
+        raw (dict): Row as read from the upload (strings or JSON values)
+
+    Returns:
+        tuple: (clean row dict, list of error messages)
+    """
+    errors = []
+    if raw.get('_feature_error'):
+        errors.append(raw['_feature_error'])
+
+    row = {}
+    for column in LOCATION_COLUMNS:
+        value = raw.get(column)
+        if isinstance(value, str):
+            value = value.strip()
+        row[column] = None if value == '' else value
+
+    try:
+        row['created_by'] = int(row['created_by'])
+    except (TypeError, ValueError):
+        errors.append("created_by must be a user id")
+
+    for column, low, high in (('latitude', -90, 90), ('longitude', -180, 180)):
+        try:
+            row[column] = float(row[column])
+            if not low <= row[column] <= high:
+                errors.append(f"{column} must be between {low} and {high}")
+        except (TypeError, ValueError):
+            errors.append(f"{column} is required and must be a number")
+
+    if row['category'] not in LOCATION_CATEGORIES:
+        errors.append(f"category must be one of: {', '.join(LOCATION_CATEGORIES)}")
+
+    for column in ('start_time', 'end_time'):
+        if row[column] is not None and not TIME_PATTERN.match(str(row[column])):
+            errors.append(f"{column} must be HH:MM or HH:MM:SS")
+
+    for column, limit in MAX_LENGTHS.items():
+        if row[column] is not None and len(str(row[column])) > limit:
+            errors.append(f"{column} must be at most {limit} characters")
+
+    return {k: v for k, v in row.items() if v is not None}, errors
+
+
+def insert_locations(rows: list) -> list:
+    """
+    Insert locations and their unverified verification records in one
+    transaction, so a failure leaves neither behind
+
+    Args:
+        rows (list): Validated location rows
+
+    Returns:
+        list: Inserted location rows, in input order
+
+    Raises:
+        Exception: If the insert fails
+    """
+    result = supabase.rpc("create_locations_with_verification", {"p_locations": rows}).execute().data or {}
+    inserted = (result.get("locations") or []) if result.get("status") == "ok" else []
+    if len(inserted) != len(rows):
+        raise Exception("Location insert returned an unexpected number of rows")
+    for row in inserted:
+        location_index.upsert(row, "unverified")
+    return inserted
+
+
+def import_locations(rows, created_by: int = None, chunk_size: int = CHUNK_SIZE,
+                     max_rows: int = MAX_ROWS) -> dict:
+    """
+    Validate and insert an iterable of raw rows in chunks
+
+    Args:
+        rows: Iterable of raw row dicts (e.g. from iter_csv_rows)
+        created_by (int, optional): Owner of every row, replacing any created_by
+            in the upload; None (admins) keeps each row's own
+        chunk_size (int): Rows per insert call
+        max_rows (int): Reading stops after this many rows
+
+    Returns:
+        dict: ``summary`` counts and per-row ``results`` (1-based ``row`` numbers)
+    """
+    rows = iter(rows)
+    results = []
+    pending = []
+
+    def flush():
+        if not pending:
+            return
+        try:
+            inserted = insert_locations([row for _, row in pending])
+            for (number, _), created in zip(pending, inserted):
+                results.append({"row": number, "status": "created", "id": created["id"]})
+        except Exception as e:
+            for number, _ in pending:
+                results.append({"row": number, "status": "failed", "errors": [str(e)]})
+        pending.clear()
+
+    number = 0
+    while True:
+        number += 1
+        try:
+            raw = next(rows, None)
+        except Exception as e:
+            # The upload cannot be read past this point (bad encoding, malformed CSV
+            # or JSON, body over the size limit); earlier chunks are already stored
+            results.append({"row": number, "status": "skipped", "errors": [f"Upload could not be read from here on: {e}"]})
+            break
+        if raw is None:
+            break
+        if number > max_rows:
+            # Stop reading; this row and everything after it is left out
+            results.append({"row": number, "status": "skipped", "errors": [f"Import is limited to {max_rows} rows; this and later rows were not read"]})
+            break
+        if created_by is not None:
+            raw = dict(raw, created_by=created_by)
+        row, errors = validate_location(raw)
+        if errors:
+            results.append({"row": number, "status": "invalid", "errors": errors})
+            continue
+        pending.append((number, row))
+        if len(pending) >= chunk_size:
+            flush()
+    flush()
+
+    results.sort(key=lambda r: r["row"])
+    summary = {"total": len(results)}
+    for status in ("created", "invalid", "failed", "skipped"):
+        summary[status] = sum(1 for r in results if r["status"] == status)
+    return {"summary": summary, "results": results}
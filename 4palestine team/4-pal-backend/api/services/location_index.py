@@ -0,0 +1,542 @@
+"""
+In-process spatial index over the ``locations`` table.
+
+Locations are bucketed into a fixed lat/lon grid so radius and bounding-box
+queries only touch the cells that overlap the search area instead of the
+whole table. The index is loaded lazily from Supabase, kept current by the
+location routes on every write and fully reloaded after a refresh interval
+so changes made by other workers are eventually picked up.
+
+Verified locations are additionally held in one k-d tree per category, over
+unit-sphere coordinates, for nearest-facility lookups. Writes do not rebuild a
+tree; they go to a small buffer of added and stale ids that queries scan
+alongside it, and the tree is rebuilt once that buffer outgrows
+``NEAREST_REBUILD_MIN`` or ``NEAREST_REBUILD_FRACTION`` of the tree.
+
+Opening hours (``start_time``/``end_time`` and the ``location_schedule``
+days) are indexed by the quarter-hours of the day each location is open, so
+"open now" filters combine with the geo filters in the same pass.
+"""
+
+import os
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+from api.DB.connection import supabase
+from api.utils.geo import (
+    cell_key,
+    cells_in_bbox,
+    haversine_m,
+    in_bbox,
+    meters_to_chord,
+    radius_to_bbox,
+    to_float,
+    to_unit_vector,
+)
+from api.utils.kdtree import KDTree
+
+LOCATION_CATEGORIES = (
+    'food_distribution',
+    'medical_facility',
+    'water_source',
+    'refuge_camp',
+    'danger_zone',
+)
+
+# ~1.1 km cells: a typical neighbourhood search touches a handful of cells
+CELL_DEG = 0.01
+LOAD_PAGE_SIZE = 1000
+
+NEAREST_REBUILD_MIN = 32
+NEAREST_REBUILD_FRACTION = 0.1
+
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+MINUTES_PER_DAY = 24 * 60
+SCHEDULE_BUCKET_MINUTES = 15
+# Opening hours are local times of this zone
+SCHEDULE_TIMEZONE = os.getenv('LOCATION_TIMEZONE', 'Asia/Gaza')
+
+
+def parse_time_of_day(value) -> int:
+    """
+    Minutes after midnight of an ``HH:MM`` or ``HH:MM:SS`` time
+
+    Raises:
+        ValueError: If the value is not a valid time of day
+    """
+    parts = str(value).strip().split(':')
+    if len(parts) not in (2, 3) or not all(part.isdigit() for part in parts):
+        raise ValueError("time must be HH:MM")
+    hours, minutes = int(parts[0]), int(parts[1])
+    if not (0 <= hours < 24 and 0 <= minutes < 60):
+        raise ValueError("time must be HH:MM")
+    return hours * 60 + minutes
+
+
+def local_time_of_day(moment: datetime = None) -> tuple:
+    """
+    Weekday and minute of the day in SCHEDULE_TIMEZONE
+
+    Returns:
+        tuple: (weekday name, minutes after midnight)
+    """
+    moment = moment or datetime.now(ZoneInfo(SCHEDULE_TIMEZONE))
+    return WEEKDAYS[moment.weekday()], moment.hour * 60 + moment.minute
+
+
+class _ScheduleIndex:
+    """
+    Locations bucketed by the quarter-hours they are open.
+
+    A location without both a start and an end time (or with equal ones) is
+    open all day. Without ``location_schedule`` rows it is open every day.
+    An end time earlier than the start time runs past midnight into the next day.
+    """
+
+    def __init__(self):
+        self._hours = {}
+        self._all_day = set()
+        self._buckets = [set() for _ in range(MINUTES_PER_DAY // SCHEDULE_BUCKET_MINUTES)]
+
+    @staticmethod
+    def _ranges(start, end):
+        if start is None or end is None or start == end:
+            return None
+        if start < end:
+            return [(start, end)]
+        return [(start, MINUTES_PER_DAY), (0, end)]
+
+    def days(self, location_id: int):
+        hours = self._hours.get(location_id)
+        return hours[2] if hours else None
+
+    def put(self, location_id: int, start, end, days) -> None:
+        self.discard(location_id)
+        self._hours[location_id] = (start, end, days)
+        ranges = self._ranges(start, end)
+        if ranges is None:
+            self._all_day.add(location_id)
+            return
+        for low, high in ranges:
+            for bucket in range(low // SCHEDULE_BUCKET_MINUTES, (high - 1) // SCHEDULE_BUCKET_MINUTES + 1):
+                self._buckets[bucket].add(location_id)
+
+    def discard(self, location_id: int) -> None:
+        hours = self._hours.pop(location_id, None)
+        if hours is None:
+            return
+        ranges = self._ranges(hours[0], hours[1])
+        if ranges is None:
+            self._all_day.discard(location_id)
+            return
+        for low, high in ranges:
+            for bucket in range(low // SCHEDULE_BUCKET_MINUTES, (high - 1) // SCHEDULE_BUCKET_MINUTES + 1):
+                self._buckets[bucket].discard(location_id)
+
+    def is_open(self, location_id: int, day: str, minute: int) -> bool:
+        hours = self._hours.get(location_id)
+        if hours is None:
+            return False
+        start, end, days = hours
+        if self._ranges(start, end) is None:
+            return days is None or day in days
+        if start < end:
+            return start <= minute < end and (days is None or day in days)
+        if minute >= start:
+            return days is None or day in days
+        # After midnight the opening belongs to the previous day's schedule
+        previous_day = WEEKDAYS[WEEKDAYS.index(day) - 1]
+        return minute < end and (days is None or previous_day in days)
+
+    def open_ids(self, day: str, minute: int) -> list:
+        """Ids of the locations open at ``minute`` on ``day``"""
+        candidates = self._buckets[minute // SCHEDULE_BUCKET_MINUTES] | self._all_day
+        return [location_id for location_id in candidates if self.is_open(location_id, day, minute)]
+
+
+def _schedule_days(schedule: list):
+    days = frozenset(entry.get('day_of_week') for entry in schedule or [] if entry.get('day_of_week') in WEEKDAYS)
+    return days or None
+
+
+def _time_or_none(value):
+    try:
+        return parse_time_of_day(value) if value else None
+    except ValueError:
+        return None
+
+
+class _CategoryTree:
+    """k-d tree over one category's verified locations plus the writes since it was built"""
+
+    def __init__(self):
+        self.points = {}
+        self.tree = KDTree([])
+        self._tree_ids = frozenset()
+        self._fresh = {}
+        self._stale = set()
+
+    def add(self, location_id: int, point: tuple) -> None:
+        if self.points.get(location_id) == point:
+            return
+        self.points[location_id] = point
+        self._fresh[location_id] = point
+        if location_id in self._tree_ids:
+            self._stale.add(location_id)
+
+    def discard(self, location_id: int) -> None:
+        if self.points.pop(location_id, None) is None:
+            return
+        self._fresh.pop(location_id, None)
+        if location_id in self._tree_ids:
+            self._stale.add(location_id)
+
+    def rebuild(self) -> None:
+        self.tree = KDTree(self.points.items())
+        self._tree_ids = frozenset(self.points)
+        self._fresh.clear()
+        self._stale.clear()
+
+    def nearest(self, point: tuple, k: int, max_chord: float = None) -> list:
+        """(squared chord, location_id) pairs of the k nearest locations"""
+        if len(self._fresh) + len(self._stale) > max(NEAREST_REBUILD_MIN, NEAREST_REBUILD_FRACTION * len(self.tree)):
+            self.rebuild()
+        stale = self._stale
+        found = self.tree.nearest(point, k, max_chord, accept=(lambda i: i not in stale) if stale else None)
+        if self._fresh:
+            limit = float('inf') if max_chord is None else max_chord * max_chord
+            for location_id, fresh_point in self._fresh.items():
+                distance = sum((a - b) * (a - b) for a, b in zip(point, fresh_point))
+                if distance <= limit:
+                    found.append((distance, location_id))
+            found.sort()
+        return found[:k]
+
+
+class LocationIndex:
+    """Grid index of locations keyed by (row, col) cell with verification status"""
+
+    def __init__(self, cell_deg: float = CELL_DEG, refresh_seconds: int = None):
+        self.cell_deg = cell_deg
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else int(
+            os.getenv('LOCATION_INDEX_REFRESH_SECONDS', '300')
+        )
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+        self._rows = {}
+        self._status = {}
+        self._cells = defaultdict(set)
+        self._cell_of = {}
+        self._trees = {}
+        self._tree_of = {}
+        self._schedule = _ScheduleIndex()
+        self._journal = None
+        self._loaded_at = None
+
+    # Loading
+
+    def ensure_loaded(self) -> None:
+        """Load the index on first use and reload it once it is older than the refresh interval"""
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            with self._reload_lock:
+                if self._loaded_at is None:
+                    self._reload()
+        elif time.monotonic() - loaded_at > self.refresh_seconds:
+            # A stale index is still usable: one caller refreshes it, the others do not wait
+            if self._reload_lock.acquire(blocking=False):
+                try:
+                    self._reload()
+                except Exception as e:
+                    print("location index refresh error:", e)
+                finally:
+                    self._reload_lock.release()
+
+    def reload(self) -> None:
+        """Rebuild the index from the database, paging through ``locations`` by id"""
+        with self._reload_lock:
+            self._reload()
+
+    def _reload(self) -> None:
+        with self._lock:
+            # Writes made while the rows are being read are replayed on top of them
+            self._journal = []
+        rows = []
+        last_id = 0
+        try:
+            while True:
+                response = supabase.table("locations")\
+                    .select("*, location_verifications(status), location_schedule(day_of_week)")\
+                    .gt("id", last_id)\
+                    .order("id")\
+                    .limit(LOAD_PAGE_SIZE)\
+                    .execute()
+                page = response.data or []
+                rows.extend(page)
+                if len(page) < LOAD_PAGE_SIZE:
+                    break
+                last_id = page[-1]["id"]
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+        with self._lock:
+            journal, self._journal = self._journal, None
+            self.load(rows)
+            for operation, *args in journal:
+                if operation == 'upsert':
+                    self._upsert(*args)
+                elif operation == 'remove':
+                    self._remove(*args)
+                else:
+                    self._set_status(*args)
+
+    def load(self, rows: list) -> None:
+        """
+        Replace the index contents
+
+        Args:
+            rows (list): Location rows, optionally with embedded
+                ``location_verifications`` and ``location_schedule`` lists
+        """
+        with self._lock:
+            self._rows.clear()
+            self._status.clear()
+            self._cells.clear()
+            self._cell_of.clear()
+            self._trees.clear()
+            self._tree_of.clear()
+            self._schedule = _ScheduleIndex()
+            for row in rows:
+                verifications = row.get('location_verifications') or []
+                status = 'unverified'
+                if any(v.get('status') == 'verified' for v in verifications):
+                    status = 'verified'
+                self._put(row, status)
+            for tree in self._trees.values():
+                tree.rebuild()
+            self._loaded_at = time.monotonic()
+
+    # Incremental maintenance
+
+    def _put(self, row: dict, status: str = None) -> None:
+        location_id = row['id']
+        # Writes through the API never carry schedule days; keep the loaded ones
+        days = _schedule_days(row['location_schedule']) if 'location_schedule' in row else self._schedule.days(location_id)
+        self._drop(location_id)
+        row = {k: v for k, v in row.items() if k not in ('location_verifications', 'location_schedule')}
+        self._rows[location_id] = row
+        self._schedule.put(location_id, _time_or_none(row.get('start_time')), _time_or_none(row.get('end_time')), days)
+        self._status[location_id] = status or self._status.get(location_id, 'unverified')
+        lat, lon = to_float(row.get('latitude')), to_float(row.get('longitude'))
+        if lat is not None and lon is not None:
+            key = cell_key(lat, lon, self.cell_deg)
+            self._cells[key].add(location_id)
+            self._cell_of[location_id] = key
+        self._sync_tree(location_id)
+
+    def _sync_tree(self, location_id: int) -> None:
+        """Move a location into, between or out of the per-category nearest trees"""
+        row = self._rows.get(location_id)
+        target = point = None
+        if row is not None and self._status.get(location_id) == 'verified' and location_id in self._cell_of:
+            target = row.get('category')
+            point = to_unit_vector(float(row['latitude']), float(row['longitude']))
+        current = self._tree_of.get(location_id)
+        if current is not None and current != target:
+            self._trees[current].discard(location_id)
+            del self._tree_of[location_id]
+        if target is not None:
+            self._trees.setdefault(target, _CategoryTree()).add(location_id, point)
+            self._tree_of[location_id] = target
+
+    def _drop(self, location_id: int) -> None:
+        self._schedule.discard(location_id)
+        key = self._cell_of.pop(location_id, None)
+        if key is not None:
+            bucket = self._cells.get(key)
+            if bucket is not None:
+                bucket.discard(location_id)
+                if not bucket:
+                    del self._cells[key]
+
+    def _upsert(self, row: dict, status: str = None) -> None:
+        previous = self._rows.get(row['id'], {})
+        self._put({**previous, **row}, status)
+
+    def _remove(self, location_id: int) -> None:
+        self._drop(location_id)
+        self._rows.pop(location_id, None)
+        self._status.pop(location_id, None)
+        self._sync_tree(location_id)
+
+    def _set_status(self, location_id: int, status: str) -> None:
+        if location_id in self._rows:
+            self._status[location_id] = status
+            self._sync_tree(location_id)
+
+    def upsert(self, row: dict, status: str = None) -> None:
+        """Insert or replace a location after a write; ignored until the index is loaded"""
+        if 'id' not in row:
+            return
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(('upsert', row, status))
+            if self._loaded_at is not None:
+                self._upsert(row, status)
+
+    def remove(self, location_id: int) -> None:
+        """Remove a deleted location"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(('remove', location_id))
+            self._remove(location_id)
+
+    def set_status(self, location_id: int, status: str) -> None:
+        """Record a verification status change"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(('set_status', location_id, status))
+            self._set_status(location_id, status)
+
+    # Queries
+
+    def _candidates(self, bbox: tuple):
+        min_row, min_col = cell_key(bbox[0], bbox[1], self.cell_deg)
+        max_row, max_col = cell_key(bbox[2], bbox[3], self.cell_deg)
+        if (max_row - min_row + 1) * (max_col - min_col + 1) > len(self._cells):
+            # Search area covers more cells than are populated: walk the populated ones
+            return [
+                location_id
+                for (row, col), bucket in self._cells.items()
+                if min_row <= row <= max_row and min_col <= col <= max_col
+                for location_id in bucket
+            ]
+        return [
+            location_id
+            for key in cells_in_bbox(bbox, self.cell_deg)
+            for location_id in self._cells.get(key, ())
+        ]
+
+    def query(self, lat: float = None, lon: float = None, radius_m: float = None,
+              bbox: tuple = None, categories: set = None, verified_only: bool = False,
+              open_at: tuple = None) -> list:
+        """
+        Find locations inside a radius and/or bounding box, nearest first.
+        Without either, every location open at ``open_at``, by id
+
+        Args:
+            lat (float, optional): Search center latitude (required with radius_m)
+            lon (float, optional): Search center longitude (required with radius_m)
+            radius_m (float, optional): Search radius in meters
+            bbox (tuple, optional): (min_lat, min_lon, max_lat, max_lon)
+            categories (set, optional): Allowed location categories
+            verified_only (bool): Only return verified locations
+            open_at (tuple, optional): (weekday name, minutes after midnight)
+                the location must be open at, as from local_time_of_day
+
+        Returns:
+            list: Location rows with ``verification_status`` and, with a geo
+            filter, ``distance_m``
+        """
+        self.ensure_loaded()
+
+        search_box = bbox
+        if radius_m is not None:
+            circle_box = radius_to_bbox(lat, lon, radius_m)
+            search_box = circle_box if bbox is None else (
+                max(bbox[0], circle_box[0]), max(bbox[1], circle_box[1]),
+                min(bbox[2], circle_box[2]), min(bbox[3], circle_box[3]),
+            )
+            if search_box[0] > search_box[2] or search_box[1] > search_box[3]:
+                return []
+
+        if search_box is None:
+            return self._open_locations(open_at, categories, verified_only)
+
+        if lat is None or lon is None:
+            # Sort bbox-only results by distance from the box center
+            lat = (search_box[0] + search_box[2]) / 2
+            lon = (search_box[1] + search_box[3]) / 2
+
+        results = []
+        with self._lock:
+            for location_id in self._candidates(search_box):
+                row = self._rows[location_id]
+                status = self._status.get(location_id, 'unverified')
+                if verified_only and status != 'verified':
+                    continue
+                if categories and row.get('category') not in categories:
+                    continue
+                if open_at is not None and not self._schedule.is_open(location_id, *open_at):
+                    continue
+                point_lat, point_lon = float(row['latitude']), float(row['longitude'])
+                if not in_bbox(point_lat, point_lon, search_box):
+                    continue
+                distance = haversine_m(lat, lon, point_lat, point_lon)
+                if radius_m is not None and distance > radius_m:
+                    continue
+                results.append((distance, location_id, row, status))
+
+        results.sort(key=lambda item: (item[0], item[1]))
+        return [
+            {**row, 'verification_status': status, 'distance_m': round(distance, 1)}
+            for distance, _, row, status in results
+        ]
+
+    def _open_locations(self, open_at: tuple, categories: set = None, verified_only: bool = False) -> list:
+        """Every location open at ``open_at``, read from the schedule buckets"""
+        results = []
+        with self._lock:
+            for location_id in sorted(self._schedule.open_ids(*open_at)):
+                row = self._rows[location_id]
+                status = self._status.get(location_id, 'unverified')
+                if verified_only and status != 'verified':
+                    continue
+                if categories and row.get('category') not in categories:
+                    continue
+                results.append({**row, 'verification_status': status})
+        return results
+
+    def nearest(self, lat: float, lon: float, k: int = 5, categories: set = None,
+                max_distance_m: float = None) -> list:
+        """
+        Find the k verified locations closest to a point
+
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            k (int): Number of results
+            categories (set, optional): Allowed location categories (all by default)
+            max_distance_m (float, optional): Ignore locations farther than this
+
+        Returns:
+            list: Location rows with ``verification_status`` and ``distance_m``, nearest first
+        """
+        self.ensure_loaded()
+        point = to_unit_vector(lat, lon)
+        max_chord = meters_to_chord(max_distance_m) if max_distance_m is not None else None
+
+        with self._lock:
+            found = []
+            for category, tree in self._trees.items():
+                if not categories or category in categories:
+                    found.extend(tree.nearest(point, k, max_chord))
+            found.sort()
+            rows = [self._rows[location_id] for _, location_id in found[:k]]
+
+        results = [
+            (haversine_m(lat, lon, float(row['latitude']), float(row['longitude'])), row['id'], row)
+            for row in rows
+        ]
+        results.sort(key=lambda item: (item[0], item[1]))
+        return [
+            {**row, 'verification_status': 'verified', 'distance_m': round(distance, 1)}
+            for distance, _, row in results
+        ]
+
+
+location_index = LocationIndex()
@@ -1,22 +1,69 @@
-from flask_mail import  Message
-import os, random, string
+import os, random, string, threading, time
+from datetime import datetime, timedelta, timezone
+from api.DB.connection import supabase
 from api.extensions import mail
 
+# Outbox delivery settings
+OUTBOX_WORKERS = int(os.getenv("MAIL_OUTBOX_WORKERS", "2"))
+OUTBOX_BATCH_SIZE = int(os.getenv("MAIL_OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("MAIL_OUTBOX_MAX_ATTEMPTS", "5"))
+OUTBOX_RETRY_BASE_SECONDS = int(os.getenv("MAIL_OUTBOX_RETRY_BASE_SECONDS", "30"))
+OUTBOX_POLL_SECONDS = int(os.getenv("MAIL_OUTBOX_POLL_SECONDS", "10"))
+OUTBOX_LEASE_SECONDS = int(os.getenv("MAIL_OUTBOX_LEASE_SECONDS", "300"))
+OUTBOX_IDLE_SECONDS = int(os.getenv("MAIL_OUTBOX_IDLE_SECONDS", "60"))
+
+_outbox_wakeup = threading.Event()
+_outbox_workers = []
+_outbox_workers_lock = threading.Lock()
+
+
 def generate_code(length=6):
     return ''.join(random.choices(string.digits, k=length))
 
 
-def send_mail(email_title, email_body, recipient_email):
-    try:
-        msg = Message(email_title, recipients=[recipient_email])
-        msg.body = email_body
-        mail.send(msg)
-        return True
-    except Exception as e:
-        print("ERROR:", e)  
-        return False
+def _utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def enqueue_mail(email_title, email_body, recipient_email):
+    """
+    Write an email to the outbox for background delivery
+
+    Returns:
+        int: Outbox row id
+
+    Raises:
+        Exception: If the outbox row could not be written
+    """
+    response = supabase.table("email_outbox").insert({
+        "recipient": recipient_email,
+        "subject": email_title,
+        "body": email_body,
+        "status": "pending"
+    }).execute()
+    if not response.data:
+        raise Exception("Outbox insert returned no row")
+    _outbox_wakeup.set()
+    return response.data[0]["id"]
+
+
+def get_delivery_status(outbox_id):
+    """Return the outbox row (status, attempts, last_error, sent_at) for an enqueued email"""
+    response = supabase.table("email_outbox")\
+        .select("id, recipient, status, attempts, last_error, created_at, sent_at")\
+        .eq("id", outbox_id)\
+        .limit(1)\
+        .execute()
+    return response.data[0] if response.data else None
+
 
 def send_confirmation_email(user_email, code):
+    """
+    Queue the confirmation code email
+
+    Returns:
+        bool: True once the email is in the outbox
+    """
     try:
         email_title = "Confirm your email"
         email_body = f""""
@@ -24,9 +71,202 @@ def send_confirmation_email(user_email, code):
         {code}
         """
 
-        sent = send_mail(email_title, email_body, user_email)      
-        return sent
+        enqueue_mail(email_title, email_body, user_email)
+        return True
 
     except Exception as e:
-        print(f"error while sending mail: {e}")
-        return False
\ No newline at end of file
+        print(f"error while queueing mail: {e}")
+        return False
+
+
+class OutboxWorker(threading.Thread):
+    """
+    Background thread draining the email outbox over one long-lived SMTP
+    connection, which is reopened on failure and closed when idle.
+    """
+
+    def __init__(self, app, name=None):
+        super().__init__(name=name, daemon=True)
+        self.app = app
+        self.connection = None
+        self.last_used = 0.0
+        self.stopping = threading.Event()
+
+    def run(self):
+        # Wait one poll interval (or for the first enqueue) before touching the
+        # database, so a cold start serves its first request without competition
+        _outbox_wakeup.wait(OUTBOX_POLL_SECONDS)
+        with self.app.app_context():
+            while not self.stopping.is_set():
+                try:
+                    processed = self.drain_batch()
+                except Exception as e:
+                    print("outbox worker error:", e)
+                    processed = 0
+                if processed:
+                    continue
+                if self.connection is not None and time.monotonic() - self.last_used > OUTBOX_IDLE_SECONDS:
+                    self._close()
+                _outbox_wakeup.wait(OUTBOX_POLL_SECONDS)
+                _outbox_wakeup.clear()
+            self._close()
+
+    def stop(self):
+        self.stopping.set()
+        _outbox_wakeup.set()
+
+    def _open(self):
+        if self.connection is None:
+            connection = mail.connect()
+            connection.__enter__()
+            self.connection = connection
+        return self.connection
+
+    def _close(self):
+        connection, self.connection = self.connection, None
+        if connection is not None:
+            try:
+                connection.__exit__(None, None, None)
+            except Exception:
+                pass
+
+    def claim_batch(self):
+        """Lease up to OUTBOX_BATCH_SIZE due rows; rows leased by another worker are skipped"""
+        now = _utcnow()
+        due = supabase.table("email_outbox")\
+            .select("id, status, attempts")\
+            .in_("status", ["pending", "sending"])\
+            .lte("next_attempt_at", now.isoformat())\
+            .order("next_attempt_at")\
+            .limit(OUTBOX_BATCH_SIZE)\
+            .execute()
+        rows = due.data or []
+        if not rows:
+            return []
+
+        lease_until = now + timedelta(seconds=OUTBOX_LEASE_SECONDS)
+        claimed = []
+        pending_ids = [row["id"] for row in rows if row["status"] == "pending"]
+        if pending_ids:
+            response = supabase.table("email_outbox")\
+                .update({"status": "sending", "next_attempt_at": lease_until.isoformat()})\
+                .in_("id", pending_ids)\
+                .eq("status", "pending")\
+                .lte("next_attempt_at", now.isoformat())\
+                .execute()
+            claimed.extend(response.data or [])
+        for row in rows:
+            if row["status"] == "sending":
+                claimed.extend(self._reclaim(row, now, lease_until))
+        return claimed
+
+    def _reclaim(self, row, now, lease_until):
+        """
+        Take over a row whose lease expired while 'sending'. The worker holding
+        it died mid-delivery, which counts as an attempt, so a message that
+        keeps crashing its worker still ends up failed.
+
+        Returns:
+            list: The row if it was leased again, else nothing
+        """
+        attempts = (row.get("attempts") or 0) + 1
+        update = {"attempts": attempts, "last_error": "Delivery did not finish before the lease expired"}
+        if attempts >= OUTBOX_MAX_ATTEMPTS:
+            update["status"] = "failed"
+        else:
+            update["next_attempt_at"] = lease_until.isoformat()
+        # The attempts check makes this a no-op if another worker reclaimed it first
+        response = supabase.table("email_outbox")\
+            .update(update)\
+            .eq("id", row["id"])\
+            .eq("status", "sending")\
+            .eq("attempts", row.get("attempts") or 0)\
+            .lte("next_attempt_at", now.isoformat())\
+            .execute()
+        return [r for r in response.data or [] if r.get("status") == "sending"]
+
+    def drain_batch(self):
+        """
+        Deliver one batch of due emails
+
+        Returns:
+            int: Number of rows processed
+        """
+        rows = self.claim_batch()
+        if not rows:
+            return 0
+
+        from flask_mail import Message
+        mail.get()  # Message reads the default sender from the initialized extension
+
+        sent_ids = []
+        for row in rows:
+            try:
+                msg = Message(row["subject"], recipients=[row["recipient"]])
+                msg.body = row["body"]
+                self._open().send(msg)
+                sent_ids.append(row["id"])
+            except Exception as e:
+                # Drop the connection so the next message starts on a fresh one
+                self._close()
+                self._record_failure(row, e)
+        self.last_used = time.monotonic()
+
+        if sent_ids:
+            supabase.table("email_outbox")\
+                .update({"status": "sent", "sent_at": _utcnow().isoformat(), "last_error": None})\
+                .in_("id", sent_ids)\
+                .execute()
+        return len(rows)
+
+    def _record_failure(self, row, error):
+        attempts = (row.get("attempts") or 0) + 1
+        update = {"attempts": attempts, "last_error": (str(error) or type(error).__name__)[:1000]}
+        if attempts >= OUTBOX_MAX_ATTEMPTS:
+            update["status"] = "failed"
+        else:
+            backoff = OUTBOX_RETRY_BASE_SECONDS * (2 ** (attempts - 1))
+            update["status"] = "pending"
+            update["next_attempt_at"] = (_utcnow() + timedelta(seconds=backoff)).isoformat()
+        supabase.table("email_outbox").update(update).eq("id", row["id"]).execute()
+
+
+def start_outbox_workers(app, count=None):
+    """
+    Start the outbox worker pool once per process
+
+    Args:
+        app: Flask app whose mail configuration the workers use
+        count (int, optional): Number of workers (MAIL_OUTBOX_WORKERS by default;
+            0 disables background delivery, e.g. when a scheduler calls drain_outbox)
+    """
+    count = OUTBOX_WORKERS if count is None else count
+    with _outbox_workers_lock:
+        if _outbox_workers or count <= 0:
+            return
+        for i in range(count):
+            worker = OutboxWorker(app, name=f"mail-outbox-{i}")
+            worker.start()
+            _outbox_workers.append(worker)
+
+
+def drain_outbox(app, max_batches=10):
+    """
+    Deliver due outbox emails on the calling thread (for environments without
+    background threads)
+
+    Returns:
+        int: Number of rows processed
+    """
+    worker = OutboxWorker(app)
+    processed = 0
+    with app.app_context():
+        try:
+            for _ in range(max_batches):
+                count = worker.drain_batch()
+                processed += count
+                if not count:
+                    break
+        finally:
+            worker._close()
+    return processed
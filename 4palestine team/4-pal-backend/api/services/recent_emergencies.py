@@ -0,0 +1,261 @@
+"""
+Time-partitioned spatial index of the emergencies of the last few hours.
+
+Emergencies are kept in a ring of one-minute partitions, each a grid of
+``cell_deg`` cells. A "near me in the last N minutes" query reads only the
+last N partitions and, within them, only the cells overlapping the search
+circle. Partitions are recycled as the ring wraps around, so anything older
+than ``window`` drops out without a sweep. The index is loaded from the
+database on first use (or at startup when opted in), fed by the emergency
+routes on every write and reloaded after a refresh interval so emergencies created by other
+workers are eventually picked up.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+from api.DB.connection import supabase
+from api.services.incident_clusters import parse_timestamp
+from api.utils.geo import cell_key, cells_in_bbox, haversine_m, radius_to_bbox, to_float
+
+RECENT_COLUMNS = (
+    "id", "activated_by", "latitude", "longitude", "accuracy", "address",
+    "activated_at", "emergency_type", "description", "estimated_victims", "medical_info",
+)
+# ~1.1 km cells, as in the location index
+CELL_DEG = 0.01
+LOAD_PAGE_SIZE = 1000
+# Opt-in: warming at startup queries the database on every cold start, which
+# serverless deployments pay on each new instance. Set RECENT_EMERGENCY_WARMUP=1
+# on long-running servers to load at startup instead of on the first query.
+WARMUP_ON_START = os.getenv('RECENT_EMERGENCY_WARMUP', '0').lower() in ('1', 'true', 'yes')
+_EPOCH = datetime(1970, 1, 1)
+
+
+def minute_of(moment: datetime) -> int:
+    """Whole minutes since the epoch of a naive UTC datetime"""
+    return int((moment - _EPOCH).total_seconds() // 60)
+
+
+class _Partition:
+    """Emergencies activated during one minute, by grid cell"""
+
+    __slots__ = ('minute', 'cells')
+
+    def __init__(self):
+        self.minute = None
+        self.cells = {}
+
+
+class RecentEmergencyIndex:
+    """Ring buffer of per-minute grid partitions covering the last ``window_minutes``"""
+
+    def __init__(self, window_minutes: int = None, cell_deg: float = CELL_DEG, refresh_seconds: int = None):
+        self.window = window_minutes or int(os.getenv('RECENT_EMERGENCY_WINDOW_MINUTES', '120'))
+        self.cell_deg = cell_deg
+        self.refresh_seconds = refresh_seconds if refresh_seconds is not None else int(
+            os.getenv('RECENT_EMERGENCY_REFRESH_SECONDS', '120')
+        )
+        self._lock = threading.RLock()
+        self._reload_lock = threading.Lock()
+        self._ring = [_Partition() for _ in range(self.window)]
+        self._where = {}
+        self._journal = None
+        self._loaded_at = None
+
+    @staticmethod
+    def _now_minute() -> int:
+        return minute_of(datetime.now(timezone.utc).replace(tzinfo=None))
+
+    # Loading
+
+    def ensure_loaded(self) -> None:
+        """Warm the index on first use and reload it once it is older than the refresh interval"""
+        loaded_at = self._loaded_at
+        if loaded_at is None:
+            with self._reload_lock:
+                if self._loaded_at is None:
+                    self._load()
+        elif time.monotonic() - loaded_at > self.refresh_seconds:
+            # A stale index is still usable: one caller refreshes it, the others do not wait
+            if self._reload_lock.acquire(blocking=False):
+                try:
+                    self._load()
+                except Exception as e:
+                    print("recent emergency refresh error:", e)
+                finally:
+                    self._reload_lock.release()
+
+    def reload(self) -> None:
+        """Rebuild the index from the emergencies activated within the window"""
+        with self._reload_lock:
+            self._load()
+
+    def _load(self) -> None:
+        with self._lock:
+            # Writes made while the rows are being read are replayed on top of them
+            self._journal = []
+        since = (datetime.now(timezone.utc) - timedelta(minutes=self.window)).replace(tzinfo=None).isoformat()
+        rows = []
+        last_id = 0
+        try:
+            while True:
+                response = supabase.table("emergencies")\
+                    .select(",".join(RECENT_COLUMNS))\
+                    .gte("activated_at", since)\
+                    .gt("id", last_id)\
+                    .order("id")\
+                    .limit(LOAD_PAGE_SIZE)\
+                    .execute()
+                page = response.data or []
+                rows.extend(page)
+                if len(page) < LOAD_PAGE_SIZE:
+                    break
+                last_id = page[-1]["id"]
+        except Exception:
+            with self._lock:
+                self._journal = None
+            raise
+        with self._lock:
+            journal, self._journal = self._journal, None
+            self._ring = [_Partition() for _ in range(self.window)]
+            self._where.clear()
+            for row in rows:
+                self._put(row)
+            for operation, value in journal:
+                if operation == 'put':
+                    self._put(value)
+                else:
+                    self._drop(value)
+            self._loaded_at = time.monotonic()
+
+    # Maintenance
+
+    def _put(self, row: dict) -> None:
+        self._drop(row['id'])
+        lat, lon = to_float(row.get('latitude')), to_float(row.get('longitude'))
+        if lat is None or lon is None:
+            return
+        now_minute = self._now_minute()
+        # Clock skew can put activated_at slightly in the future; file it under the current minute
+        minute = min(minute_of(parse_timestamp(row.get('activated_at'))), now_minute)
+        if minute <= now_minute - self.window:
+            return
+        partition = self._ring[minute % self.window]
+        if partition.minute != minute:
+            if partition.minute is not None and partition.minute > minute:
+                return  # its slot already holds a newer minute
+            self._recycle(partition, minute)
+        key = cell_key(lat, lon, self.cell_deg)
+        entry = {k: row.get(k) for k in RECENT_COLUMNS}
+        entry['latitude'], entry['longitude'] = lat, lon
+        partition.cells.setdefault(key, {})[row['id']] = entry
+        self._where[row['id']] = (minute, key)
+
+    def _recycle(self, partition: _Partition, minute: int) -> None:
+        for bucket in partition.cells.values():
+            for emergency_id in bucket:
+                self._where.pop(emergency_id, None)
+        partition.cells = {}
+        partition.minute = minute
+
+    def _drop(self, emergency_id: int) -> None:
+        location = self._where.pop(emergency_id, None)
+        if location is None:
+            return
+        minute, key = location
+        partition = self._ring[minute % self.window]
+        if partition.minute == minute:
+            bucket = partition.cells.get(key)
+            if bucket is not None:
+                bucket.pop(emergency_id, None)
+                if not bucket:
+                    del partition.cells[key]
+
+    def add(self, rows: list) -> None:
+        """Index created or updated emergencies; ignored until the index is warmed"""
+        with self._lock:
+            for row in rows or []:
+                if 'id' not in row:
+                    continue
+                if self._journal is not None:
+                    self._journal.append(('put', row))
+                if self._loaded_at is not None:
+                    self._put(row)
+
+    def remove(self, emergency_id: int) -> None:
+        """Forget a deleted emergency"""
+        with self._lock:
+            if self._journal is not None:
+                self._journal.append(('drop', emergency_id))
+            self._drop(emergency_id)
+
+    # Queries
+
+    def nearby(self, lat: float, lon: float, radius_m: float, window_minutes: int,
+               emergency_types: set = None) -> list:
+        """
+        Emergencies within ``radius_m`` activated in the last ``window_minutes``
+
+        Args:
+            lat (float): Search center latitude
+            lon (float): Search center longitude
+            radius_m (float): Search radius in meters
+            window_minutes (int): Look-back, at most the index window
+            emergency_types (set, optional): Only these emergency types
+
+        Returns:
+            list: Emergency rows with ``distance_m``, nearest first
+        """
+        self.ensure_loaded()
+        bbox = radius_to_bbox(lat, lon, radius_m)
+        min_row, min_col = cell_key(bbox[0], bbox[1], self.cell_deg)
+        max_row, max_col = cell_key(bbox[2], bbox[3], self.cell_deg)
+        cell_count = (max_row - min_row + 1) * (max_col - min_col + 1)
+        now_minute = self._now_minute()
+
+        results = []
+        with self._lock:
+            for minute in range(now_minute - min(window_minutes, self.window) + 1, now_minute + 1):
+                partition = self._ring[minute % self.window]
+                if partition.minute != minute or not partition.cells:
+                    continue
+                if len(partition.cells) < cell_count:
+                    # Fewer populated cells than cells in the search box: walk the populated ones
+                    buckets = [
+                        bucket for (row, col), bucket in partition.cells.items()
+                        if min_row <= row <= max_row and min_col <= col <= max_col
+                    ]
+                else:
+                    buckets = [partition.cells[key] for key in cells_in_bbox(bbox, self.cell_deg) if key in partition.cells]
+                for bucket in buckets:
+                    for entry in bucket.values():
+                        if emergency_types and entry.get('emergency_type') not in emergency_types:
+                            continue
+                        distance = haversine_m(lat, lon, entry['latitude'], entry['longitude'])
+                        if distance <= radius_m:
+                            results.append((distance, entry['id'], entry))
+
+        results.sort(key=lambda item: (item[0], item[1]))
+        return [{**entry, 'distance_m': round(distance, 1)} for distance, _, entry in results]
+
+
+recent_emergencies = RecentEmergencyIndex()
+
+
+def start_recent_emergency_warmup():
+    """Warm the index in the background so the first nearby query does not pay for it"""
+    if not WARMUP_ON_START:
+        return None
+
+    def warm():
+        try:
+            recent_emergencies.ensure_loaded()
+        except Exception as e:
+            print("recent emergency warm-up error:", e)
+
+    thread = threading.Thread(target=warm, name="recent-emergencies-warmup", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,107 @@
+"""
+Removal of dead refresh tokens.
+
+Every login inserts a row into ``refresh_tokens`` or ``admin_refresh_tokens``
+and nothing ever deleted them, so both tables (and their lookup index) grew
+without bound. The sweeper deletes rows that are expired or revoked, in
+bounded batches so a large backlog never turns into one long-running
+statement, and reports how many rows it reclaimed.
+"""
+
+import os
+import threading
+from datetime import datetime, timezone
+
+from api.DB.connection import supabase
+
+TOKEN_TABLES = ('refresh_tokens', 'admin_refresh_tokens')
+
+SWEEP_INTERVAL_SECONDS = int(os.getenv("TOKEN_SWEEP_INTERVAL_SECONDS", "3600"))
+SWEEP_BATCH_SIZE = int(os.getenv("TOKEN_SWEEP_BATCH_SIZE", "500"))
+SWEEP_MAX_BATCHES = int(os.getenv("TOKEN_SWEEP_MAX_BATCHES", "200"))
+
+_sweeper = None
+_sweeper_lock = threading.Lock()
+
+
+def sweep_table(table: str, batch_size: int = SWEEP_BATCH_SIZE, max_batches: int = SWEEP_MAX_BATCHES) -> dict:
+    """
+    Delete expired and revoked tokens from one table
+
+    Args:
+        table (str): Token table
+        batch_size (int): Rows selected and deleted per statement
+        max_batches (int): Stop after this many batches; the rest waits for the next sweep
+
+    Returns:
+        dict: {"deleted": rows removed, "batches": batches run, "complete": False if max_batches was hit}
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    deleted = 0
+    for batch in range(1, max_batches + 1):
+        dead = supabase.table(table)\
+            .select("id")\
+            .or_(f"is_active.eq.false,expires_at.lt.{now}")\
+            .order("id")\
+            .limit(batch_size)\
+            .execute()
+        ids = [row["id"] for row in dead.data or []]
+        if not ids:
+            return {"deleted": deleted, "batches": batch - 1, "complete": True}
+        result = supabase.table(table).delete().in_("id", ids).execute()
+        deleted += len(result.data or [])
+        if len(ids) < batch_size:
+            return {"deleted": deleted, "batches": batch, "complete": True}
+    return {"deleted": deleted, "batches": max_batches, "complete": False}
+
+
+def sweep_refresh_tokens(batch_size: int = SWEEP_BATCH_SIZE, max_batches: int = SWEEP_MAX_BATCHES) -> dict:
+    """
+    Sweep every token table
+
+    Returns:
+        dict: Per-table reports plus ``total_deleted``
+    """
+    report = {table: sweep_table(table, batch_size, max_batches) for table in TOKEN_TABLES}
+    report["total_deleted"] = sum(report[table]["deleted"] for table in TOKEN_TABLES)
+    return report
+
+
+class TokenSweeper(threading.Thread):
+    """Background thread running sweep_refresh_tokens every ``interval`` seconds"""
+
+    def __init__(self, interval: int):
+        super().__init__(name="token-sweeper", daemon=True)
+        self.interval = interval
+        self.stopping = threading.Event()
+        self.last_report = None
+
+    def run(self):
+        while not self.stopping.wait(self.interval):
+            try:
+                self.last_report = sweep_refresh_tokens()
+                if self.last_report["total_deleted"]:
+                    print(f"token sweeper: reclaimed {self.last_report['total_deleted']} refresh token row(s)")
+            except Exception as e:
+                print("token sweeper error:", e)
+
+    def stop(self):
+        self.stopping.set()
+
+
+def start_token_sweeper(interval: int = None):
+    """
+    Start the sweeper thread once per process
+
+    Args:
+        interval (int, optional): Seconds between sweeps (TOKEN_SWEEP_INTERVAL_SECONDS
+            by default; 0 disables it, e.g. when a scheduler calls the admin sweep route)
+    """
+    global _sweeper
+    interval = SWEEP_INTERVAL_SECONDS if interval is None else interval
+    with _sweeper_lock:
+        if _sweeper is not None or interval <= 0:
+            return _sweeper
+        _sweeper = TokenSweeper(interval)
+        _sweeper.start()
+        return _sweeper
@@ -2,13 +2,14 @@
 Authentication utilities for password hashing, JWT token management, and authentication middleware.
 """
 
-import bcrypt
 import jwt
 import os
 from datetime import datetime, timedelta, timezone
 from functools import wraps
 from flask import request, jsonify, current_app
 from api.DB.connection import supabase
+from api.utils.cache import TTLCache
+from api.utils.passwords import hash_password, password_needs_rehash
 import secrets
 import hashlib
 from dotenv import load_dotenv
@@ -29,35 +30,47 @@ class AuthConfig:
 
 auth_config = AuthConfig()
 
+# Active admin records keyed by admin_id; None is cached for unknown/inactive admins
+admin_cache = TTLCache(
+    maxsize=int(os.getenv('ADMIN_CACHE_MAXSIZE', '1024')),
+    ttl=float(os.getenv('ADMIN_CACHE_TTL_SECONDS', '30')),
+    negative_ttl=float(os.getenv('ADMIN_CACHE_NEGATIVE_TTL_SECONDS', '5'))
+)
 
-def hash_password(password: str) -> str:
-    """
-    Hash a password using bcrypt
-    
-    Args:
-        password (str): Plain text password
-        
-    Returns:
-        str: Hashed password
-    """
-    # Generate salt and hash the password
-    salt = bcrypt.gensalt()
-    hashed = bcrypt.hashpw(password.encode('utf-8'), salt)
-    return hashed.decode('utf-8')
+# Validated refresh token rows keyed by (table, token_hash). Unknown tokens are
+# not cached, and revocations in this process drop the entry immediately.
+refresh_token_cache = TTLCache(
+    maxsize=int(os.getenv('REFRESH_TOKEN_CACHE_MAXSIZE', '4096')),
+    ttl=float(os.getenv('REFRESH_TOKEN_CACHE_TTL_SECONDS', '60')),
+    negative_ttl=0
+)
 
 
-def verify_password(password: str, hashed: str) -> bool:
+def upgrade_password_hash(table: str, row_id: int, password: str, hashed: str) -> bool:
     """
-    Verify a password against its hash
+    Re-hash a password after a successful login when the stored hash uses an
+    outdated bcrypt cost
     
     Args:
-        password (str): Plain text password
-        hashed (str): Hashed password from database
+        table (str): Table holding the hash ('users', 'contributor_data' or 'admins')
+        row_id (int): Row ID
+        password (str): Plain text password that was just verified
+        hashed (str): Stored hash
         
     Returns:
-        bool: True if password matches, False otherwise
+        bool: True if the stored hash was replaced
     """
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+    if not password_needs_rehash(hashed):
+        return False
+    try:
+        supabase.table(table)\
+            .update({'password_hash': hash_password(password)})\
+            .eq('id', row_id)\
+            .execute()
+        return True
+    except Exception:
+        # The login already succeeded; the upgrade is retried on the next one
+        return False
 
 
 def generate_access_token(user_id: int, user_type: str, contributor_id: int = None) -> str:
@@ -109,6 +122,17 @@ def hash_refresh_token(token: str) -> str:
     return hashlib.sha256(token.encode()).hexdigest()
 
 
+def new_refresh_token() -> tuple:
+    """
+    Generate a refresh token together with the values stored for it
+
+    Returns:
+        tuple: (raw token, token hash, expiry datetime)
+    """
+    token = generate_refresh_token()
+    return token, hash_refresh_token(token), datetime.now(timezone.utc) + auth_config.JWT_REFRESH_TOKEN_EXPIRES
+
+
 def store_refresh_token(user_id: int = None, contributor_id: int = None, token: str = None) -> str:
     """
     Store refresh token in database
@@ -147,6 +171,70 @@ def store_refresh_token(user_id: int = None, contributor_id: int = None, token:
         raise Exception(f"Failed to store refresh token: {str(e)}")
 
 
+def _token_expired(token_data: dict) -> bool:
+    try:
+        expires_at = datetime.fromisoformat(str(token_data['expires_at']).replace('Z', '+00:00'))
+    except (KeyError, ValueError):
+        return True
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at <= datetime.now(timezone.utc)
+
+
+def _lookup_refresh_token(table: str, token: str) -> dict:
+    """
+    Fetch an active, unexpired refresh token row, served from the refresh token cache when possible
+    
+    Args:
+        table (str): 'refresh_tokens' or 'admin_refresh_tokens'
+        token (str): Raw refresh token
+        
+    Returns:
+        dict: Token data if valid, None if invalid
+    """
+    key = (table, hash_refresh_token(token))
+    
+    def load():
+        try:
+            response = supabase.table(table)\
+                .select('*')\
+                .eq('token_hash', key[1])\
+                .eq('is_active', True)\
+                .gte('expires_at', datetime.now(timezone.utc).isoformat())\
+                .single()\
+                .execute()
+            return response.data if response.data else None
+        except Exception:
+            return None
+    
+    token_data = refresh_token_cache.get_or_load(key, load)
+    if token_data and _token_expired(token_data):
+        refresh_token_cache.invalidate(key)
+        return None
+    return dict(token_data) if token_data else None
+
+
+def invalidate_refresh_token_cache(user_id: int = None, contributor_id: int = None, admin_id: int = None) -> int:
+    """
+    Drop every cached refresh token of an account, e.g. after its tokens were revoked
+    
+    Returns:
+        int: Number of cache entries dropped
+    """
+    def owned(key, token_data):
+        if not token_data:
+            return False
+        if admin_id is not None:
+            return key[0] == 'admin_refresh_tokens' and token_data.get('admin_id') == admin_id
+        if key[0] != 'refresh_tokens':
+            return False
+        if contributor_id is not None:
+            return token_data.get('contributor_id') == contributor_id
+        return user_id is not None and token_data.get('user_id') == user_id
+    
+    return refresh_token_cache.invalidate_where(owned)
+
+
 def verify_refresh_token(token: str) -> dict:
     """
     Verify and retrieve refresh token data
@@ -157,20 +245,7 @@ def verify_refresh_token(token: str) -> dict:
     Returns:
         dict: Token data if valid, None if invalid
     """
-    token_hash = hash_refresh_token(token)
-    
-    try:
-        response = supabase.table('refresh_tokens')\
-            .select('*')\
-            .eq('token_hash', token_hash)\
-            .eq('is_active', True)\
-            .gte('expires_at', datetime.now(timezone.utc).isoformat())\
-            .single()\
-            .execute()
-        
-        return response.data if response.data else None
-    except Exception:
-        return None
+    return _lookup_refresh_token('refresh_tokens', token)
 
 
 def invalidate_refresh_token(token: str) -> bool:
@@ -190,6 +265,7 @@ def invalidate_refresh_token(token: str) -> bool:
             .update({'is_active': False})\
             .eq('token_hash', token_hash)\
             .execute()
+        refresh_token_cache.invalidate(('refresh_tokens', token_hash))
         return True
     except Exception:
         return False
@@ -263,21 +339,16 @@ def require_auth(user_types: list = None):
                     admin_id = payload.get('admin_id')
                     if admin_id:
                         try:
-                            admin_result = supabase.table('admins')\
-                                .select('id, email, name, is_active')\
-                                .eq('id', admin_id)\
-                                .eq('is_active', True)\
-                                .single()\
-                                .execute()
+                            admin = get_active_admin(admin_id)
                             
-                            if admin_result.data:
+                            if admin:
                                 request.current_user = {
                                     'admin_id': admin_id,
                                     'user_type': 'admin',
                                     'user_id': None,
                                     'contributor_id': None
                                 }
-                                request.current_admin = admin_result.data
+                                request.current_admin = admin
                             else:
                                 return jsonify({'error': 'Admin not found or inactive'}), 401
                         except Exception:
@@ -321,6 +392,47 @@ def require_any_auth(f):
 
 # Admin Authentication Functions
 
+def get_active_admin(admin_id: int) -> dict:
+    """
+    Fetch an active admin record, served from the admin cache when possible
+    
+    Args:
+        admin_id (int): Admin ID
+        
+    Returns:
+        dict: Admin record (id, email, name, is_active), None if the admin
+        does not exist or is inactive
+        
+    Raises:
+        Exception: If the database lookup fails (failures are not cached)
+    """
+    def load():
+        result = supabase.table('admins')\
+            .select('id, email, name, is_active')\
+            .eq('id', admin_id)\
+            .eq('is_active', True)\
+            .limit(1)\
+            .execute()
+        return result.data[0] if result.data else None
+    
+    admin = admin_cache.get_or_load(admin_id, load)
+    # Callers may annotate the record; never hand out the cached dict itself
+    return dict(admin) if admin else None
+
+
+def invalidate_admin_cache(admin_id: int = None) -> None:
+    """
+    Drop cached admin records after logout, password change or deactivation
+    
+    Args:
+        admin_id (int, optional): Admin to invalidate; all admins when omitted
+    """
+    if admin_id is None:
+        admin_cache.clear()
+    else:
+        admin_cache.invalidate(admin_id)
+
+
 def generate_admin_access_token(admin_id: int) -> str:
     """
     Generate JWT access token for admin
@@ -383,20 +495,7 @@ def verify_admin_refresh_token(token: str) -> dict:
     Returns:
         dict: Token data if valid, None if invalid
     """
-    token_hash = hash_refresh_token(token)
-    
-    try:
-        response = supabase.table('admin_refresh_tokens')\
-            .select('*')\
-            .eq('token_hash', token_hash)\
-            .eq('is_active', True)\
-            .gte('expires_at', datetime.now(timezone.utc).isoformat())\
-            .single()\
-            .execute()
-        
-        return response.data if response.data else None
-    except Exception:
-        return None
+    return _lookup_refresh_token('admin_refresh_tokens', token)
 
 
 def invalidate_admin_refresh_token(token: str) -> bool:
@@ -416,6 +515,7 @@ def invalidate_admin_refresh_token(token: str) -> bool:
             .update({'is_active': False})\
             .eq('token_hash', token_hash)\
             .execute()
+        refresh_token_cache.invalidate(('admin_refresh_tokens', token_hash))
         return True
     except Exception:
         return False
@@ -452,18 +552,13 @@ def require_admin_auth(f):
                 return jsonify({'error': 'Invalid admin token'}), 401
             
             try:
-                admin_result = supabase.table('admins')\
-                    .select('id, email, name, is_active')\
-                    .eq('id', admin_id)\
-                    .eq('is_active', True)\
-                    .single()\
-                    .execute()
+                admin = get_active_admin(admin_id)
                 
-                if not admin_result.data:
+                if not admin:
                     return jsonify({'error': 'Admin not found or inactive'}), 401
                 
                 # Add admin info to request context
-                request.current_admin = admin_result.data
+                request.current_admin = admin
                 
             except Exception:
                 return jsonify({'error': 'Admin verification failed'}), 401
@@ -480,6 +575,29 @@ def require_admin_auth(f):
     return decorated_function
 
 
+def require_admin_or_cron_auth(f):
+    """
+    Like require_admin_auth, but also accepts ``Authorization: Bearer <CRON_SECRET>``,
+    the header Vercel Cron Jobs send when the CRON_SECRET variable is set.
+    ``request.current_admin`` is None for cron calls.
+
+    Returns:
+        Function decorator
+    """
+    admin_view = require_admin_auth(f)
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        cron_secret = os.getenv('CRON_SECRET')
+        token = get_token_from_header(request)
+        if cron_secret and token and secrets.compare_digest(token, cron_secret):
+            request.current_admin = None
+            return f(*args, **kwargs)
+        return admin_view(*args, **kwargs)
+
+    return decorated_function
+
+
 def is_admin_authenticated(request) -> bool:
     """
     Check if the current request is from an authenticated admin
@@ -507,14 +625,7 @@ def is_admin_authenticated(request) -> bool:
         if not admin_id:
             return False
         
-        admin_result = supabase.table('admins')\
-            .select('id')\
-            .eq('id', admin_id)\
-            .eq('is_active', True)\
-            .single()\
-            .execute()
-        
-        return bool(admin_result.data)
+        return bool(get_active_admin(admin_id))
         
     except Exception:
         return False
\ No newline at end of file
@@ -0,0 +1,116 @@
+"""
+Small thread-safe in-process caches.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries expire after a time-to-live.
+
+    ``None`` values can be cached with their own (usually shorter) TTL so
+    repeated lookups of something that does not exist are also absorbed.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 30, negative_ttl: float = None):
+        """
+        Args:
+            maxsize (int): Maximum number of entries before the least recently used is evicted
+            ttl (float): Lifetime of an entry in seconds
+            negative_ttl (float, optional): Lifetime of a cached ``None``; defaults to ``ttl``
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for ``key`` or ``default`` when absent or expired"""
+        value = self._lookup(key)
+        return default if value is _MISSING else value
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return _MISSING
+
+    def set(self, key, value, ttl: float = None) -> None:
+        """Store a value; ``ttl`` overrides the default lifetime for this entry"""
+        if ttl is None:
+            ttl = self.negative_ttl if value is None else self.ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached value, calling ``loader()`` and caching its result on a miss.
+        Exceptions raised by the loader are not cached.
+        """
+        value = self._lookup(key)
+        if value is _MISSING:
+            value = loader()
+            self.set(key, value)
+        return value
+
+    def invalidate(self, key) -> None:
+        """Drop a single entry"""
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def invalidate_where(self, predicate) -> int:
+        """
+        Drop every entry whose (key, value) satisfies ``predicate``
+
+        Returns:
+            int: Number of entries dropped
+        """
+        with self._lock:
+            keys = [k for k, (v, _) in self._data.items() if predicate(k, v)]
+            for key in keys:
+                del self._data[key]
+            self.invalidations += len(keys)
+            return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl_seconds': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
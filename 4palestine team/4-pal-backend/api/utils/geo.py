@@ -0,0 +1,134 @@
+"""
+Geospatial helpers shared by the in-memory location and emergency indexes.
+"""
+
+import math
+
+EARTH_RADIUS_M = 6371008.8
+METERS_PER_DEGREE_LAT = 111320.0
+
+
+def haversine_m(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """
+    Great-circle distance between two points
+
+    Args:
+        lat1 (float): Latitude of the first point in degrees
+        lon1 (float): Longitude of the first point in degrees
+        lat2 (float): Latitude of the second point in degrees
+        lon2 (float): Longitude of the second point in degrees
+
+    Returns:
+        float: Distance in meters
+    """
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def to_unit_vector(lat: float, lon: float) -> tuple:
+    """
+    Cartesian (x, y, z) of a point on the unit sphere
+
+    Straight-line (chord) distance between unit vectors grows monotonically
+    with great-circle distance, so nearest-neighbour search can run in 3-d
+    without the distortion of treating degrees as planar coordinates.
+    """
+    phi = math.radians(lat)
+    lam = math.radians(lon)
+    cos_phi = math.cos(phi)
+    return (cos_phi * math.cos(lam), cos_phi * math.sin(lam), math.sin(phi))
+
+
+def meters_to_chord(distance_m: float) -> float:
+    """Unit-sphere chord length of a great-circle distance"""
+    return 2 * math.sin(min(distance_m / EARTH_RADIUS_M, math.pi) / 2)
+
+
+def radius_to_bbox(lat: float, lon: float, radius_m: float) -> tuple:
+    """
+    Smallest lat/lon box that contains a circle
+
+    Args:
+        lat (float): Center latitude
+        lon (float): Center longitude
+        radius_m (float): Radius in meters
+
+    Returns:
+        tuple: (min_lat, min_lon, max_lat, max_lon)
+    """
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+    dlon = min(radius_m / (METERS_PER_DEGREE_LAT * cos_lat), 180.0)
+    return (max(lat - dlat, -90.0), lon - dlon, min(lat + dlat, 90.0), lon + dlon)
+
+
+def in_bbox(lat: float, lon: float, bbox: tuple) -> bool:
+    """Check whether a point falls inside a (min_lat, min_lon, max_lat, max_lon) box"""
+    min_lat, min_lon, max_lat, max_lon = bbox
+    return min_lat <= lat <= max_lat and min_lon <= lon <= max_lon
+
+
+def cell_key(lat: float, lon: float, cell_deg: float) -> tuple:
+    """Grid cell containing a point for a grid of ``cell_deg`` sized square cells"""
+    return (math.floor(lat / cell_deg), math.floor(lon / cell_deg))
+
+
+def cells_in_bbox(bbox: tuple, cell_deg: float):
+    """
+    Yield every grid cell key that intersects a bounding box
+
+    Args:
+        bbox (tuple): (min_lat, min_lon, max_lat, max_lon)
+        cell_deg (float): Cell size in degrees
+
+    Yields:
+        tuple: Cell keys as produced by ``cell_key``
+    """
+    min_row, min_col = cell_key(bbox[0], bbox[1], cell_deg)
+    max_row, max_col = cell_key(bbox[2], bbox[3], cell_deg)
+    for row in range(min_row, max_row + 1):
+        for col in range(min_col, max_col + 1):
+            yield (row, col)
+
+
+def parse_bbox(value: str) -> tuple:
+    """
+    Parse a ``min_lon,min_lat,max_lon,max_lat`` query parameter (GeoJSON order)
+
+    Args:
+        value (str): Raw query string value
+
+    Returns:
+        tuple: (min_lat, min_lon, max_lat, max_lon)
+
+    Raises:
+        ValueError: If the value is malformed or out of range
+    """
+    parts = [p.strip() for p in value.split(',')]
+    if len(parts) != 4:
+        raise ValueError("bbox must be 'min_lon,min_lat,max_lon,max_lat'")
+    min_lon, min_lat, max_lon, max_lat = (float(p) for p in parts)
+    if min_lat > max_lat or min_lon > max_lon:
+        raise ValueError("bbox minimums must not exceed maximums")
+    validate_coordinates(min_lat, min_lon)
+    validate_coordinates(max_lat, max_lon)
+    return (min_lat, min_lon, max_lat, max_lon)
+
+
+def validate_coordinates(lat: float, lon: float) -> None:
+    """
+    Raise ValueError for coordinates outside the valid WGS84 range
+    """
+    if not (-90.0 <= lat <= 90.0) or not (-180.0 <= lon <= 180.0):
+        raise ValueError("Coordinates out of range")
+
+
+def to_float(value):
+    """Convert a numeric/decimal column value to float, keeping None"""
+    if value is None or value == '':
+        return None
+    return float(value)
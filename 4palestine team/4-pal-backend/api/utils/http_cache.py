@@ -0,0 +1,110 @@
+"""
+HTTP conditional requests and response compression for GET routes.
+
+``init_http_cache(app)`` installs an ``after_request`` hook that, for
+successful GET/HEAD responses:
+
+1. sets ``Cache-Control`` from the route's ``cache_control`` policy (see
+   api/routes/__init__.py), defaulting to revalidate-every-time;
+2. adds a content-hash ETag and answers a matching ``If-None-Match`` with an
+   empty 304;
+3. compresses the body with brotli (when the optional ``brotli`` package is
+   installed) or gzip, according to ``Accept-Encoding``.
+
+ETags are weak (``W/"..."``) because the same entity is served under
+several content encodings.
+"""
+
+import gzip
+import hashlib
+
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+MIN_COMPRESS_BYTES = 512
+COMPRESSIBLE_TYPES = ('application/json', 'text/', 'application/geo+json', 'application/x-ndjson')
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def _accepted_encodings() -> dict:
+    """Parse Accept-Encoding into {coding: q}"""
+    accepted = {}
+    for part in request.headers.get('Accept-Encoding', '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.lower()] = q
+    return accepted
+
+
+def choose_encoding() -> str:
+    """Pick the best supported content coding for the current request, or None"""
+    accepted = _accepted_encodings()
+    candidates = ['gzip']
+    if brotli is not None:
+        candidates.insert(0, 'br')
+    best = None
+    for coding in candidates:
+        q = accepted.get(coding, accepted.get('*', 0.0))
+        if q > 0 and (best is None or q > best[1]):
+            best = (coding, q)
+    return best[0] if best else None
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+
+def _cache_policy(app) -> str:
+    view = app.view_functions.get(request.endpoint)
+    policy = getattr(view, 'cache_policy', None)
+    if policy:
+        return policy
+    # Default: caches may store the response but must revalidate it (cheap with the ETag)
+    return 'private, no-cache' if request.headers.get('Authorization') else 'no-cache'
+
+
+def init_http_cache(app) -> None:
+    """Register the conditional-request/compression hook on a Flask app"""
+
+    @app.after_request
+    def apply_http_cache(response):
+        if request.method not in ('GET', 'HEAD') or response.status_code != 200:
+            return response
+        # Streaming responses (SSE, exports) are passed through untouched
+        if response.is_streamed or response.direct_passthrough:
+            return response
+
+        response.headers.setdefault('Cache-Control', _cache_policy(app))
+
+        data = response.get_data()
+        response.set_etag(hashlib.sha256(data).hexdigest()[:32], weak=True)
+        response.headers.add('Vary', 'Accept-Encoding')
+        response.make_conditional(request.environ)
+        if response.status_code == 304:
+            return response
+
+        content_type = response.mimetype or ''
+        if (request.method == 'GET'
+                and len(data) >= MIN_COMPRESS_BYTES
+                and 'Content-Encoding' not in response.headers
+                and content_type.startswith(COMPRESSIBLE_TYPES)):
+            encoding = choose_encoding()
+            if encoding:
+                response.set_data(compress(data, encoding))
+                response.headers['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,133 @@
+"""
+Idempotency keys for create endpoints.
+
+A client that retries a submission over a flaky network sends the same
+``Idempotency-Key`` header (any unique string, a UUID is typical) with every
+attempt. The first response for a key is stored and replayed verbatim, with
+``Idempotent-Replayed: true``, to every later attempt, so an SOS that reached
+the server but whose response was lost is not created twice.
+
+* Keys are scoped to the endpoint (and to the account on authenticated
+  routes, where the decorator goes below the auth decorator) and remembered for
+  ``IDEMPOTENCY_TTL_SECONDS`` in a bounded LRU (``IDEMPOTENCY_MAX_KEYS``).
+* A request repeating a key with a different body gets ``422``.
+* A duplicate arriving while the first attempt is still running waits for it
+  (up to ``IDEMPOTENCY_WAIT_SECONDS``, then ``409`` with ``Retry-After``) and
+  receives the same response instead of running the handler again.
+* ``5xx`` and ``429`` responses are not stored, so the next retry runs again.
+
+Requests without the header are handled as before. The store is per process;
+behind several workers a retry is deduplicated only when it reaches the same
+worker.
+"""
+
+import hashlib
+import os
+import threading
+from functools import wraps
+
+from flask import Response, current_app, request
+
+from api.routes import error_response
+from api.utils.cache import TTLCache
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", "86400"))
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000"))
+IDEMPOTENCY_WAIT_SECONDS = int(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+
+# Entity headers are recomputed when the stored body is replayed
+_DROPPED_HEADERS = ("content-length", "set-cookie")
+
+# (endpoint, account, key) -> (fingerprint, status, headers, body)
+idempotency_cache = TTLCache(maxsize=IDEMPOTENCY_MAX_KEYS, ttl=IDEMPOTENCY_TTL_SECONDS)
+
+_in_flight = {}
+_in_flight_lock = threading.Lock()
+
+
+class _InFlight:
+    """A first attempt that is still running; duplicates wait on ``done``"""
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+
+
+def _fingerprint() -> str:
+    digest = hashlib.sha256()
+    digest.update(request.method.encode())
+    digest.update(request.path.encode())
+    digest.update(b"\0")
+    digest.update(request.get_data(cache=True))
+    return digest.hexdigest()
+
+
+def _account():
+    user = getattr(request, "current_user", None) or {}
+    return user.get("admin_id"), user.get("contributor_id"), user.get("user_id")
+
+
+def _replay(stored) -> Response:
+    _, status, headers, body = stored
+    response = Response(body, status=status, headers=headers)
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+def _mismatch():
+    return error_response(f"{IDEMPOTENCY_HEADER} was already used with a different request body", 422)
+
+
+def _should_store(response: Response) -> bool:
+    return response.status_code < 500 and response.status_code != 429 and not response.is_streamed
+
+
+def idempotent(f):
+    """
+    Replay the stored response of a create route when its Idempotency-Key repeats.
+    Put it under the route decorator, and under the auth decorator if there is one.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return f(*args, **kwargs)
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return error_response(f"{IDEMPOTENCY_HEADER} must be 1 to {MAX_KEY_LENGTH} characters", 400)
+
+        store_key = (request.endpoint, _account(), key)
+        fingerprint = _fingerprint()
+        while True:
+            with _in_flight_lock:
+                stored = idempotency_cache.get(store_key)
+                pending = None if stored else _in_flight.get(store_key)
+                if stored is None and pending is None:
+                    attempt = _in_flight[store_key] = _InFlight(fingerprint)
+                    break
+            if stored is not None:
+                return _replay(stored) if stored[0] == fingerprint else _mismatch()
+            if pending.fingerprint != fingerprint:
+                return _mismatch()
+            if not pending.done.wait(IDEMPOTENCY_WAIT_SECONDS):
+                return error_response(
+                    f"A request with this {IDEMPOTENCY_HEADER} is still in progress", 409,
+                    headers={"Retry-After": "1"}
+                )
+            # The first attempt finished: replay its response, or run again if it was not stored
+
+        try:
+            response = current_app.make_response(f(*args, **kwargs))
+            if _should_store(response):
+                headers = [(k, v) for k, v in response.headers.items() if k.lower() not in _DROPPED_HEADERS]
+                idempotency_cache.set(store_key, (fingerprint, response.status_code, headers, response.get_data()))
+            return response
+        finally:
+            with _in_flight_lock:
+                _in_flight.pop(store_key, None)
+            attempt.done.set()
+    return decorated_function
@@ -0,0 +1,92 @@
+"""
+Static k-d tree for k-nearest-neighbour queries over 3-d points.
+
+The tree is built once from a list of items and is not modified afterwards;
+callers that need updates keep a small side buffer of added and removed ids
+and rebuild once it grows (see LocationIndex in api/services/location_index.py).
+"""
+
+import heapq
+
+# Below this many points a node stores them in a flat list; scanning a few
+# tuples is cheaper in Python than descending further
+LEAF_SIZE = 8
+
+
+def _squared(a: tuple, b: tuple) -> float:
+    dx = a[0] - b[0]
+    dy = a[1] - b[1]
+    dz = a[2] - b[2]
+    return dx * dx + dy * dy + dz * dz
+
+
+class KDTree:
+    """
+    k-d tree over ``(item_id, (x, y, z))`` pairs
+
+    Nodes are tuples: ``(axis, split, left, right)`` for inner nodes and
+    ``(None, items)`` for leaves. Each split is on the axis with the largest
+    spread, which matters for clustered data where one coordinate barely varies.
+    """
+
+    def __init__(self, items):
+        items = list(items)
+        self.size = len(items)
+        self._root = self._build(items) if items else None
+
+    def __len__(self):
+        return self.size
+
+    def _build(self, items):
+        if len(items) <= LEAF_SIZE:
+            return (None, items)
+        spreads = []
+        for axis in range(3):
+            values = [point[axis] for _, point in items]
+            spreads.append(max(values) - min(values))
+        axis = spreads.index(max(spreads))
+        items.sort(key=lambda item: item[1][axis])
+        mid = len(items) // 2
+        return (axis, items[mid][1][axis], self._build(items[:mid]), self._build(items[mid:]))
+
+    def nearest(self, point: tuple, k: int, max_distance: float = None, accept=None) -> list:
+        """
+        Find the ``k`` items closest to ``point``
+
+        Args:
+            point (tuple): Query (x, y, z)
+            k (int): Number of neighbours
+            max_distance (float, optional): Ignore items farther than this
+                (same units as the coordinates)
+            accept (callable, optional): ``accept(item_id)`` returning False skips an item
+
+        Returns:
+            list: (squared distance, item_id) pairs, nearest first
+        """
+        if self._root is None or k <= 0:
+            return []
+        limit = float('inf') if max_distance is None else max_distance * max_distance
+        heap = []  # max-heap of the best k as (-squared distance, item_id)
+
+        def bound():
+            return -heap[0][0] if len(heap) >= k else limit
+
+        def visit(node):
+            if node[0] is None:
+                for item_id, item_point in node[1]:
+                    distance = _squared(point, item_point)
+                    if distance <= bound() and (accept is None or accept(item_id)):
+                        if len(heap) < k:
+                            heapq.heappush(heap, (-distance, item_id))
+                        else:
+                            heapq.heapreplace(heap, (-distance, item_id))
+                return
+            axis, split, left, right = node
+            diff = point[axis] - split
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if diff * diff <= bound():
+                visit(far)
+
+        visit(self._root)
+        return sorted((-distance, item_id) for distance, item_id in heap)
@@ -0,0 +1,261 @@
+"""
+Request and database metrics in Prometheus text format.
+
+``init_metrics(app)`` times every request per route (the URL rule, so ids do
+not explode the label set), tracks in-flight requests and status codes, and
+serves everything on ``GET /metrics``. ``instrument_client(client)`` wraps the
+shared Supabase client so each ``execute()`` is timed per table and action
+and counted against the current request.
+
+Requests slower than ``SLOW_REQUEST_MS`` (disabled by default) are printed
+with their per-query breakdown. When ``METRICS_TOKEN`` is set, ``/metrics``
+requires it as a bearer token.
+"""
+
+import os
+import threading
+import time
+
+from flask import Response, g, has_request_context, request
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DB_CALL_BUCKETS = (0, 1, 2, 3, 4, 5, 8, 13, 21)
+
+# Builder methods that decide what kind of statement execute() sends
+QUERY_ACTIONS = ('select', 'insert', 'update', 'upsert', 'delete')
+
+
+class MetricsConfig:
+    """Configuration for request metrics"""
+
+    def __init__(self):
+        self.SLOW_REQUEST_MS = float(os.getenv('SLOW_REQUEST_MS', '0'))
+        self.METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+
+metrics_config = MetricsConfig()
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: dict = None) -> str:
+    pairs = list(key) + list((extra or {}).items())
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name: str, help_text: str):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} {self.kind}'
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f'{self.name}{_format_labels(key)} {value}'
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets: tuple = LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {'buckets': [0] * len(self.buckets), 'sum': 0.0, 'count': 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series['buckets'][i] += 1
+                    break
+            series['sum'] += value
+            series['count'] += 1
+
+    def render(self):
+        yield f'# HELP {self.name} {self.help}'
+        yield f'# TYPE {self.name} histogram'
+        with self._lock:
+            snapshot = [(key, list(s['buckets']), s['sum'], s['count']) for key, s in self._series.items()]
+        for key, buckets, total, count in snapshot:
+            cumulative = 0
+            for bound, hits in zip(self.buckets, buckets):
+                cumulative += hits
+                yield f'{self.name}_bucket{_format_labels(key, {"le": bound})} {cumulative}'
+            yield f'{self.name}_bucket{_format_labels(key, {"le": "+Inf"})} {count}'
+            yield f'{self.name}_sum{_format_labels(key)} {total}'
+            yield f'{self.name}_count{_format_labels(key)} {count}'
+
+
+request_duration = Histogram('http_request_duration_seconds', 'Request latency by route')
+requests_total = Counter('http_requests_total', 'Requests by route and status code')
+requests_in_flight = Gauge('http_requests_in_flight', 'Requests currently being handled')
+request_db_calls = Histogram('http_request_db_calls', 'Supabase calls made per request', DB_CALL_BUCKETS)
+request_db_seconds = Histogram('http_request_db_seconds', 'Time spent in Supabase calls per request')
+db_query_duration = Histogram('supabase_query_duration_seconds', 'Supabase call latency by table and action')
+db_query_errors = Counter('supabase_query_errors_total', 'Supabase calls that raised, by table and action')
+
+REGISTRY = (request_duration, requests_total, requests_in_flight, request_db_calls,
+            request_db_seconds, db_query_duration, db_query_errors)
+
+
+def render_metrics() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def record_db_call(target: str, action: str, seconds: float, ok: bool = True) -> None:
+    """Record one Supabase call globally and against the current request, if any"""
+    db_query_duration.observe(seconds, table=target, action=action)
+    if not ok:
+        db_query_errors.inc(table=target, action=action)
+    if has_request_context() and hasattr(g, 'db_calls'):
+        g.db_calls.append((target, action, seconds, ok))
+
+
+class _InstrumentedBuilder:
+    """Proxy around a postgrest builder chain that times ``execute()``"""
+
+    __slots__ = ('_target', '_builder', '_action')
+
+    def __init__(self, target, builder, action='select'):
+        self._target = target
+        self._builder = builder
+        self._action = action
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if name == 'execute':
+            return self._execute
+        action = name if name in QUERY_ACTIONS else self._action
+        if not callable(attr):
+            # e.g. the ``not_`` property, which returns the builder itself
+            return _InstrumentedBuilder(self._target, attr, action) if hasattr(attr, 'execute') else attr
+
+        def call(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            if hasattr(result, 'execute'):
+                return _InstrumentedBuilder(self._target, result, action)
+            return result
+        return call
+
+    def _execute(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            result = self._builder.execute(*args, **kwargs)
+        except Exception:
+            record_db_call(self._target, self._action, time.perf_counter() - started, ok=False)
+            raise
+        record_db_call(self._target, self._action, time.perf_counter() - started)
+        return result
+
+
+class InstrumentedClient:
+    """Wraps a Supabase client; ``table``/``from_``/``rpc`` calls are timed, the rest passes through"""
+
+    def __init__(self, client):
+        self._client = client
+
+    def table(self, name):
+        return _InstrumentedBuilder(name, self._client.table(name))
+
+    def from_(self, name):
+        return self.table(name)
+
+    def rpc(self, name, params=None, *args, **kwargs):
+        return _InstrumentedBuilder(f'rpc:{name}', self._client.rpc(name, params, *args, **kwargs), 'rpc')
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+def instrument_client(client):
+    return InstrumentedClient(client)
+
+
+def _route_label() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def _finish(status: int) -> None:
+    if getattr(g, 'metrics_recorded', True):
+        return
+    g.metrics_recorded = True
+    elapsed = time.perf_counter() - g.metrics_started
+    route = _route_label()
+    calls = g.db_calls
+    db_seconds = sum(seconds for _, _, seconds, _ in calls)
+
+    request_duration.observe(elapsed, method=request.method, route=route)
+    requests_total.inc(method=request.method, route=route, status=status)
+    request_db_calls.observe(len(calls), method=request.method, route=route)
+    request_db_seconds.observe(db_seconds, method=request.method, route=route)
+
+    if metrics_config.SLOW_REQUEST_MS and elapsed * 1000 >= metrics_config.SLOW_REQUEST_MS:
+        breakdown = ', '.join(f"{action} {target} {seconds * 1000:.1f}ms{'' if ok else ' (failed)'}"
+                              for target, action, seconds, ok in calls)
+        print(f"slow request: {request.method} {request.path} -> {status} in {elapsed * 1000:.1f}ms; "
+              f"{len(calls)} db call(s), {db_seconds * 1000:.1f}ms: {breakdown or 'none'}")
+
+
+def metrics_endpoint():
+    if metrics_config.METRICS_TOKEN:
+        if request.headers.get('Authorization') != f'Bearer {metrics_config.METRICS_TOKEN}':
+            return {'success': False, 'message': 'Unauthorized'}, 401
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def init_metrics(app) -> None:
+    """Register request instrumentation and the /metrics endpoint on a Flask app"""
+
+    @app.before_request
+    def start_request_metrics():
+        g.metrics_started = time.perf_counter()
+        g.metrics_recorded = False
+        g.db_calls = []
+        requests_in_flight.inc()
+
+    @app.after_request
+    def record_request_metrics(response):
+        _finish(response.status_code)
+        return response
+
+    @app.teardown_request
+    def end_request_metrics(error=None):
+        if not hasattr(g, 'metrics_started'):
+            return
+        # after_request is skipped for unhandled exceptions
+        _finish(500)
+        requests_in_flight.dec()
+
+    app.add_url_rule('/metrics', 'metrics', metrics_endpoint, methods=['GET'])
@@ -0,0 +1,116 @@
+"""
+Password hashing on a bounded worker pool.
+
+bcrypt is deliberately CPU-expensive. Running it inline on request threads
+lets a burst of logins occupy every core, so all hashing and verification is
+submitted to a fixed-size executor instead. When the pool and its wait queue
+are full, callers get ``PasswordHashingBusy`` immediately (surfaced as a
+503) rather than waiting without bound.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import bcrypt
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the password hashing pool cannot accept more work"""
+
+
+class PasswordConfig:
+    """Configuration for password hashing"""
+
+    def __init__(self):
+        self.BCRYPT_ROUNDS = int(os.getenv('BCRYPT_ROUNDS', '12'))
+        self.WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', str(os.cpu_count() or 1)))
+        # Jobs allowed to wait for a worker before new ones are rejected
+        self.QUEUE_DEPTH = int(os.getenv('PASSWORD_HASH_QUEUE_DEPTH', '16'))
+        self.TIMEOUT_SECONDS = float(os.getenv('PASSWORD_HASH_TIMEOUT_SECONDS', '10'))
+
+
+password_config = PasswordConfig()
+
+_executor = ThreadPoolExecutor(max_workers=password_config.WORKERS, thread_name_prefix='password-hash')
+_slots = threading.BoundedSemaphore(password_config.WORKERS + password_config.QUEUE_DEPTH)
+
+
+def _run(fn, *args):
+    """Run ``fn`` on the password pool, rejecting the call if the pool is saturated"""
+    if not _slots.acquire(blocking=False):
+        raise PasswordHashingBusy("Password hashing queue is full")
+    try:
+        future = _executor.submit(fn, *args)
+    except Exception:
+        _slots.release()
+        raise
+    # The slot is held until the job really finishes, even if we stop waiting for it
+    future.add_done_callback(lambda _: _slots.release())
+    try:
+        return future.result(timeout=password_config.TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        raise PasswordHashingBusy("Password hashing timed out")
+
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def hash_password(password: str, rounds: int = None) -> str:
+    """
+    Hash a password using bcrypt
+
+    Args:
+        password (str): Plain text password
+        rounds (int, optional): bcrypt cost factor (BCRYPT_ROUNDS by default)
+
+    Returns:
+        str: Hashed password
+
+    Raises:
+        PasswordHashingBusy: If the hashing pool is saturated
+    """
+    return _run(_hash, password, rounds or password_config.BCRYPT_ROUNDS)
+
+
+def verify_password(password: str, hashed: str) -> bool:
+    """
+    Verify a password against its hash
+
+    Args:
+        password (str): Plain text password
+        hashed (str): Hashed password from database
+
+    Returns:
+        bool: True if password matches, False otherwise
+
+    Raises:
+        PasswordHashingBusy: If the hashing pool is saturated
+    """
+    return _run(_check, password, hashed)
+
+
+def hash_cost(hashed: str) -> int:
+    """Cost factor encoded in a bcrypt hash (``$2b$<cost>$...``), None if unreadable"""
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def password_needs_rehash(hashed: str) -> bool:
+    """
+    Check whether a stored hash was made with a different cost than the configured one
+
+    Args:
+        hashed (str): Hashed password from database
+
+    Returns:
+        bool: True if the hash should be replaced after the next successful login
+    """
+    return hash_cost(hashed) != password_config.BCRYPT_ROUNDS
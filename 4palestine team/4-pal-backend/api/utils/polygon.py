@@ -0,0 +1,153 @@
+"""
+Polygon parsing and prepared point-in-polygon / segment tests.
+
+Coordinates are planar ``(x, y) = (lon, lat)`` in degrees, as in GeoJSON.
+That is accurate enough for zones spanning a few kilometres away from the
+poles and the antimeridian.
+"""
+
+MAX_VERTICES = 20000
+# Edges per horizontal band a prepared polygon aims for
+BAND_EDGES = 4
+MAX_BANDS = 256
+
+
+def parse_polygon_geometry(geometry) -> list:
+    """
+    Validate a GeoJSON Polygon or MultiPolygon
+
+    Args:
+        geometry (dict): GeoJSON geometry object
+
+    Returns:
+        list: Polygons, each a list of rings, each a list of (lon, lat) tuples
+        (open rings are closed)
+
+    Raises:
+        ValueError: If the geometry is malformed or out of range
+    """
+    if not isinstance(geometry, dict) or geometry.get('type') not in ('Polygon', 'MultiPolygon'):
+        raise ValueError("geometry must be a GeoJSON Polygon or MultiPolygon")
+    coordinates = geometry.get('coordinates')
+    if not isinstance(coordinates, list) or not coordinates:
+        raise ValueError("geometry coordinates are required")
+    polygons = [coordinates] if geometry['type'] == 'Polygon' else coordinates
+
+    parsed = []
+    vertices = 0
+    for polygon in polygons:
+        if not isinstance(polygon, list) or not polygon:
+            raise ValueError("each polygon must have at least one ring")
+        rings = []
+        for ring in polygon:
+            if not isinstance(ring, list):
+                raise ValueError("rings must be arrays of positions")
+            points = []
+            for position in ring:
+                if not isinstance(position, (list, tuple)) or len(position) < 2:
+                    raise ValueError("positions must be [lon, lat]")
+                lon, lat = float(position[0]), float(position[1])
+                if not (-180.0 <= lon <= 180.0 and -90.0 <= lat <= 90.0):
+                    raise ValueError("Coordinates out of range")
+                points.append((lon, lat))
+            if points and points[0] != points[-1]:
+                points.append(points[0])
+            if len(set(points)) < 3:
+                raise ValueError("rings need at least three distinct positions")
+            vertices += len(points)
+            rings.append(points)
+        parsed.append(rings)
+    if vertices > MAX_VERTICES:
+        raise ValueError(f"geometry is limited to {MAX_VERTICES} positions")
+    return parsed
+
+
+def _segments_cross(ax, ay, bx, by, cx, cy, dx, dy) -> bool:
+    """Whether segments AB and CD intersect (touching counts)"""
+    def orient(px, py, qx, qy, rx, ry):
+        value = (qx - px) * (ry - py) - (qy - py) * (rx - px)
+        return (value > 0) - (value < 0)
+
+    def on_segment(px, py, qx, qy, rx, ry):
+        return min(px, qx) <= rx <= max(px, qx) and min(py, qy) <= ry <= max(py, qy)
+
+    o1 = orient(ax, ay, bx, by, cx, cy)
+    o2 = orient(ax, ay, bx, by, dx, dy)
+    o3 = orient(cx, cy, dx, dy, ax, ay)
+    o4 = orient(cx, cy, dx, dy, bx, by)
+    if o1 != o2 and o3 != o4:
+        return True
+    return (
+        (o1 == 0 and on_segment(ax, ay, bx, by, cx, cy))
+        or (o2 == 0 and on_segment(ax, ay, bx, by, dx, dy))
+        or (o3 == 0 and on_segment(cx, cy, dx, dy, ax, ay))
+        or (o4 == 0 and on_segment(cx, cy, dx, dy, bx, by))
+    )
+
+
+class PreparedPolygon:
+    """
+    A (multi)polygon preprocessed for repeated tests.
+
+    Edges are bucketed into horizontal bands, so a point test only runs the
+    even-odd crossing rule over the edges of the point's band instead of
+    every vertex. Holes and multiple parts are handled by the same rule.
+    """
+
+    def __init__(self, polygons: list):
+        """
+        Args:
+            polygons (list): Output of parse_polygon_geometry
+        """
+        edges = []
+        for rings in polygons:
+            for ring in rings:
+                for (x1, y1), (x2, y2) in zip(ring, ring[1:]):
+                    if (x1, y1) != (x2, y2):
+                        edges.append((x1, y1, x2, y2))
+        xs = [x for edge in edges for x in (edge[0], edge[2])]
+        ys = [y for edge in edges for y in (edge[1], edge[3])]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+        self.edge_count = len(edges)
+
+        self._bands = max(1, min(MAX_BANDS, len(edges) // BAND_EDGES))
+        height = self.bbox[3] - self.bbox[1]
+        self._band_height = height / self._bands if height > 0 else 1.0
+        self._band_edges = [[] for _ in range(self._bands)]
+        for edge in edges:
+            low, high = sorted((edge[1], edge[3]))
+            for band in range(self._band(low), self._band(high) + 1):
+                self._band_edges[band].append(edge)
+
+    def _band(self, y: float) -> int:
+        return min(self._bands - 1, max(0, int((y - self.bbox[1]) / self._band_height)))
+
+    def contains(self, x: float, y: float) -> bool:
+        """Point-in-polygon by the even-odd rule"""
+        min_x, min_y, max_x, max_y = self.bbox
+        if not (min_x <= x <= max_x and min_y <= y <= max_y):
+            return False
+        inside = False
+        for x1, y1, x2, y2 in self._band_edges[self._band(y)]:
+            if (y1 > y) != (y2 > y) and x < x1 + (y - y1) * (x2 - x1) / (y2 - y1):
+                inside = not inside
+        return inside
+
+    def intersects_segment(self, x1: float, y1: float, x2: float, y2: float) -> bool:
+        """Whether a segment touches or enters the polygon"""
+        min_x, min_y, max_x, max_y = self.bbox
+        if max(x1, x2) < min_x or min(x1, x2) > max_x or max(y1, y2) < min_y or min(y1, y2) > max_y:
+            return False
+        if self.contains(x1, y1) or self.contains(x2, y2):
+            return True
+        low, high = self._band(min(y1, y2)), self._band(max(y1, y2))
+        seen = set()
+        for band in range(low, high + 1):
+            for edge in self._band_edges[band]:
+                if edge in seen:
+                    continue
+                seen.add(edge)
+                if _segments_cross(x1, y1, x2, y2, *edge):
+                    return True
+        return False
+
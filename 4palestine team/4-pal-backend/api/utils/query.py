@@ -0,0 +1,231 @@
+"""
+Shared list-query layer for collection endpoints: keyset pagination,
+whitelisted filters, sorting and sparse fieldsets pushed down into the
+Supabase select.
+"""
+
+import base64
+import json
+
+from api.DB.connection import supabase
+
+
+class QueryError(ValueError):
+    """Raised for invalid list query parameters (reported as 400)"""
+
+
+class ListSpec:
+    """Describes what a collection endpoint exposes to list queries"""
+
+    def __init__(self, table: str, columns: tuple, filters: tuple = (), sortable: tuple = ('id',),
+                 default_sort: str = 'id', default_limit: int = 100, max_limit: int = 500):
+        """
+        Args:
+            table (str): Supabase table name
+            columns (tuple): Columns clients may read (anything else, e.g.
+                ``password_hash``, is never selected)
+            filters (tuple): Columns clients may filter on with ``?column=value``
+            sortable (tuple): Columns clients may sort on with ``?sort=[-]column``
+            default_sort (str): Sort used when ``?sort=`` is absent
+            default_limit (int): Page size used when ``?limit=`` is absent
+            max_limit (int): Largest page size a client may request
+        """
+        self.table = table
+        self.columns = tuple(columns)
+        self.filters = tuple(filters)
+        self.sortable = tuple(sortable)
+        self.default_sort = default_sort
+        self.default_limit = default_limit
+        self.max_limit = max_limit
+
+
+def encode_cursor(sort: str, value, row_id: int) -> str:
+    """Encode the position after a row as an opaque URL-safe cursor"""
+    raw = json.dumps([sort, value, row_id], separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, sort: str) -> tuple:
+    """
+    Decode a cursor produced by ``encode_cursor``
+
+    Returns:
+        tuple: (sort value, id) of the last row of the previous page
+
+    Raises:
+        QueryError: If the cursor is malformed or was issued for another sort
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        cursor_sort, value, row_id = json.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, TypeError):
+        raise QueryError("Invalid cursor")
+    if cursor_sort != sort:
+        raise QueryError("Cursor does not match the requested sort")
+    return value, int(row_id)
+
+
+def _quote(value) -> str:
+    return '"' + str(value).replace('"', '\\"') + '"'
+
+
+def keyset_filter(column: str, descending: bool, value, row_id: int) -> str:
+    """
+    PostgREST ``or`` expression selecting rows after (value, id) in
+    ``column, id`` order, following Postgres' default NULL placement
+    (last when ascending, first when descending).
+    """
+    op = 'lt' if descending else 'gt'
+    if value is None:
+        after_nulls = f"and({column}.is.null,id.{op}.{row_id})"
+        return f"{column}.not.is.null,{after_nulls}" if descending else after_nulls
+    terms = [
+        f"{column}.{op}.{_quote(value)}",
+        f"and({column}.eq.{_quote(value)},id.{op}.{row_id})",
+    ]
+    if not descending:
+        terms.append(f"{column}.is.null")
+    return ','.join(terms)
+
+
+def parse_list_args(spec: ListSpec, args) -> dict:
+    """
+    Validate list query parameters against a spec
+
+    Args:
+        spec (ListSpec): Endpoint spec
+        args: Request query arguments (``request.args``)
+
+    Returns:
+        dict: fields, filters, sort column, direction, limit and cursor position
+
+    Raises:
+        QueryError: If a parameter is not allowed or malformed
+    """
+    fields = list(spec.columns)
+    if args.get('fields'):
+        fields = [f.strip() for f in args['fields'].split(',') if f.strip()]
+        unknown = [f for f in fields if f not in spec.columns]
+        if unknown:
+            raise QueryError(f"Unknown field: {', '.join(unknown)}")
+
+    sort = args.get('sort') or spec.default_sort
+    column = sort.lstrip('-')
+    if column not in spec.sortable:
+        raise QueryError(f"Cannot sort by '{column}'. Allowed: {', '.join(spec.sortable)}")
+
+    try:
+        limit = int(args.get('limit', spec.default_limit))
+    except ValueError:
+        raise QueryError("limit must be an integer")
+    if not 1 <= limit <= spec.max_limit:
+        raise QueryError(f"limit must be between 1 and {spec.max_limit}")
+
+    filters = {}
+    for name in spec.filters:
+        if name in args and args[name] != '':
+            values = [v.strip() for v in args[name].split(',')]
+            filters[name] = values if len(values) > 1 else values[0]
+
+    after = decode_cursor(args['cursor'], sort) if args.get('cursor') else None
+
+    return {
+        'fields': fields,
+        'filters': filters,
+        'sort': sort,
+        'column': column,
+        'descending': sort.startswith('-'),
+        'limit': limit,
+        'after': after,
+    }
+
+
+def build_select(spec: ListSpec, fields: list, filters: dict = None):
+    """
+    Start a select on the spec's table projecting only ``fields`` and applying
+    equality / ``in`` filters
+
+    Returns:
+        A Supabase query builder
+    """
+    query = supabase.table(spec.table).select(','.join(fields))
+    for name, value in (filters or {}).items():
+        if isinstance(value, list):
+            query = query.in_(name, value)
+        else:
+            query = query.eq(name, value)
+    return query
+
+
+def apply_keyset(query, column: str, descending: bool, after: tuple, limit: int):
+    """
+    Order a query by ``column, id`` and restrict it to the page after ``after``
+
+    Args:
+        query: Supabase query builder
+        column (str): Sort column
+        descending (bool): Sort direction
+        after (tuple): (value, id) of the last row already returned, or None
+        limit (int): Number of rows to fetch
+
+    Returns:
+        The query builder
+    """
+    if after is not None:
+        value, row_id = after
+        if column == 'id':
+            query = query.lt('id', row_id) if descending else query.gt('id', row_id)
+        else:
+            query = query.or_(keyset_filter(column, descending, value, row_id))
+    if column != 'id':
+        query = query.order(column, desc=descending)
+    return query.order('id', desc=descending).limit(limit)
+
+
+def run_list_query(spec: ListSpec, args, base_query=None) -> tuple:
+    """
+    Execute one page of a list query
+
+    Args:
+        spec (ListSpec): Endpoint spec
+        args: Request query arguments (``request.args``)
+        base_query (callable, optional): Hook receiving and returning the query
+            builder, for endpoint-specific constraints
+
+    Returns:
+        tuple: (rows, meta) where meta holds ``limit``, ``sort`` and
+        ``next_cursor`` (None on the last page)
+
+    Raises:
+        QueryError: If the query parameters are invalid
+    """
+    params = parse_list_args(spec, args)
+    column = params['column']
+
+    # The cursor needs the sort column and id even when the client didn't ask for them
+    select_fields = list(params['fields'])
+    for required in ('id', column):
+        if required not in select_fields:
+            select_fields.append(required)
+
+    query = build_select(spec, select_fields, params['filters'])
+    if base_query is not None:
+        query = base_query(query)
+    query = apply_keyset(query, column, params['descending'], params['after'], params['limit'] + 1)
+    rows = query.execute().data or []
+
+    next_cursor = None
+    if len(rows) > params['limit']:
+        rows = rows[:params['limit']]
+        last = rows[-1]
+        next_cursor = encode_cursor(params['sort'], last.get(column), last['id'])
+
+    extra = [f for f in select_fields if f not in params['fields']]
+    if extra:
+        rows = [{k: v for k, v in row.items() if k not in extra} for row in rows]
+
+    return rows, {
+        'limit': params['limit'],
+        'sort': params['sort'],
+        'next_cursor': next_cursor,
+    }
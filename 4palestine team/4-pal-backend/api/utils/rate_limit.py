@@ -0,0 +1,242 @@
+"""
+Token-bucket rate limiting for expensive endpoints.
+
+Each limited route checks one bucket per key kind:
+
+* ``ip`` - the client address (``X-Forwarded-For`` is honoured only with
+  ``RATE_LIMIT_TRUST_PROXY=1``);
+* ``email`` - the lower-cased ``email`` field of the JSON body;
+* ``account`` - the authenticated user, contributor or admin (put the
+  decorator below the auth decorator).
+
+A bucket holds ``count`` tokens and refills continuously over ``period``, so
+``5/minute`` allows a burst of five and then one request every 12 seconds.
+Rejected requests get ``429`` with ``Retry-After``.
+
+Buckets live in process memory by default. Set ``RATE_LIMIT_REDIS_URL`` (and
+install the optional ``redis`` package) to share them across workers.
+Per-route limits can be overridden with ``RATE_LIMIT_<NAME>``, e.g.
+``RATE_LIMIT_LOGIN="ip=30/minute,email=5/minute"``; ``RATE_LIMIT_ENABLED=0``
+turns limiting off.
+"""
+
+import math
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import request
+
+from api.routes import error_response
+
+try:
+    import redis
+except ImportError:  # optional dependency
+    redis = None
+
+PERIOD_SECONDS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+LIMIT_PATTERN = re.compile(r'^\s*(\d+)\s*/\s*(\d*)\s*(second|minute|hour|day)s?\s*$')
+
+
+class RateLimitConfig:
+    """Configuration for rate limiting"""
+
+    def __init__(self):
+        self.ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1').lower() not in ('0', 'false', 'no')
+        self.TRUST_PROXY = os.getenv('RATE_LIMIT_TRUST_PROXY', '0').lower() in ('1', 'true', 'yes')
+        self.REDIS_URL = os.getenv('RATE_LIMIT_REDIS_URL')
+        self.MAX_KEYS = int(os.getenv('RATE_LIMIT_MAX_KEYS', '100000'))
+
+
+rate_limit_config = RateLimitConfig()
+
+
+def parse_limit(text: str) -> tuple:
+    """
+    Parse ``"<count>/[<n>]<unit>"`` (e.g. ``"5/minute"``, ``"3/15minutes"``)
+
+    Returns:
+        tuple: (capacity, refill rate in tokens per second)
+
+    Raises:
+        ValueError: If the text is not a valid limit
+    """
+    match = LIMIT_PATTERN.match(text)
+    if not match:
+        raise ValueError(f"Invalid rate limit: {text!r}")
+    count, multiplier, unit = int(match.group(1)), int(match.group(2) or 1), match.group(3)
+    if count <= 0:
+        raise ValueError(f"Invalid rate limit: {text!r}")
+    return count, count / (multiplier * PERIOD_SECONDS[unit])
+
+
+def parse_limits(text: str) -> dict:
+    """Parse ``"ip=20/minute,email=5/minute"`` into {kind: limit string}"""
+    limits = {}
+    for part in text.split(','):
+        kind, _, limit = part.partition('=')
+        if kind.strip() not in KEY_FUNCTIONS:
+            raise ValueError(f"Unknown rate limit key {kind.strip()!r}")
+        parse_limit(limit)
+        limits[kind.strip()] = limit.strip()
+    return limits
+
+
+class MemoryBackend:
+    """Buckets in a bounded LRU dict; evicting a bucket simply refills it"""
+
+    def __init__(self, max_keys: int):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: int, rate: float, cost: float = 1) -> tuple:
+        """
+        Take ``cost`` tokens from a bucket
+
+        Returns:
+            tuple: (allowed, seconds until enough tokens are available)
+        """
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated_at) * rate)
+            if tokens >= cost:
+                allowed, retry_after = True, 0.0
+                tokens -= cost
+            else:
+                allowed, retry_after = False, (cost - tokens) / rate
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def reset(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+
+# Refill and take in one atomic step; uses the server clock so workers agree
+_REDIS_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(retry)}
+"""
+
+
+class RedisBackend:
+    """Buckets shared by every worker through Redis"""
+
+    def __init__(self, url: str):
+        self._client = redis.Redis.from_url(url)
+        self._script = self._client.register_script(_REDIS_SCRIPT)
+
+    def consume(self, key: str, capacity: int, rate: float, cost: float = 1) -> tuple:
+        allowed, retry_after = self._script(keys=[f'ratelimit:{key}'], args=[capacity, rate, cost])
+        return bool(allowed), float(retry_after)
+
+    def reset(self) -> None:
+        for key in self._client.scan_iter('ratelimit:*'):
+            self._client.delete(key)
+
+
+def _make_backend():
+    if rate_limit_config.REDIS_URL:
+        if redis is not None:
+            return RedisBackend(rate_limit_config.REDIS_URL)
+        print("RATE_LIMIT_REDIS_URL is set but the redis package is not installed; using in-process buckets")
+    return MemoryBackend(rate_limit_config.MAX_KEYS)
+
+
+backend = _make_backend()
+
+
+def _client_ip():
+    if rate_limit_config.TRUST_PROXY:
+        forwarded = request.headers.get('X-Forwarded-For', '')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.remote_addr
+
+
+def _email():
+    data = request.get_json(silent=True)
+    email = data.get('email') if isinstance(data, dict) else None
+    return email.strip().lower() if isinstance(email, str) and email.strip() else None
+
+
+def _account():
+    admin = getattr(request, 'current_admin', None)
+    if admin:
+        return f"admin:{admin['id']}"
+    user = getattr(request, 'current_user', None)
+    if user:
+        if user.get('contributor_id'):
+            return f"contributor:{user['contributor_id']}"
+        return f"user:{user.get('user_id')}"
+    return None
+
+
+KEY_FUNCTIONS = {'ip': _client_ip, 'email': _email, 'account': _account}
+
+
+def rate_limit(name: str, **limits):
+    """
+    Limit a route with one token bucket per key kind
+
+    Args:
+        name (str): Bucket namespace, shared by routes that should share limits
+            (also the ``RATE_LIMIT_<NAME>`` override)
+        **limits: Limit per key kind, e.g. ``ip="20/minute", email="5/minute"``
+
+    Example:
+        @auth_bp.route("/login/user", methods=["POST"])
+        @rate_limit("login", ip="20/minute", email="5/minute")
+        def login_user(): ...
+    """
+    override = os.getenv(f'RATE_LIMIT_{name.upper()}')
+    if override:
+        limits = parse_limits(override)
+    rules = []
+    for kind, limit in limits.items():
+        if kind not in KEY_FUNCTIONS:
+            raise ValueError(f"Unknown rate limit key {kind!r}")
+        rules.append((kind, *parse_limit(limit)))
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if rate_limit_config.ENABLED:
+                for kind, capacity, rate in rules:
+                    value = KEY_FUNCTIONS[kind]()
+                    if value is None:
+                        continue
+                    allowed, retry_after = backend.consume(f'{name}:{kind}:{value}', capacity, rate)
+                    if not allowed:
+                        return error_response(
+                            "Too many requests, please retry later", 429,
+                            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+                        )
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
@@ -0,0 +1,72 @@
+"""
+Static R-tree bulk-loaded with Sort-Tile-Recursive (STR) packing.
+
+Built once from ``(bbox, item)`` pairs, where bbox is
+``(min_x, min_y, max_x, max_y)``; rebuild it when the items change. STR packs
+nodes full and spatially tight, so a lookup descends through a handful of
+nodes instead of testing every bounding box.
+"""
+
+import math
+
+NODE_CAPACITY = 16
+
+
+def _union(boxes) -> tuple:
+    min_x, min_y, max_x, max_y = zip(*boxes)
+    return (min(min_x), min(min_y), max(max_x), max(max_y))
+
+
+def _pack(entries: list, capacity: int) -> list:
+    """Group (bbox, payload) entries into nodes of at most ``capacity``, tile by tile"""
+    slices = math.ceil(math.sqrt(math.ceil(len(entries) / capacity)))
+    slice_size = slices * capacity
+    entries = sorted(entries, key=lambda e: e[0][0] + e[0][2])
+    nodes = []
+    for start in range(0, len(entries), slice_size):
+        column = sorted(entries[start:start + slice_size], key=lambda e: e[0][1] + e[0][3])
+        for offset in range(0, len(column), capacity):
+            children = column[offset:offset + capacity]
+            nodes.append((_union(box for box, _ in children), children))
+    return nodes
+
+
+class STRTree:
+    """Read-only R-tree; leaves hold the original items"""
+
+    def __init__(self, entries, capacity: int = NODE_CAPACITY):
+        """
+        Args:
+            entries: Iterable of (bbox, item)
+            capacity (int): Maximum children per node
+        """
+        level = [(bbox, (True, item)) for bbox, item in entries]
+        self.size = len(level)
+        # Each pass wraps the current level into parent nodes until one root remains
+        while len(level) > 1:
+            level = [(bbox, (False, children)) for bbox, children in _pack(level, capacity)]
+        self._root = level[0] if level else None
+
+    def __len__(self):
+        return self.size
+
+    def query(self, bbox: tuple) -> list:
+        """Items whose bounding box intersects ``bbox``"""
+        if self._root is None:
+            return []
+        min_x, min_y, max_x, max_y = bbox
+        found = []
+        stack = [self._root]
+        while stack:
+            box, (is_item, payload) = stack.pop()
+            if box[0] > max_x or box[2] < min_x or box[1] > max_y or box[3] < min_y:
+                continue
+            if is_item:
+                found.append(payload)
+            else:
+                stack.extend(payload)
+        return found
+
+    def query_point(self, x: float, y: float) -> list:
+        """Items whose bounding box contains the point"""
+        return self.query((x, y, x, y))
@@ -0,0 +1,336 @@
+"""
+In-memory stand-in for the subset of the supabase-py client used by the API.
+
+Used by the benchmarks to run the app without a network or a real project.
+Every executed query or RPC is counted, globally and per thread, so a
+benchmark can report database round trips per request.
+"""
+
+import copy
+import itertools
+import re
+import threading
+from datetime import datetime, timezone
+
+
+class FakeAPIError(Exception):
+    """Mirrors postgrest.APIError closely enough for the routes' error handling"""
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def _parse_columns(columns):
+    """Split a PostgREST select string into plain columns and embedded resources"""
+    plain, embedded, depth, current = [], [], 0, ''
+    for char in columns + ',':
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            part = current.strip()
+            current = ''
+            if not part:
+                continue
+            match = re.match(r'^(\w+)\((.*)\)$', part)
+            if match:
+                embedded.append((match.group(1), match.group(2)))
+            else:
+                plain.append(part)
+            continue
+        current += char
+    return plain, embedded
+
+
+def _coerce(value, sample):
+    if isinstance(sample, bool):
+        return str(value).lower() == 'true' if isinstance(value, str) else bool(value)
+    if isinstance(sample, (int, float)) and isinstance(value, str):
+        try:
+            return type(sample)(value)
+        except ValueError:
+            return value
+    return value
+
+
+def _compare(op, left, right):
+    if op == 'is':
+        if str(right).lower() == 'null':
+            return left is None
+        return left is _coerce(right, True)
+    if left is None:
+        return False
+    right = _coerce(right, left)
+    if op == 'eq':
+        return left == right
+    if op == 'neq':
+        return left != right
+    if op == 'gt':
+        return left > right
+    if op == 'gte':
+        return left >= right
+    if op == 'lt':
+        return left < right
+    if op == 'lte':
+        return left <= right
+    if op == 'in':
+        return left in [_coerce(v, left) for v in right]
+    raise FakeAPIError(f"Unsupported operator: {op}")
+
+
+def _split_top_level(expression):
+    parts, depth, current = [], 0, ''
+    for char in expression:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == ',' and depth == 0:
+            parts.append(current)
+            current = ''
+            continue
+        current += char
+    if current:
+        parts.append(current)
+    return parts
+
+
+def _or_predicate(expression):
+    """Compile a PostgREST ``or=(...)`` filter string into a row predicate"""
+    def compile_term(term):
+        term = term.strip()
+        for joiner in ('and', 'or'):
+            if term.startswith(joiner + '('):
+                inner = [compile_term(t) for t in _split_top_level(term[len(joiner) + 1:-1])]
+                if joiner == 'and':
+                    return lambda row: all(p(row) for p in inner)
+                return lambda row: any(p(row) for p in inner)
+        column, op, value = term.split('.', 2)
+        negate = op == 'not'
+        if negate:
+            op, value = value.split('.', 1)
+        if op == 'in':
+            value = value.strip('()').split(',')
+        elif value.startswith('"') and value.endswith('"'):
+            value = value[1:-1].replace('\\"', '"')
+        if negate:
+            return lambda row: not _compare(op, row.get(column), value)
+        return lambda row: _compare(op, row.get(column), value)
+
+    terms = [compile_term(t) for t in _split_top_level(expression)]
+    return lambda row: any(p(row) for p in terms)
+
+
+class FakeQuery:
+    def __init__(self, db, table):
+        self._db = db
+        self._table = table
+        self._action = 'select'
+        self._columns = '*'
+        self._payload = None
+        self._filters = []
+        self._order = []
+        self._limit = None
+        self._offset = 0
+        self._single = None
+
+    # Actions
+    def select(self, columns='*', count=None):
+        self._action = 'select'
+        self._columns = columns
+        return self
+
+    def insert(self, json, **kwargs):
+        self._action = 'insert'
+        self._payload = json
+        return self
+
+    def update(self, json, **kwargs):
+        self._action = 'update'
+        self._payload = json
+        return self
+
+    def delete(self, **kwargs):
+        self._action = 'delete'
+        return self
+
+    # Filters
+    def _filter(self, op, column, value):
+        self._filters.append(lambda row: _compare(op, row.get(column), value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter('eq', column, value)
+
+    def neq(self, column, value):
+        return self._filter('neq', column, value)
+
+    def gt(self, column, value):
+        return self._filter('gt', column, value)
+
+    def gte(self, column, value):
+        return self._filter('gte', column, value)
+
+    def lt(self, column, value):
+        return self._filter('lt', column, value)
+
+    def lte(self, column, value):
+        return self._filter('lte', column, value)
+
+    def in_(self, column, values):
+        return self._filter('in', column, list(values))
+
+    def is_(self, column, value):
+        return self._filter('is', column, value)
+
+    def or_(self, filters, reference_table=None):
+        self._filters.append(_or_predicate(filters))
+        return self
+
+    # Modifiers
+    def order(self, column, *, desc=False, nullsfirst=False, foreign_table=None):
+        self._order.append((column, desc))
+        return self
+
+    def limit(self, size, *, foreign_table=None):
+        self._limit = size
+        return self
+
+    def range(self, start, end, foreign_table=None):
+        self._offset = start
+        self._limit = end - start + 1
+        return self
+
+    def single(self):
+        self._single = 'single'
+        return self
+
+    def maybe_single(self):
+        self._single = 'maybe'
+        return self
+
+    def _matching(self, rows):
+        return [row for row in rows if all(f(row) for f in self._filters)]
+
+    def execute(self):
+        return self._db._execute(self)
+
+
+class FakeRPC:
+    def __init__(self, db, name, params):
+        self._db = db
+        self._name = name
+        self._params = params
+
+    def execute(self):
+        handler = self._db.rpc_handlers.get(self._name)
+        if handler is None:
+            raise FakeAPIError(f"Could not find the function public.{self._name}")
+        with self._db.lock:
+            self._db._count_call()
+            return FakeResponse(handler(self._db, **(self._params or {})))
+
+
+class FakeSupabase:
+    """
+    A tiny in-memory PostgREST: tables are lists of dicts, ids are serial and
+    embedded selects follow the ``<parent>_id`` foreign-key naming used by
+    the schema in api/DB.
+    """
+
+    def __init__(self, tables=None, defaults=None):
+        self.tables = {name: [dict(r) for r in rows] for name, rows in (tables or {}).items()}
+        self.defaults = defaults or {}
+        self.rpc_handlers = {}
+        self.lock = threading.RLock()
+        self.calls = 0
+        self._ids = {}
+        self._local = threading.local()
+
+    def _count_call(self):
+        self.calls += 1
+        self._local.calls = getattr(self._local, 'calls', 0) + 1
+
+    def thread_calls(self) -> int:
+        """Queries executed so far on the calling thread"""
+        return getattr(self._local, 'calls', 0)
+
+    def table(self, name):
+        return FakeQuery(self, name)
+
+    def from_(self, name):
+        return self.table(name)
+
+    def rpc(self, name, params=None):
+        return FakeRPC(self, name, params)
+
+    def next_id(self, table):
+        if table not in self._ids:
+            existing = [row.get('id', 0) or 0 for row in self.tables.get(table, [])]
+            self._ids[table] = itertools.count(max(existing, default=0) + 1)
+        return next(self._ids[table])
+
+    def insert_row(self, table, row):
+        row = dict(row)
+        for column, default in self.defaults.get(table, {}).items():
+            if row.get(column) is None:
+                row[column] = default() if callable(default) else default
+        row.setdefault('id', self.next_id(table))
+        self.tables.setdefault(table, []).append(row)
+        return row
+
+    def _embed(self, parent_table, row, embedded):
+        for name, columns in embedded:
+            foreign_key = parent_table.rstrip('s') + '_id'
+            children = [child for child in self.tables.get(name, []) if child.get(foreign_key) == row.get('id')]
+            row[name] = [self._project(name, child, columns) for child in children]
+        return row
+
+    def _project(self, table, row, columns):
+        plain, embedded = _parse_columns(columns)
+        if '*' in plain:
+            result = dict(row)
+        else:
+            result = {column: row.get(column) for column in plain}
+        return self._embed(table, result, embedded)
+
+    def _execute(self, query):
+        with self.lock:
+            self._count_call()
+            rows = self.tables.setdefault(query._table, [])
+            if query._action == 'insert':
+                payload = query._payload if isinstance(query._payload, list) else [query._payload]
+                data = [dict(self.insert_row(query._table, item)) for item in payload]
+            elif query._action == 'update':
+                data = []
+                for row in query._matching(rows):
+                    row.update(copy.deepcopy(query._payload))
+                    data.append(dict(row))
+            elif query._action == 'delete':
+                matching = query._matching(rows)
+                ids = {id(row) for row in matching}
+                self.tables[query._table] = [row for row in rows if id(row) not in ids]
+                data = [dict(row) for row in matching]
+            else:
+                matching = query._matching(rows)
+                for column, desc in reversed(query._order):
+                    matching.sort(key=lambda r: (r.get(column) is None, r.get(column)), reverse=desc)
+                end = None if query._limit is None else query._offset + query._limit
+                matching = matching[query._offset:end]
+                data = [self._project(query._table, row, query._columns) for row in matching]
+
+            if query._single:
+                if len(data) != 1:
+                    if query._single == 'maybe' and not data:
+                        return None
+                    raise FakeAPIError("JSON object requested, multiple (or no) rows returned")
+                return FakeResponse(data[0])
+            return FakeResponse(data)
+
+
+def utcnow_iso():
+    return datetime.now(timezone.utc).replace(tzinfo=None).isoformat()
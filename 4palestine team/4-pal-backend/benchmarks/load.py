@@ -0,0 +1,310 @@
+"""
+In-process load test of the API against an in-memory Supabase.
+
+The app from api/index.py is booted with benchmarks/fake_supabase.py in
+place of the client in api/DB/connection.py, seeded with users, admins,
+locations and emergencies, and driven through Flask test clients from
+several threads. No network, SMTP or Supabase project is needed. Run from
+the backend root:
+
+    python -m benchmarks.load --seconds 5 --concurrency 8
+    python -m benchmarks.load --mix list_locations=1 --seconds 2
+    python -m benchmarks.load --baseline benchmarks/baseline.json          # exit 1 on regression
+    python -m benchmarks.load --baseline benchmarks/baseline.json --update-baseline
+
+A scenario regresses when its p95 latency exceeds the baseline by more than
+both ``--tolerance`` and ``--slack-ms``, when it needs more database calls
+per request than the baseline, or when any of its requests fail.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import types
+from collections import defaultdict
+
+from benchmarks.fake_supabase import FakeSupabase, utcnow_iso
+
+PASSWORD = "benchmark-password"
+CENTER = (31.5017, 34.4668)
+SPREAD_DEG = 0.1
+EMERGENCY_TYPES = ("medical", "trapped", "fire", "violence", "other")
+LOCATION_CATEGORIES = ("food_distribution", "medical_facility", "water_source", "refuge_camp", "danger_zone")
+
+DEFAULT_MIX = "login=1,list_locations=6,create_emergency=2,verify_location=1"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="comma-separated scenario=weight pairs")
+    parser.add_argument("--concurrency", type=int, default=8, help="client threads")
+    parser.add_argument("--seconds", type=float, default=5.0, help="measurement time")
+    parser.add_argument("--warmup", type=int, default=5, help="untimed requests per scenario before measuring")
+    parser.add_argument("--seed", type=int, default=1, help="random seed for data and request choice")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--locations", type=int, default=2000)
+    parser.add_argument("--emergencies", type=int, default=200)
+    parser.add_argument("--bcrypt-rounds", type=int, default=4,
+                        help="bcrypt cost for seeded users (see benchmarks/password_hashing.py for real costs)")
+    parser.add_argument("--baseline", help="baseline JSON file to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="write the results to --baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.5, help="allowed relative p95 increase over the baseline")
+    parser.add_argument("--slack-ms", type=float, default=5.0,
+                        help="allowed absolute p95 increase, so sub-millisecond routes do not flap")
+    parser.add_argument("--json", dest="json_out", help="also write the results to this file")
+    return parser.parse_args()
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r}; choose from {', '.join(SCENARIOS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def boot(args):
+    """Import the app with the fake client installed and return (app, db)"""
+    os.environ.setdefault("SUPABASE_URL", "http://fake.invalid")
+    os.environ.setdefault("SUPABASE_KEY", "fake")
+    os.environ["MAIL_OUTBOX_WORKERS"] = "0"
+    os.environ["TOKEN_SWEEP_INTERVAL_SECONDS"] = "0"
+    # Every simulated client shares one address and a handful of emails
+    os.environ["RATE_LIMIT_ENABLED"] = "0"
+    os.environ["BCRYPT_ROUNDS"] = str(args.bcrypt_rounds)
+
+    db = FakeSupabase(defaults={
+        "users": {"created_at": utcnow_iso, "registration_date": utcnow_iso},
+        "locations": {"created_at": utcnow_iso},
+        "emergencies": {"activated_at": utcnow_iso},
+        "email_outbox": {"next_attempt_at": utcnow_iso, "attempts": 0},
+    })
+    from api.utils.metrics import instrument_client
+
+    connection = types.ModuleType("api.DB.connection")
+    # Wrapped like the real client so the measured cost includes the instrumentation
+    connection.supabase = instrument_client(db)
+    sys.modules["api.DB.connection"] = connection
+
+    from api.index import app
+    return app, db
+
+
+def seed(db, args, rng):
+    from api.utils.passwords import hash_password
+
+    password_hash = hash_password(PASSWORD)
+    for i in range(1, args.users + 1):
+        db.insert_row("users", {
+            "id": i, "user_type": "registered", "email": f"user{i}@bench.test",
+            "first_name": "Bench", "last_name": str(i), "password_hash": password_hash,
+            "is_email_verified": True,
+        })
+    db.insert_row("admins", {"id": 1, "user_id": 1, "email": "admin@bench.test", "name": "Bench Admin",
+                             "password_hash": password_hash, "is_active": True})
+
+    for i in range(1, args.locations + 1):
+        db.insert_row("locations", {
+            "id": i, "created_by": rng.randint(1, args.users), "category": rng.choice(LOCATION_CATEGORIES),
+            "title": f"Location {i}", "latitude": _jitter(rng, 0), "longitude": _jitter(rng, 1),
+            "start_time": "08:00", "end_time": "18:00",
+        })
+        db.insert_row("location_verifications", {"location_id": i, "status": rng.choice(("verified", "unverified"))})
+
+    for i in range(1, args.emergencies + 1):
+        db.insert_row("emergencies", {
+            "id": i, "activated_by": rng.randint(1, args.users), "emergency_type": rng.choice(EMERGENCY_TYPES),
+            "latitude": _jitter(rng, 0), "longitude": _jitter(rng, 1), "estimated_victims": rng.randint(0, 5),
+        })
+
+
+def _jitter(rng, axis):
+    return round(CENTER[axis] + rng.uniform(-SPREAD_DEG, SPREAD_DEG), 6)
+
+
+# Scenarios: each sends one request and returns the response
+
+def login(client, rng, args):
+    email = f"user{rng.randint(1, args.users)}@bench.test"
+    return client.post("/api/auth/login/user", json={"email": email, "password": PASSWORD})
+
+
+def list_locations(client, rng, args):
+    return client.get("/api/locations", query_string={
+        "lat": _jitter(rng, 0), "lon": _jitter(rng, 1), "radius_m": rng.choice((500, 2000, 5000)),
+    })
+
+
+def create_emergency(client, rng, args):
+    return client.post("/api/emergencies", json={
+        "activated_by": rng.randint(1, args.users), "emergency_type": rng.choice(EMERGENCY_TYPES),
+        "latitude": _jitter(rng, 0), "longitude": _jitter(rng, 1), "estimated_victims": rng.randint(0, 5),
+    })
+
+
+def verify_location(client, rng, args):
+    return client.post("/api/locations/verify", json={
+        "admin_id": 1, "location_id": rng.randint(1, args.locations),
+        "status": rng.choice(("verified", "unverified")),
+    })
+
+
+SCENARIOS = {
+    "login": login,
+    "list_locations": list_locations,
+    "create_emergency": create_emergency,
+    "verify_location": verify_location,
+}
+
+
+class Recorder:
+    """Per-scenario latency samples, failures and database call counts"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.db_calls = defaultdict(int)
+
+    def record(self, name, seconds, ok, db_calls):
+        with self.lock:
+            self.latencies[name].append(seconds)
+            self.db_calls[name] += db_calls
+            if not ok:
+                self.errors[name] += 1
+
+
+def run_once(app, db, name, rng, args, client, recorder=None):
+    before = db.thread_calls()
+    started = time.perf_counter()
+    response = SCENARIOS[name](client, rng, args)
+    elapsed = time.perf_counter() - started
+    ok = response.status_code < 400
+    if recorder is not None:
+        recorder.record(name, elapsed, ok, db.thread_calls() - before)
+    elif not ok:
+        raise SystemExit(f"warmup {name} failed with {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+
+def run(app, db, args, mix):
+    names, weights = list(mix), list(mix.values())
+    warm_rng = random.Random(args.seed)
+    warm_client = app.test_client()
+    for name in names:
+        for _ in range(args.warmup):
+            run_once(app, db, name, warm_rng, args, warm_client)
+
+    recorder = Recorder()
+    deadline = time.perf_counter() + args.seconds
+
+    def worker(index):
+        rng = random.Random(args.seed * 1000 + index)
+        client = app.test_client()
+        while time.perf_counter() < deadline:
+            run_once(app, db, rng.choices(names, weights)[0], rng, args, client, recorder)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(args.concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return recorder, time.perf_counter() - started
+
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def summarize(recorder, elapsed):
+    scenarios = {}
+    for name, samples in sorted(recorder.latencies.items()):
+        samples.sort()
+        count = len(samples)
+        scenarios[name] = {
+            "requests": count,
+            "errors": recorder.errors[name],
+            "rps": round(count / elapsed, 1),
+            "p50_ms": round(1000 * percentile(samples, 0.50), 2),
+            "p95_ms": round(1000 * percentile(samples, 0.95), 2),
+            "p99_ms": round(1000 * percentile(samples, 0.99), 2),
+            "db_calls_per_request": round(recorder.db_calls[name] / count, 2),
+        }
+    total = sum(s["requests"] for s in scenarios.values())
+    return {"elapsed_seconds": round(elapsed, 2), "total_rps": round(total / elapsed, 1), "scenarios": scenarios}
+
+
+def print_report(results, args):
+    print(f"concurrency {args.concurrency}, {results['elapsed_seconds']}s, {results['total_rps']} req/s overall")
+    print(f"{'scenario':<18} {'reqs':>6} {'err':>4} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db/req':>7}")
+    for name, s in results["scenarios"].items():
+        print(f"{name:<18} {s['requests']:>6} {s['errors']:>4} {s['rps']:>8} {s['p50_ms']:>8} "
+              f"{s['p95_ms']:>8} {s['p99_ms']:>8} {s['db_calls_per_request']:>7}")
+
+
+def compare(results, baseline, tolerance, slack_ms):
+    """Return a list of regression messages (empty when nothing regressed)"""
+    problems = []
+    for name, current in results["scenarios"].items():
+        if current["errors"]:
+            problems.append(f"{name}: {current['errors']} failed request(s)")
+        previous = baseline.get("scenarios", {}).get(name)
+        if not previous:
+            continue
+        limit = max(previous["p95_ms"] * (1 + tolerance), previous["p95_ms"] + slack_ms)
+        if current["p95_ms"] > limit:
+            problems.append(f"{name}: p95 {current['p95_ms']}ms exceeds baseline {previous['p95_ms']}ms (+{tolerance:.0%})")
+        if current["db_calls_per_request"] > previous["db_calls_per_request"] + 0.01:
+            problems.append(f"{name}: {current['db_calls_per_request']} db calls/request, "
+                            f"baseline {previous['db_calls_per_request']}")
+    return problems
+
+
+def main():
+    args = parse_args()
+    mix = parse_mix(args.mix)
+    app, db = boot(args)
+    seed(db, args, random.Random(args.seed))
+
+    recorder, elapsed = run(app, db, args, mix)
+    results = summarize(recorder, elapsed)
+    results["config"] = {"concurrency": args.concurrency, "mix": args.mix, "bcrypt_rounds": args.bcrypt_rounds,
+                         "users": args.users, "locations": args.locations, "emergencies": args.emergencies}
+    print_report(results, args)
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if not args.baseline:
+        return 0
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+        print(f"baseline written to {args.baseline}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    problems = compare(results, baseline, args.tolerance, args.slack_ms)
+    for problem in problems:
+        print("REGRESSION", problem)
+    if not problems:
+        print("no regressions against", args.baseline)
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
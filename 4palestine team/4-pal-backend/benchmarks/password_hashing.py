@@ -0,0 +1,58 @@
+"""
+Benchmark bcrypt login throughput at several cost factors.
+
+Verifications go through the same bounded pool the API uses
+(api/utils/passwords.py), so the numbers reflect what one API process can
+sustain. Run from the backend root:
+
+    python -m benchmarks.password_hashing --costs 10 11 12 13 --seconds 3
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--costs", type=int, nargs="+", default=[10, 11, 12, 13], help="bcrypt cost factors to measure")
+    parser.add_argument("--seconds", type=float, default=3.0, help="measurement time per cost factor")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="password pool size (cores to use)")
+    return parser.parse_args()
+
+
+def measure(passwords, cost, seconds, clients):
+    hashed = passwords.hash_password("correct horse battery", rounds=cost)
+    deadline = time.perf_counter() + seconds
+
+    def client():
+        done = 0
+        while time.perf_counter() < deadline:
+            passwords.verify_password("correct horse battery", hashed)
+            done += 1
+        return done
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as pool:
+        total = sum(pool.map(lambda _: client(), range(clients)))
+    return total, time.perf_counter() - started
+
+
+def main():
+    args = parse_args()
+    # Configure the pool before it is created at import time
+    os.environ["PASSWORD_HASH_WORKERS"] = str(args.workers)
+    os.environ.setdefault("PASSWORD_HASH_QUEUE_DEPTH", str(args.workers * 4))
+    from api.utils import passwords
+
+    print(f"password pool: {args.workers} worker(s)")
+    print(f"{'cost':>4}  {'logins/s':>10}  {'logins/s/core':>13}  {'ms/login':>9}")
+    for cost in args.costs:
+        total, elapsed = measure(passwords, cost, args.seconds, clients=args.workers * 2)
+        rate = total / elapsed
+        print(f"{cost:>4}  {rate:>10.1f}  {rate / args.workers:>13.1f}  {1000 * args.workers / rate:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Measure cold-start cost: import time of api.index and time to first response.
+
+Each run starts a fresh interpreter (as a serverless cold start would),
+imports the app, serves ``GET /`` through the test client and reports:
+
+* interpreter spawn to first response, as seen from outside;
+* ``import api.index`` and the first request, as seen from inside;
+* whether ``supabase`` / ``flask_mail`` were imported before the first
+  response (both are meant to load lazily).
+
+Then one ``python -X importtime`` run lists the slowest imports. Run from the
+backend root:
+
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --runs 5 --max-ms 800     # exit 1 when slower
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+from api.index import app
+imported = time.perf_counter()
+response = app.test_client().get("/")
+served = time.perf_counter()
+print(json.dumps({
+    "import_ms": (imported - started) * 1000,
+    "first_request_ms": (served - imported) * 1000,
+    "status": response.status_code,
+    "supabase_loaded": "supabase" in sys.modules,
+    "flask_mail_loaded": "flask_mail" in sys.modules,
+}))
+"""
+
+LAZY_MODULES = ("supabase", "flask_mail")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="cold starts to measure")
+    parser.add_argument("--top", type=int, default=20, help="slowest imports to list")
+    parser.add_argument("--max-ms", type=float, help="fail when the median time to first response exceeds this")
+    return parser.parse_args()
+
+
+def child_env():
+    env = dict(os.environ)
+    # Nothing is contacted during startup, but the connection module still reads these
+    env.setdefault("SUPABASE_URL", "http://supabase.invalid")
+    env.setdefault("SUPABASE_KEY", "startup-benchmark")
+    env["MAIL_OUTBOX_WORKERS"] = "0"
+    env["TOKEN_SWEEP_INTERVAL_SECONDS"] = "0"
+    return env
+
+
+def cold_start(env):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", CHILD], env=env, capture_output=True, text=True, check=True)
+    total_ms = (time.perf_counter() - started) * 1000
+    report = json.loads(result.stdout.strip().splitlines()[-1])
+    # The child exits right after printing, so this is spawn -> first response plus a small exit cost
+    report["total_ms"] = total_ms
+    return report
+
+
+def import_profile(env):
+    """Parse ``-X importtime`` output into (module, self_us, cumulative_us, depth) rows"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import api.index"],
+                            env=env, capture_output=True, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def main():
+    args = parse_args()
+    env = child_env()
+
+    runs = [cold_start(env) for _ in range(args.runs)]
+    for key in ("total_ms", "import_ms", "first_request_ms"):
+        values = [run[key] for run in runs]
+        print(f"{key:<18} median {statistics.median(values):8.1f}  min {min(values):8.1f}  max {max(values):8.1f}")
+    for module in LAZY_MODULES:
+        loaded = any(run[f"{module}_loaded"] for run in runs)
+        print(f"{module} imported before first response: {'yes' if loaded else 'no'}")
+
+    rows = import_profile(env)
+    print(f"\nslowest imports (cumulative, top {args.top}):")
+    print(f"{'cumulative ms':>13} {'self ms':>8}  module")
+    for name, self_us, cumulative_us, depth in sorted(rows, key=lambda r: r[2], reverse=True)[:args.top]:
+        print(f"{cumulative_us / 1000:>13.1f} {self_us / 1000:>8.1f}  {'  ' * depth}{name}")
+
+    own = [r for r in rows if r[0].startswith("api.")]
+    print(f"\napi.* modules: {sum(r[1] for r in own) / 1000:.1f} ms self time across {len(own)} modules")
+
+    if args.max_ms is not None:
+        median = statistics.median(run["total_ms"] for run in runs)
+        if median > args.max_ms:
+            print(f"REGRESSION median time to first response {median:.1f}ms exceeds {args.max_ms}ms")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())